@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Throughput, peak memory and scaling of generation, raw telemetry I/O and processing steps
+across event counts, checked against a committed baseline
+
+Runs offline with only the project's dependencies:
+  python benchmarks/benchmark_pipeline.py                     # 10k, 100k and 1M events vs baseline.json
+  python benchmarks/benchmark_pipeline.py --sizes 10000 100000 1000000 10000000
+  python benchmarks/benchmark_pipeline.py --cases clean_tables create_aggregated_metrics
+  python benchmarks/benchmark_pipeline.py --update-baseline   # after an intended change, on the reference machine
+"""
+
+import argparse
+import contextlib
+import datetime
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from config_loader import export_settings, generation_settings
+from data_generator import TelemetryDataGenerator
+from data_processor import TelemetryDataProcessor
+from dedup import EventKeyIndex
+from run_metrics import MB
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 3
+# Sizes up to this are timed best-of-repeat; larger ones run once
+REPEAT_MAX_EVENTS = 100_000
+# Cases holding every event as a Python dict are skipped above this size (about 1.5 KB per event)
+EVENT_LIST_MAX_EVENTS = 1_000_000
+# process_input is skipped above this size: a day written unsharded is one input of millions of events
+# per event type, which the pipeline would split into shards under --memory-limit
+PROCESS_INPUT_MAX_EVENTS = 1_000_000
+# Peak memory below this many MB over the baseline is noise, whatever the tolerance
+MEMORY_SLACK_MB = 16
+# Baseline timings shorter than this are dominated by noise and not checked for throughput
+MIN_COMPARED_SECONDS = 0.1
+SEED = 1234
+BENCHMARK_DATE = datetime.date(2024, 1, 1)
+REFERENCE_TIME = datetime.datetime(2024, 1, 2)
+
+CASES = ["iter_daily_columns", "generate_daily_logs", "save_to_json", "save_to_csv", "write_day_csv",
+         "load_input_tables", "clean_tables", "create_aggregated_metrics", "identify_pain_points",
+         "save_processed_data", "process_input"]
+
+
+def measure(events: int, run: Callable, setup: Callable = None, repeat: int = 1) -> (Dict, object):
+    """Time run(setup()) best-of-repeat, then trace one more run's memory; returns the measurements and a result
+
+    Peak memory is the tracemalloc peak of the traced run: allocations made
+    by Python and NumPy (hence pandas) during the run, excluding setup and
+    data held from earlier cases. Tracing slows Python-heavy code, so timed
+    runs are untraced. Output printed by the code under test is swallowed.
+    """
+    best, result = None, None
+    for attempt in range(repeat + 1):
+        # Release the previous attempt's data before setting up the next one
+        argument = result = None
+        gc.collect()
+        argument = setup() if setup else None
+        traced = attempt == repeat
+        if traced:
+            tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = run(argument) if setup else run()
+                elapsed = time.perf_counter() - start
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1]
+            else:
+                best = elapsed if best is None else min(best, elapsed)
+        finally:
+            if traced:
+                tracemalloc.stop()
+    return {
+        "seconds": round(best, 4),
+        "events_per_second": round(events / best) if best else None,
+        "peak_memory_mb": round(peak / MB, 1)
+    }, result
+
+
+def benchmark_size(events: int, workdir: str, cases: List[str], repeat: int) -> Dict[str, Dict]:
+    """Run the selected cases at one event count; later cases use the data earlier ones produce"""
+    generator = TelemetryDataGenerator(settings=generation_settings())
+    raw_path = os.path.join(workdir, "raw")
+    processed_path = os.path.join(workdir, "processed")
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(raw_path)
+    repeat = repeat if events <= REPEAT_MAX_EVENTS else 1
+    results = {}
+
+    def case(name, run, setup=None):
+        measured, result = measure(events, run, setup, repeat)
+        if name in cases:
+            results[name] = measured
+            print(f"   {name:<26} {events:>11,} {measured['seconds']:>9.3f}s "
+                  f"{measured['events_per_second'] or 0:>12,} ev/s {measured['peak_memory_mb']:>9.1f} MB")
+        return result
+
+    def skip(name, reason):
+        if name in cases:
+            results[name] = {"skipped": reason}
+            print(f"   {name:<26} {events:>11,}  skipped: {reason}")
+
+    def seeded():
+        return np.random.default_rng(SEED)
+
+    # Generation: batched columns (bounded by the chunk size), then materialized event dicts
+    if "iter_daily_columns" in cases:
+        case("iter_daily_columns", lambda rng: sum(
+            columns["num_events"] for columns in generator.iter_daily_columns(
+                BENCHMARK_DATE, events, rng=rng, reference_time=REFERENCE_TIME)), setup=seeded)
+
+    list_cases = {"generate_daily_logs", "save_to_json", "save_to_csv"} & set(cases)
+    if list_cases and events > EVENT_LIST_MAX_EVENTS:
+        for name in sorted(list_cases):
+            skip(name, f"holds every event as a dict (limit {EVENT_LIST_MAX_EVENTS:,})")
+    elif list_cases:
+        logs = case("generate_daily_logs", lambda: generator.generate_daily_logs(BENCHMARK_DATE, events, batched=True))
+        if "save_to_json" in cases:
+            case("save_to_json", lambda: generator.save_to_json(logs, os.path.join(workdir, "events.json")))
+        if "save_to_csv" in cases:
+            case("save_to_csv", lambda: generator.save_to_csv(logs, os.path.join(workdir, "events.csv")))
+        del logs
+        for name in ("events.json", "events.csv"):
+            if os.path.exists(os.path.join(workdir, name)):
+                os.remove(os.path.join(workdir, name))
+
+    processing = [name for name in CASES[CASES.index("load_input_tables"):] if name in cases]
+    if "write_day_csv" not in cases and not processing:
+        return results
+
+    # Raw telemetry as the pipeline writes it: streamed, one CSV table per event type
+    base_path = os.path.join(raw_path, f"telemetry_{BENCHMARK_DATE.strftime('%Y%m%d')}")
+    case("write_day_csv", lambda rng: generator.write_day(
+        BENCHMARK_DATE, events, base_path, ["csv"], batched=True, rng=rng, reference_time=REFERENCE_TIME),
+        setup=seeded)
+    if not processing:
+        return results
+
+    # Processing as the pipeline runs it: each raw input (one CSV per event type) loaded as typed
+    # tables, then cleaned and deduplicated against a shared event key index
+    processor = TelemetryDataProcessor(raw_path, processed_path, export=export_settings({}))
+    inputs = processor.raw_inputs()
+    key_root = os.path.join(workdir, "event_keys")
+    loaded = case("load_input_tables", lambda: {
+        name: processor.load_input_tables(name, paths) for name, paths in inputs.items()})
+
+    def clean_inputs(tables):
+        key_index, cleaned = EventKeyIndex(key_root), {}
+        for input_tables in tables.values():
+            cleaned.update(processor.clean_tables(input_tables, key_index))
+        return cleaned
+
+    # Shallow copies: cleaning replaces the timestamp column without touching the loaded tables
+    cleaned = case("clean_tables", clean_inputs, setup=lambda: {
+        name: {event_type: table.copy(deep=False) for event_type, table in input_tables.items()}
+        for name, input_tables in loaded.items()})
+    del loaded
+    aggregated = case("create_aggregated_metrics", lambda: processor.create_aggregated_metrics(cleaned))
+    pain_points = case("identify_pain_points", lambda: processor.identify_pain_points(cleaned))
+    if "save_processed_data" in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            insights = processor.generate_insights_summary(cleaned, pain_points)
+        case("save_processed_data", lambda: processor.save_processed_data(aggregated, insights))
+    del cleaned, aggregated
+
+    # The whole map step per input: load, clean, aggregate to partials and save the processed tables.
+    # Each result is dropped before the next input, as the pipeline's reduce step does
+    def process_inputs(key_index):
+        return sum(len(processor.process_input(name, paths, key_index)['keys']) for name, paths in inputs.items())
+
+    if "process_input" in cases and events > PROCESS_INPUT_MAX_EVENTS:
+        skip("process_input", f"one unsharded input per event type (limit {PROCESS_INPUT_MAX_EVENTS:,})")
+    elif "process_input" in cases:
+        case("process_input", process_inputs, setup=lambda: EventKeyIndex(key_root))
+    return results
+
+
+def scaling_exponent(points: Dict[str, Dict]) -> float:
+    """Slope of log(seconds) against log(events): 1.0 is linear scaling (None below two sizes)"""
+    measured = [(int(size), result["seconds"]) for size, result in points.items()
+                if result.get("seconds")]
+    if len(measured) < 2:
+        return None
+    sizes, seconds = zip(*measured)
+    return round(float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0]), 2)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions against the baseline: throughput or peak memory worse than tolerance allows"""
+    regressions = []
+    for name, points in results["cases"].items():
+        for size, current in points.items():
+            reference = baseline.get("cases", {}).get(name, {}).get(size)
+            if not reference or "seconds" not in reference or "seconds" not in current:
+                continue
+            if reference["seconds"] >= MIN_COMPARED_SECONDS and \
+                    current["events_per_second"] < reference["events_per_second"] * (1 - tolerance):
+                regressions.append(
+                    f"{name} @ {int(size):,} events: {current['events_per_second']:,} events/s vs baseline "
+                    f"{reference['events_per_second']:,} ({current['events_per_second'] / reference['events_per_second'] - 1:+.0%})")
+            memory_limit = max(reference["peak_memory_mb"] * (1 + tolerance), reference["peak_memory_mb"] + MEMORY_SLACK_MB)
+            if current["peak_memory_mb"] > memory_limit:
+                regressions.append(
+                    f"{name} @ {int(size):,} events: peak memory {current['peak_memory_mb']:.1f} MB vs baseline "
+                    f"{reference['peak_memory_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages against a committed baseline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Event counts to benchmark (default: %(default)s)')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES,
+                        help='Cases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Best of N runs for sizes up to {REPEAT_MAX_EVENTS:,} events (default: %(default)s)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed fractional drop in throughput or rise in peak memory (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='Baseline JSON to compare against (default: benchmarks/baseline.json)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write these results as the new baseline instead of comparing')
+    parser.add_argument('--output', default=None,
+                        help='Also write these results to this JSON file')
+    parser.add_argument('--workdir', default=None,
+                        help='Scratch directory for benchmark data (default: a temporary directory)')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="telemetry-bench-")
+    results = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.machine(), "cpus": os.cpu_count()},
+        "sizes": args.sizes,
+        "cases": {},
+        "scaling_exponents": {}
+    }
+    print(f"{'case':<29} {'events':>11} {'time':>10} {'throughput':>17} {'peak memory':>12}")
+    try:
+        for events in args.sizes:
+            for name, result in benchmark_size(events, os.path.join(workdir, str(events)), args.cases,
+                                               args.repeat).items():
+                results["cases"].setdefault(name, {})[str(events)] = result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\nScaling exponents (1.0 = linear in events):")
+    for name, points in results["cases"].items():
+        exponent = results["scaling_exponents"][name] = scaling_exponent(points)
+        if exponent is not None:
+            print(f"   {name:<26} {exponent:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline} - run with --update-baseline to create one")
+        return
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%} of the baseline ({baseline.get('created_at')}):")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.tolerance:.0%} of the baseline ({baseline.get('created_at')})")
+
+
+if __name__ == "__main__":
+    main()
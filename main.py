@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 """
 Cybersecurity Telemetry Analysis - Main Execution Script
-This script runs the complete data pipeline from generation to AI analysis
+This script runs the complete data pipeline from generation to AI analysis, or any one of its stages
+
+Each stage's modules (and their NumPy, pandas and requests dependencies) are
+imported only when a command runs that stage, so generating data never loads
+pandas and --help loads none of them.
 """
 
 import os
 import sys
 import argparse
+import importlib
+import json
+import queue
+import threading
 import time
 from datetime import datetime
 
@@ -14,37 +22,133 @@ from datetime import datetime
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 try:
-    from data_generator import TelemetryDataGenerator
-    from data_processor import TelemetryDataProcessor
-    from ai_analyzer import AITelemetryAnalyzer
+    from config_loader import LLM_BACKENDS, ai_settings, generation_settings, load_config
+    from run_metrics import DEFAULT_PROFILE_TOP, PROFILES_DIR, RUN_METRICS_NAME, RunMetrics, llm_call_summary
+    from stage_cache import DEFAULT_CACHE_BYTES, StageCache, list_files, stage_key
 except ImportError as e:
     print(f"Import error: {e}")
     print("Please ensure all required Python packages are installed.")
     sys.exit(1)
 
+COMMANDS = ["generate", "process", "analyze", "run"]
+
+# Source files whose code shapes each cached stage's outputs
+PROCESS_STAGE_MODULES = ["data_processor.py", "aggregation.py", "sketches.py", "dedup.py", "incremental.py",
+                         "event_store.py", "output_sinks.py", "telemetry_schema.py", "config_loader.py"]
+ANALYSIS_STAGE_MODULES = ["ai_analyzer.py", "aggregation.py", "sketches.py", "incremental.py", "event_store.py",
+                          "output_sinks.py", "config_loader.py", "response_cache.py", "llm_backends.py",
+                          "mock_llm_server.py", "rate_limiter.py", "segments.py"]
+
+# AI stage outputs; every other file in data/processed belongs to the processing stage
+ANALYSIS_OUTPUTS = ["ai_analysis.json", "segment_analysis.ndjson"]
+# Processed files the AI stage reads, fingerprinted for its cache key (plus the raw endpoint registry)
+ANALYSIS_INPUTS = ["insights_summary.json", "partials/manifest.json", "columnar/manifest.json"]
+ANALYSIS_RAW_INPUTS = ["endpoints_registry.csv"]
+
+# Finished days the generator may get ahead of processing when the two are pipelined
+PIPELINE_QUEUE_DAYS = 2
+
+# Most events per day generated from the config without --memory-limit; larger configured
+# workloads (the fleet-scale default is 15M) must be sized with --memory-limit or --events
+UNBOUNDED_MAX_DAILY_EVENTS = 1000000
+
+def import_stage(module):
+    """Import a stage module on first use, exiting with a hint when its dependencies are missing"""
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        print(f"Import error: {e}")
+        print("Please ensure all required Python packages are installed.")
+        sys.exit(1)
+
+def memory_size(text):
+    """--memory-limit value in bytes (see memory_budget.parse_memory_size)"""
+    return import_stage("memory_budget").parse_memory_size(text)
+
 class CyberSecPipeline:
-    def __init__(self):
+    def __init__(self, cache_max_bytes=DEFAULT_CACHE_BYTES, profile_top=0, trace_memory=False, run_options=None):
         self.base_path = os.path.dirname(os.path.abspath(__file__))
         self.data_path = os.path.join(self.base_path, "data")
         self.raw_data_path = os.path.join(self.data_path, "raw")
         self.processed_data_path = os.path.join(self.data_path, "processed")
+        self.stage_cache = StageCache(os.path.join(self.data_path, "cache"), max_bytes=cache_max_bytes)
+        # Aggregate tables handed from processing to AI analysis in memory
+        self.aggregates = None
+        # Per-stage measurements, saved as run_metrics.json next to the processed outputs
+        self.metrics = RunMetrics(profile_top=profile_top, trace_memory=trace_memory,
+                                  profiles_path=os.path.join(self.processed_data_path, PROFILES_DIR),
+                                  options=run_options)
         
         # Ensure directories exist
         os.makedirs(self.raw_data_path, exist_ok=True)
         os.makedirs(self.processed_data_path, exist_ok=True)
     
-    def generate_data(self, num_events=50000):
-        """Generate sample telemetry data"""
+    def source_paths(self, modules):
+        return [os.path.join(self.base_path, 'src', module) for module in modules]
+    
+    def process_outputs(self):
+        return list_files(self.processed_data_path, exclude=ANALYSIS_OUTPUTS + [RUN_METRICS_NAME, PROFILES_DIR])
+    
+    def process_stage_key(self, processor):
+        """Cache key over raw file contents, processing settings and code"""
+        raw_files = list_files(self.raw_data_path)
+        return stage_key(
+            "process",
+            self.stage_cache.fingerprint(self.raw_data_path, raw_files),
+            {"distinct_mode": processor.distinct_mode, "hll_precision": processor.hll_precision,
+             "quantile_accuracy": processor.quantile_accuracy, "export": processor.export,
+             "thresholds": processor.thresholds},
+            self.stage_cache.code_version(self.source_paths(PROCESS_STAGE_MODULES))
+        )
+    
+    def analysis_stage_key(self, analyzer):
+        """Cache key over the processed data the analyzer reads, AI settings and code"""
+        return stage_key(
+            "analysis",
+            self.stage_cache.fingerprint(self.processed_data_path, ANALYSIS_INPUTS),
+            self.stage_cache.fingerprint(self.raw_data_path, ANALYSIS_RAW_INPUTS),
+            {"ai_enabled": analyzer.backend.available, "ai_analysis": analyzer.settings},
+            self.stage_cache.code_version(self.source_paths(ANALYSIS_STAGE_MODULES))
+        )
+    
+    def load_processed_json(self, name):
+        with open(os.path.join(self.processed_data_path, name), 'r') as f:
+            return json.load(f)
+    
+    def generate_data(self, num_events=None, days=7, workers=1, seed=None, shards_per_day=1,
+                      output_formats=("json", "csv"), compress=False, split_by_type=True, day_written=None,
+                      chunk_size=None):
+        """Generate sample telemetry data (day_written is called with each date once its files are complete)
+
+        num_events is the mean number of events per day (the configured daily_events when None)
+        and chunk_size the events generated per batch (data_generator.DEFAULT_CHUNK_SIZE when None).
+        """
         print("=" * 60)
         print("STEP 1: GENERATING SAMPLE TELEMETRY DATA")
         print("=" * 60)
         
-        generator = TelemetryDataGenerator()
+        generation = import_stage("data_generator")
+        generator = generation.TelemetryDataGenerator()
+        num_events = num_events or generator.daily_events
         
-        print(f"Generating telemetry data for {num_events} events per day...")
+        print(f"Generating telemetry data for {num_events:,} events per day "
+              f"across {generator.endpoints:,} endpoints...")
         start_time = time.time()
         
-        generator.generate_sample_datasets(self.raw_data_path)
+        with self.metrics.stage("generate") as stage:
+            stage["rows"] = generator.generate_sample_datasets(
+                self.raw_data_path,
+                days=days,
+                workers=workers,
+                seed=seed,
+                shards_per_day=shards_per_day,
+                output_formats=output_formats,
+                compress=compress,
+                split_by_type=split_by_type,
+                day_written=day_written,
+                daily_events=num_events,
+                chunk_size=chunk_size or generation.DEFAULT_CHUNK_SIZE
+            )
         
         end_time = time.time()
         print(f"✅ Data generation completed in {end_time - start_time:.2f} seconds")
@@ -52,21 +156,44 @@ class CyberSecPipeline:
         
         return True
     
-    def process_data(self):
-        """Process and clean the raw data"""
+    def process_data(self, incremental=True, distinct_mode="hll", hll_precision=14, workers=1, use_cache=True,
+                     arrivals=None, merge_batch_inputs=None):
+        """Process and clean the raw data, reusing cached outputs when raw data, settings and code are unchanged
+
+        With arrivals (dates yielded as a concurrent generator finishes them),
+        processing starts before the raw data is complete, so the cache can
+        only be stored afterwards, not restored.
+        """
         print("\n" + "=" * 60)
         print("STEP 2: PROCESSING AND ANALYZING DATA")
         print("=" * 60)
         
-        processor = TelemetryDataProcessor(
+        processor = import_stage("data_processor").TelemetryDataProcessor(
             raw_data_path=self.raw_data_path,
-            processed_data_path=self.processed_data_path
+            processed_data_path=self.processed_data_path,
+            distinct_mode=distinct_mode,
+            hll_precision=hll_precision,
+            merge_batch_inputs=merge_batch_inputs or import_stage("aggregation").DEFAULT_MERGE_BATCH_INPUTS
         )
         
-        print("Processing raw telemetry data...")
         start_time = time.time()
-        
-        insights = processor.process_all_data()
+        with self.metrics.stage("process") as stage:
+            key = self.process_stage_key(processor) if arrivals is None else None
+            if key and use_cache and incremental and self.stage_cache.restore(
+                    "process", key, self.processed_data_path, self.process_outputs()):
+                print(f"♻️  Raw data, settings and code unchanged - reused cached processing results "
+                      f"({time.time() - start_time:.2f} seconds)")
+                stage["cached"] = True
+                return self.load_processed_json("insights_summary.json")
+            
+            print("Processing raw telemetry data...")
+            insights = processor.process_all_data(incremental=incremental, workers=workers, arrivals=arrivals)
+            self.aggregates = processor.aggregates
+            stage["steps"] = processor.steps.to_dict()
+            if insights:
+                stage["rows"] = insights['overview']['total_events']
+                key = key or self.process_stage_key(processor)
+                self.stage_cache.store("process", key, self.processed_data_path, self.process_outputs())
         
         end_time = time.time()
         print(f"✅ Data processing completed in {end_time - start_time:.2f} seconds")
@@ -74,24 +201,145 @@ class CyberSecPipeline:
         
         return insights
     
-    def run_ai_analysis(self):
-        """Run AI-powered analysis"""
-        print("\n" + "=" * 60)
-        print("STEP 3: AI-POWERED ANALYSIS")
-        print("=" * 60)
+    def generate_and_process(self, num_events=None, days=7, workers=1, seed=None, shards_per_day=1,
+                             output_formats=("json", "csv"), compress=False, split_by_type=True,
+                             incremental=True, distinct_mode="hll", hll_precision=14, use_cache=True,
+                             chunk_size=None, merge_batch_inputs=None):
+        """Generate and process concurrently, processing each day while later days are generated
+
+        The generator runs on a producer thread and puts each finished date on
+        a bounded queue that processing consumes. Once processing falls
+        PIPELINE_QUEUE_DAYS days behind, the generator blocks on the full
+        queue, so it never runs further ahead than that. Days travel as files
+        on disk; only their dates are queued.
+        """
+        days_ready = queue.Queue(maxsize=PIPELINE_QUEUE_DAYS)
+        stopped = threading.Event()
+        failure = []
+        generation_time = []
+        
+        def day_written(date):
+            if stopped.is_set():
+                raise RuntimeError("processing stopped - abandoning generation")
+            days_ready.put(date)
         
-        analyzer = AITelemetryAnalyzer(processed_data_path=self.processed_data_path)
+        def produce():
+            start_time = time.time()
+            try:
+                self.generate_data(num_events, days=days, workers=workers, seed=seed,
+                                   shards_per_day=shards_per_day, output_formats=output_formats,
+                                   compress=compress, split_by_type=split_by_type, day_written=day_written,
+                                   chunk_size=chunk_size)
+            except Exception as e:
+                failure.append(e)
+            finally:
+                generation_time.append(time.time() - start_time)
+                days_ready.put(None)
+        
+        waited = []
+        
+        def arrivals():
+            while True:
+                start_time = time.time()
+                date = days_ready.get()
+                waited.append(time.time() - start_time)
+                if date is None:
+                    return
+                yield date
         
-        print("Running AI analysis on processed data...")
         start_time = time.time()
+        producer = threading.Thread(target=produce, name="generator", daemon=True)
+        producer.start()
+        try:
+            insights = self.process_data(incremental=incremental, distinct_mode=distinct_mode,
+                                         hll_precision=hll_precision, workers=workers, use_cache=use_cache,
+                                         arrivals=arrivals(), merge_batch_inputs=merge_batch_inputs)
+        finally:
+            # Let a generator blocked on the queue finish if processing stopped early
+            stopped.set()
+            while producer.is_alive():
+                try:
+                    days_ready.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+        if failure:
+            raise failure[0]
         
-        # Try real AI analysis first, fall back to mock if needed
+        # Processing time spent idle shows whether generation or processing is the bottleneck
+        self.metrics.annotate("process", waited_for_generation_seconds=round(sum(waited), 3))
+        elapsed = time.time() - start_time
+        print(f"⏱️  Pipelined generation + processing: {elapsed:.2f} seconds "
+              f"(generation alone took {generation_time[0]:.2f} seconds)")
+        return insights
+    
+    def save_run_metrics(self):
+        """Write run_metrics.json next to the processed outputs and show where processing spent its time"""
+        path = self.metrics.save(os.path.join(self.processed_data_path, RUN_METRICS_NAME))
+        steps = self.metrics.stages.get("process", {}).get("steps")
+        if steps:
+            print("⏱️  Processing steps: " + ", ".join(
+                f"{name} {step['wall_seconds']:.2f}s ({step['share_of_wall']:.0%})" for name, step in steps.items()))
+        print(f"📈 Run metrics saved to: {path}")
+    
+    def analysis_outputs(self):
+        return [name for name in ANALYSIS_OUTPUTS if os.path.exists(os.path.join(self.processed_data_path, name))]
+    
+    def run_ai_analysis(self, use_cache=True, bypass_response_cache=False, insights=None, llm_backend=None,
+                        segment_analysis=None, stream=None):
+        """Run AI-powered analysis, reusing the cached analysis when its inputs are unchanged
+
+        bypass_response_cache sends every prompt to the API even when an
+        identical request has a cached response (and so also skips the stage cache).
+        llm_backend overrides the configured backend; without an API key the
+        local mock backend answers instead. segment_analysis overrides whether
+        each department, OS and high-risk cohort is analyzed too, and stream
+        whether completions are streamed.
+        """
+        print("\n" + "=" * 60)
+        print("STEP 3: AI-POWERED ANALYSIS")
+        print("=" * 60)
+        
+        settings = ai_settings(load_config())
+        if llm_backend:
+            settings['backend'] = llm_backend
+        if segment_analysis is not None:
+            settings['segment_analysis'] = segment_analysis
+        if stream is not None:
+            settings['stream'] = stream
+        if settings['backend'] == 'openai' and not os.getenv('OPENAI_API_KEY'):
+            print("⚠️  No OpenAI API key configured - using the local mock LLM backend")
+            settings['backend'] = 'mock'
+        analyzer = import_stage("ai_analyzer").AITelemetryAnalyzer(processed_data_path=self.processed_data_path, settings=settings,
+                                       bypass_response_cache=bypass_response_cache)
         try:
-            ai_results = analyzer.run_comprehensive_analysis()
-        except Exception as e:
-            print(f"⚠️  Real AI analysis failed: {e}")
-            print("🔄 Generating mock AI analysis for demonstration...")
-            ai_results = analyzer.generate_mock_analysis()
+            return self.run_analysis_stage(analyzer, use_cache, bypass_response_cache, insights)
+        finally:
+            analyzer.close()
+    
+    def run_analysis_stage(self, analyzer, use_cache, bypass_response_cache, insights):
+        """Restore the cached analysis for the analyzer's inputs, or run it and cache the results"""
+        start_time = time.time()
+        with self.metrics.stage("analysis") as stage:
+            key = self.analysis_stage_key(analyzer)
+            if use_cache and not bypass_response_cache and self.stage_cache.restore(
+                    "analysis", key, self.processed_data_path, self.analysis_outputs()):
+                print("♻️  Processed data, settings and code unchanged - reused cached AI analysis")
+                stage["cached"] = True
+                return self.load_processed_json("ai_analysis.json")
+            
+            print("Running AI analysis on processed data...")
+            
+            try:
+                ai_results = analyzer.run_comprehensive_analysis(aggregates=self.aggregates, insights=insights)
+                # Failed API calls are reported inline; only complete analyses are cached
+                if ai_results.get('analysis_metadata', {}).get('status') == 'complete':
+                    self.stage_cache.store("analysis", key, self.processed_data_path, self.analysis_outputs())
+            except Exception as e:
+                print(f"⚠️  AI analysis failed: {e}")
+                ai_results = {"error": str(e)}
+                stage["status"] = "failed"
+            stage["llm_calls"] = llm_call_summary(analyzer.calls)
         
         end_time = time.time()
         print(f"✅ AI analysis completed in {end_time - start_time:.2f} seconds")
@@ -129,22 +377,41 @@ class CyberSecPipeline:
         print(f"   Open: file://{web_path}")
         print(f"   Or run: python -m http.server 8000 (from web/ directory)")
     
-    def run_full_pipeline(self, num_events=50000):
-        """Run the complete analysis pipeline"""
+    def run_full_pipeline(self, num_events=None, days=7, workers=1, seed=None, shards_per_day=1,
+                          output_formats=("json", "csv"), compress=False, split_by_type=True,
+                          incremental=True, distinct_mode="hll", hll_precision=14, use_cache=True,
+                          bypass_response_cache=False, llm_backend=None, segment_analysis=None, stream=None,
+                          pipelined=False, chunk_size=None, merge_batch_inputs=None):
+        """Run the complete analysis pipeline (with pipelined, generation and processing overlap)"""
         print("🚀 CYBERSECURITY TELEMETRY ANALYSIS PIPELINE")
         print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
         pipeline_start = time.time()
         
         try:
-            # Step 1: Generate Data
-            self.generate_data(num_events)
-            
-            # Step 2: Process Data
-            insights = self.process_data()
+            if pipelined:
+                # Steps 1 and 2 together: process each day as soon as it is generated
+                insights = self.generate_and_process(num_events, days=days, workers=workers, seed=seed,
+                                                     shards_per_day=shards_per_day, output_formats=output_formats,
+                                                     compress=compress, split_by_type=split_by_type,
+                                                     incremental=incremental, distinct_mode=distinct_mode,
+                                                     hll_precision=hll_precision, use_cache=use_cache,
+                                                     chunk_size=chunk_size, merge_batch_inputs=merge_batch_inputs)
+            else:
+                # Step 1: Generate Data
+                self.generate_data(num_events, days=days, workers=workers, seed=seed,
+                                   shards_per_day=shards_per_day, output_formats=output_formats,
+                                   compress=compress, split_by_type=split_by_type, chunk_size=chunk_size)
+                
+                # Step 2: Process Data
+                insights = self.process_data(incremental=incremental, distinct_mode=distinct_mode,
+                                             hll_precision=hll_precision, workers=workers, use_cache=use_cache,
+                                             merge_batch_inputs=merge_batch_inputs)
             
             # Step 3: AI Analysis
-            ai_results = self.run_ai_analysis()
+            ai_results = self.run_ai_analysis(use_cache=use_cache, bypass_response_cache=bypass_response_cache,
+                                              insights=insights, llm_backend=llm_backend,
+                                              segment_analysis=segment_analysis, stream=stream)
             
             # Display Summary
             self.display_summary(insights, ai_results)
@@ -166,41 +433,185 @@ class CyberSecPipeline:
         print("🎯 RUNNING QUICK DEMO MODE")
         return self.run_full_pipeline(num_events=10000)
 
-def main():
+def legacy_argv(argv):
+    """Arguments with the pre-subcommand modes (--full, --generate-only, --demo or none) mapped to commands"""
+    if not argv or argv[0] not in COMMANDS + ['-h', '--help']:
+        command = 'generate' if '--generate-only' in argv else 'run'
+        argv = [command] + [arg for arg in argv if arg not in ('--full', '--generate-only')]
+    return argv
+
+def build_parser():
+    """Command-line parser with one subcommand per stage plus run for the whole pipeline"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--profile', type=int, nargs='?', const=DEFAULT_PROFILE_TOP, default=None, metavar='N',
+                        help='Profile each stage with cProfile: stats in data/processed/profiles, '
+                             f'top N hot functions in run_metrics.json (default N: {DEFAULT_PROFILE_TOP})')
+    common.add_argument('--trace-memory', action='store_true',
+                        help='Record the tracemalloc peak of Python allocations per stage (slows the run)')
+    
+    workload = argparse.ArgumentParser(add_help=False)
+    workload.add_argument('--workers', type=int, default=None,
+                          help='Worker processes for data generation and processing (default: 1, or with '
+                               '--memory-limit as many as the CPUs and the limit allow)')
+    workload.add_argument('--memory-limit', type=memory_size, default=None, metavar='SIZE',
+                          help='Memory to stay within, e.g. 16G: sizes workers, generation chunks, shards per day '
+                               'and partial merges from per-row costs estimated from the schema')
+    
+    generation = argparse.ArgumentParser(add_help=False)
+    generation.add_argument('--events', type=int, default=None,
+                            help='Mean number of events to generate per day (default: data_generation.daily_events '
+                                 'in config/config.yaml)')
+    generation.add_argument('--days', type=int, default=None,
+                            help='Number of days of telemetry to generate (default: data_generation.simulation_days)')
+    generation.add_argument('--seed', type=int, default=None,
+                            help='Master seed for reproducible generation')
+    generation.add_argument('--shards-per-day', type=int, default=1,
+                            help='Split each day into this many parallel shards (default: 1)')
+    generation.add_argument('--raw-formats', nargs='+', default=None,
+                            choices=['json', 'ndjson', 'csv', 'columnar'],
+                            help='Raw telemetry output formats (default: data_generation.output_formats)')
+    generation.add_argument('--compress', action='store_true',
+                            help='Gzip-compress raw telemetry files')
+    generation.add_argument('--wide-raw', action='store_true',
+                            help='Write one wide raw file per day instead of per-event-type tables')
+    
+    processing = argparse.ArgumentParser(add_help=False)
+    processing.add_argument('--full-reprocess', action='store_true',
+                            help='Reprocess every raw file instead of only new or changed ones')
+    processing.add_argument('--exact-distinct', action='store_true',
+                            help='Count active/unique endpoints exactly instead of with HyperLogLog sketches')
+    processing.add_argument('--hll-precision', type=int, default=14,
+                            help='HyperLogLog precision, 2^p registers per sketch (default: 14)')
+    
+    analysis = argparse.ArgumentParser(add_help=False)
+    analysis.add_argument('--no-response-cache', action='store_true',
+                          help='Call the AI API for every prompt instead of reusing cached responses')
+    analysis.add_argument('--llm-backend', choices=sorted(LLM_BACKENDS), default=None,
+                          help='AI backend: openai, or mock for the bundled local server (default: from config)')
+    analysis.add_argument('--segment-analysis', action='store_true', default=None,
+                          help='Also analyze each department, OS and high-risk endpoint cohort')
+    analysis.add_argument('--stream', action='store_true', default=None,
+                          help='Stream AI completions (records time to first token and tokens/sec per call)')
+    
+    caching = argparse.ArgumentParser(add_help=False)
+    caching.add_argument('--no-cache', action='store_true',
+                         help='Rerun processing and AI analysis even when their inputs are unchanged')
+    caching.add_argument('--cache-size-mb', type=int, default=DEFAULT_CACHE_BYTES >> 20,
+                         help='Disk budget for cached stage generations in MB (default: %(default)s)')
+    
     parser = argparse.ArgumentParser(
         description="Cybersecurity Telemetry Analysis Pipeline",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
-  python main.py --full                    # Run complete pipeline
-  python main.py --demo                    # Quick demo with smaller dataset
-  python main.py --generate-only           # Only generate data
-  python main.py --events 25000            # Custom number of events
+  python main.py run --memory-limit 16G    # Run complete pipeline at the configured scale within 16 GB
+  python main.py run --demo                # Quick demo with smaller dataset
+  python main.py generate --events 50000   # Only generate data
+  python main.py process                   # Only process the raw data in data/raw
+  python main.py analyze                   # Only run AI analysis of the processed data
+  python main.py run --events 25000        # Custom number of events (default: from config/config.yaml)
+  python main.py generate --days 30 --workers 8 --seed 42   # Reproducible 30-day corpus
+
+The pre-subcommand flags still work: --full runs the pipeline, --generate-only generates and --demo runs the demo.
+No arguments runs the pipeline. Configured workloads above 1M events/day need --memory-limit or --events.
+Run "python main.py COMMAND --help" for each command's options.
         """
     )
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.add_parser('generate', parents=[common, workload, generation],
+                        help='Generate sample telemetry into data/raw')
+    commands.add_parser('process', parents=[common, workload, processing, caching],
+                        help='Process data/raw into data/processed')
+    commands.add_parser('analyze', parents=[common, analysis, caching],
+                        help='Run AI analysis of data/processed')
+    run = commands.add_parser('run', parents=[common, workload, generation, processing, analysis, caching],
+                              help='Run the complete pipeline')
+    run.add_argument('--pipelined', action='store_true',
+                     help='Process each generated day while later days are still being generated')
+    run.add_argument('--demo', action='store_true',
+                     help='Run quick demo with smaller dataset')
+    return parser
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args(legacy_argv(sys.argv[1:]))
     
-    parser.add_argument('--full', action='store_true', 
-                       help='Run the complete pipeline')
-    parser.add_argument('--demo', action='store_true',
-                       help='Run quick demo with smaller dataset')
-    parser.add_argument('--generate-only', action='store_true',
-                       help='Only generate sample data')
-    parser.add_argument('--events', type=int, default=50000,
-                       help='Number of events to generate per day (default: 50000)')
-    
-    args = parser.parse_args()
+    # Workload size from the data_generation config, unless given on the command line
+    generation = generation_settings(load_config())
+    num_events = getattr(args, 'events', None) or generation['daily_events']
+    days = getattr(args, 'days', None) or generation['simulation_days']
+    raw_formats = getattr(args, 'raw_formats', None) or generation['output_formats']
+    split_by_type = not getattr(args, 'wide_raw', False)
+    workers, shards_per_day = getattr(args, 'workers', None) or 1, getattr(args, 'shards_per_day', 1)
+    chunk_size, merge_batch_inputs = None, None
+    memory_plan = None
+    generates = args.command == 'generate' or (args.command == 'run' and not args.demo)
+    if generates and not args.events and not args.memory_limit and num_events > UNBOUNDED_MAX_DAILY_EVENTS:
+        print(f"❌ data_generation.daily_events is {num_events:,} per day ({num_events * days:,} events over "
+              f"{days} days): pass --memory-limit (e.g. 16G) to size the run, or --events for a smaller one")
+        sys.exit(1)
+    if getattr(args, 'memory_limit', None):
+        try:
+            memory_plan = import_stage("memory_budget").MemoryBudget(args.memory_limit).plan(
+                num_events, generation['endpoints'], workers=args.workers, shards_per_day=shards_per_day,
+                output_formats=raw_formats, split_by_type=split_by_type,
+                pipelined=getattr(args, 'pipelined', False)
+            )
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        workers, shards_per_day = memory_plan['workers'], memory_plan['shards_per_day']
+        chunk_size, merge_batch_inputs = memory_plan['chunk_size'], memory_plan['merge_batch_inputs']
+        if args.command == 'process':
+            # Raw data already on disk keeps its layout; only workers and merges follow the plan
+            layout = f"partial aggregates merged {merge_batch_inputs} inputs at a time"
+        else:
+            layout = (f"chunks of {chunk_size:,} events, {shards_per_day} shard(s) per day"
+                      f"{' (spilling each day to disk partitions)' if memory_plan['spill'] else ''}")
+        print(f"🧮 Memory plan for {memory_plan['memory_limit_mb']:,} MB: {workers} worker(s), {layout}, "
+              f"estimated peak {memory_plan['estimated_peak_mb']:,} MB")
     
-    pipeline = CyberSecPipeline()
+    pipeline = CyberSecPipeline(cache_max_bytes=getattr(args, 'cache_size_mb', DEFAULT_CACHE_BYTES >> 20) << 20,
+                                profile_top=args.profile or 0, trace_memory=args.trace_memory,
+                                run_options=dict(vars(args), memory_plan=memory_plan))
     
-    if args.demo:
+    if args.command == 'generate':
+        success = pipeline.generate_data(num_events, days=days, workers=workers,
+                                         seed=args.seed, shards_per_day=shards_per_day,
+                                         output_formats=raw_formats, compress=args.compress,
+                                         split_by_type=split_by_type, chunk_size=chunk_size)
+    elif args.command == 'process':
+        success = pipeline.process_data(incremental=not args.full_reprocess,
+                                        distinct_mode='exact' if args.exact_distinct else 'hll',
+                                        hll_precision=args.hll_precision, workers=workers,
+                                        use_cache=not args.no_cache,
+                                        merge_batch_inputs=merge_batch_inputs) is not None
+    elif args.command == 'analyze':
+        ai_results = pipeline.run_ai_analysis(use_cache=not args.no_cache,
+                                              bypass_response_cache=args.no_response_cache,
+                                              llm_backend=args.llm_backend,
+                                              segment_analysis=args.segment_analysis, stream=args.stream)
+        success = 'error' not in ai_results
+    elif args.demo:
         success = pipeline.run_quick_demo()
-    elif args.generate_only:
-        success = pipeline.generate_data(args.events)
-    elif args.full or len(sys.argv) == 1:  # Default to full pipeline
-        success = pipeline.run_full_pipeline(args.events)
     else:
-        parser.print_help()
-        return
+        success = pipeline.run_full_pipeline(num_events, days=days, workers=workers,
+                                             seed=args.seed, shards_per_day=shards_per_day,
+                                             output_formats=raw_formats, compress=args.compress,
+                                             split_by_type=split_by_type,
+                                             incremental=not args.full_reprocess,
+                                             distinct_mode='exact' if args.exact_distinct else 'hll',
+                                             hll_precision=args.hll_precision,
+                                             use_cache=not args.no_cache,
+                                             bypass_response_cache=args.no_response_cache,
+                                             llm_backend=args.llm_backend,
+                                             segment_analysis=args.segment_analysis,
+                                             stream=args.stream,
+                                             pipelined=args.pipelined,
+                                             chunk_size=chunk_size,
+                                             merge_batch_inputs=merge_batch_inputs)
+    
+    pipeline.save_run_metrics()
     
     if success:
         print("\n🎉 Ready for your interview! The dashboard showcases:")
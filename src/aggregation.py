@@ -0,0 +1,613 @@
+"""
+Telemetry Aggregation Engine
+Computes daily, endpoint, threat, hourly and pain-point metrics in one pass
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from config_loader import DEFAULT_THRESHOLD_SETTINGS
+from sketches import (
+    DEFAULT_HLL_PRECISION, DEFAULT_QUANTILE_ACCURACY, HyperLogLog, grouped_bucket_counts,
+    grouped_quantiles, grouped_registers, hash_values, quantile_buckets
+)
+
+# How active/unique endpoint counts are kept: exact (date, endpoint) pairs, or
+# mergeable HyperLogLog sketches
+DISTINCT_MODES = ["hll", "exact"]
+
+# Largest day x endpoint bitmap used to count active endpoints per day; bigger
+# grids fall back to sorting the (day, endpoint) keys
+MAX_ACTIVE_BITMAP_CELLS = 1 << 26
+
+# Version of the partial aggregate layout; persisted partials of another version are rebuilt
+PARTIALS_VERSION = 2
+
+# Group columns of each partial aggregate frame; every other column is a moment
+# (<field>_count/_sum/_sumsq/_min/_max), an event count or a serialized sketch
+# (<name>_hll), merged by merge_rule()
+PARTIAL_KEYS = {
+    "daily": ["date"],
+    "daily_endpoints": ["date", "endpoint_id"],
+    "endpoint": ["endpoint_id"],
+    "threat": ["threat_type", "severity"],
+    "feedback": ["feedback_type", "sentiment"],
+    "hourly": ["hour"],
+    "totals": [],
+    "endpoint_quantiles": ["endpoint_id", "field", "bucket"],
+    "hourly_quantiles": ["hour", "field", "bucket"],
+    "quantiles": ["field", "bucket"]
+}
+
+# Source fields reduced per grouping (sums, or means from sums and counts)
+DAILY_SCAN_FIELDS = ["cpu_usage_avg", "memory_usage_mb"]
+ENDPOINT_SCAN_SUMS = ["threats_found", "threats_cleaned"]
+ENDPOINT_SCAN_MEANS = ["scan_duration", "cpu_usage_avg"]
+HOURLY_PERFORMANCE_FIELDS = ["cpu_usage", "memory_usage", "antivirus_cpu_impact"]
+
+# Fields with p50/p95/p99 from quantile sketches, by source table
+QUANTILE_FIELDS = {
+    "scan": ["scan_duration"],
+    "performance": ["cpu_usage", "memory_usage", "antivirus_cpu_impact", "boot_time_seconds"]
+}
+QUANTILE_FIELD_NAMES = [field for fields in QUANTILE_FIELDS.values() for field in fields]
+
+# Inputs' partials merged at a time by merge_partials_in_batches()
+DEFAULT_MERGE_BATCH_INPUTS = 16
+
+# Decimals of raw float32 fields (percentages with two decimals) that survive float32:
+# its 24-bit mantissa is exact to about 1e-5 below 1,000
+FLOAT32_DECIMALS = 4
+
+# Overall percentiles reported alongside each pain point
+PAIN_POINT_PERCENTILES = {
+    "avg_cpu_impact": ["antivirus_cpu_impact", "cpu_usage", "memory_usage", "boot_time_seconds"],
+    "scan_failure_rate": ["scan_duration"]
+}
+
+
+def float_values(series: pd.Series) -> np.ndarray:
+    """A column as float64 with NaN for nulls, including boolean and boolean-like text columns
+
+    float32 columns are rounded to FLOAT32_DECIMALS, restoring the decimal
+    values that were written instead of their nearest float32 (30.255, not
+    30.255000114440918), so sums and means match a float64 load.
+    """
+    if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)):
+        series = series.astype(str).str.lower().map({"true": 1.0, "false": 0.0})
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    if series.dtype == np.float32 or series.dtype == pd.Float32Dtype():
+        values = np.round(values, FLOAT32_DECIMALS)
+    return values
+
+
+def category_codes(series: pd.Series):
+    """Integer codes and labels for a column (category order, else sorted values); -1 marks nulls"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), list(series.cat.categories)
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes, list(uniques)
+
+
+def grouped_moments(codes: np.ndarray, size: int, values: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per-group NaN-skipping count, sum, sum of squares, min and max of each value array"""
+    moments = {}
+    for name, array in values.items():
+        valid = ~np.isnan(array)
+        group_codes, array = codes[valid], array[valid]
+        minimum = np.full(size, np.inf)
+        maximum = np.full(size, -np.inf)
+        np.minimum.at(minimum, group_codes, array)
+        np.maximum.at(maximum, group_codes, array)
+        counts = np.bincount(group_codes, minlength=size)
+        moments[f"{name}_count"] = counts
+        moments[f"{name}_sum"] = np.bincount(group_codes, weights=array, minlength=size)
+        moments[f"{name}_sumsq"] = np.bincount(group_codes, weights=array * array, minlength=size)
+        moments[f"{name}_min"] = np.where(counts > 0, minimum, np.nan)
+        moments[f"{name}_max"] = np.where(counts > 0, maximum, np.nan)
+    return moments
+
+
+def overall_moments(values: Dict[str, np.ndarray]) -> Dict:
+    """Ungrouped moments of each value array, as scalars"""
+    moments = grouped_moments(np.zeros(len(next(iter(values.values()))), dtype=np.int64), 1, values)
+    return {name: moment[0] for name, moment in moments.items()}
+
+
+def ratio(numerator, denominator):
+    """Elementwise mean from sums and counts, NaN where there is nothing to average"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.asarray(denominator) > 0, np.divide(numerator, denominator), np.nan)
+
+
+class TelemetryAggregator:
+    """Single-pass aggregation over cleaned per-event-type tables
+
+    Each table's timestamps and endpoint ids are converted once into day, hour
+    and endpoint integer codes shared by every output, and all metrics are
+    then bincount reductions over those codes. Cost is linear in the number
+    of rows with no per-group Python work.
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame], distinct_mode: str = "hll",
+                 hll_precision: int = DEFAULT_HLL_PRECISION, quantile_accuracy: float = DEFAULT_QUANTILE_ACCURACY,
+                 thresholds: Dict[str, float] = None):
+        if distinct_mode not in DISTINCT_MODES:
+            raise ValueError(f"Unsupported distinct mode: {distinct_mode}")
+        self.tables = {event_type: table for event_type, table in tables.items() if not table.empty}
+        self.distinct_mode = distinct_mode
+        self.hll_precision = hll_precision
+        self.quantile_accuracy = quantile_accuracy
+        self.thresholds = thresholds
+        self._build_keys()
+
+    def _build_keys(self):
+        """Precompute day, hour and global endpoint codes for every table"""
+        vocabularies = []
+        for table in self.tables.values():
+            endpoint_ids = table["endpoint_id"]
+            if isinstance(endpoint_ids.dtype, pd.CategoricalDtype):
+                vocabularies.append(np.asarray(endpoint_ids.cat.categories, dtype=object))
+            else:
+                vocabularies.append(pd.unique(endpoint_ids.dropna().to_numpy(dtype=object)))
+        self.endpoints = pd.Index(
+            np.concatenate(vocabularies) if vocabularies else np.array([], dtype=object)
+        ).unique().astype(str).sort_values()
+
+        self.keys = {}
+        for event_type, table in list(self.tables.items()):
+            endpoint_ids = table["endpoint_id"]
+            if isinstance(endpoint_ids.dtype, pd.CategoricalDtype):
+                mapping = self.endpoints.get_indexer(endpoint_ids.cat.categories.astype(str))
+                endpoint_codes = np.where(endpoint_ids.cat.codes.to_numpy() >= 0,
+                                          mapping[endpoint_ids.cat.codes.to_numpy()], -1)
+            else:
+                endpoint_codes = self.endpoints.get_indexer(endpoint_ids.astype(str))
+                endpoint_codes[endpoint_ids.isna().to_numpy()] = -1
+
+            timestamps = table["timestamp"]
+            if not pd.api.types.is_datetime64_any_dtype(timestamps):
+                timestamps = pd.to_datetime(timestamps)
+            timestamps = timestamps.to_numpy()
+            valid = (endpoint_codes >= 0) & ~np.isnat(timestamps)
+            if not valid.all():
+                table = self.tables[event_type] = table[valid].reset_index(drop=True)
+                endpoint_codes, timestamps = endpoint_codes[valid], timestamps[valid]
+
+            days = timestamps.astype("datetime64[D]")
+            self.keys[event_type] = {
+                "day": days.astype(np.int64),
+                "hour": ((timestamps - days) // np.timedelta64(1, "h")).astype(np.int64),
+                "endpoint": endpoint_codes.astype(np.int64)
+            }
+
+        day_values = [keys["day"] for keys in self.keys.values() if len(keys["day"])]
+        self.first_day = int(min(days.min() for days in day_values)) if day_values else 0
+        self.num_days = int(max(days.max() for days in day_values)) - self.first_day + 1 if day_values else 0
+        for keys in self.keys.values():
+            keys["day"] = keys["day"] - self.first_day
+
+    def _label_frame(self, labels: Dict, moments: Dict[str, np.ndarray], rows: np.ndarray) -> pd.DataFrame:
+        frame = dict(labels)
+        frame.update({name: values[rows] for name, values in moments.items()})
+        return pd.DataFrame(frame)
+
+    def _category_pairs(self, table: pd.DataFrame, first: str, second: str,
+                        values: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """Event counts and value moments per observed (first, second) category pair"""
+        first_codes, first_labels = category_codes(table[first])
+        second_codes, second_labels = category_codes(table[second])
+        valid = (first_codes >= 0) & (second_codes >= 0)
+        group_codes = first_codes[valid].astype(np.int64) * len(second_labels) + second_codes[valid]
+        size = len(first_labels) * len(second_labels)
+        moments = {"events": np.bincount(group_codes, minlength=size)}
+        moments.update(grouped_moments(group_codes, size, {name: array[valid] for name, array in values.items()}))
+        observed = np.flatnonzero(moments["events"])
+        return self._label_frame({
+            first: pd.Categorical.from_codes(observed // len(second_labels), first_labels),
+            second: pd.Categorical.from_codes(observed % len(second_labels), second_labels)
+        }, moments, observed)
+
+    def partials(self) -> Dict[str, pd.DataFrame]:
+        """Mergeable partial aggregates: per-group counts, sums, sums of squares, min and max
+
+        See PARTIAL_KEYS for each frame's group columns; merge_partials()
+        combines the partials of several inputs and finalize_partials() turns
+        them into the processed outputs.
+        """
+        num_endpoints = len(self.endpoints)
+        scan_df = self.tables.get("scan")
+        threat_df = self.tables.get("threat_detection")
+        perf_df = self.tables.get("performance")
+        feedback_df = self.tables.get("user_feedback")
+
+        daily_events = np.zeros(self.num_days, dtype=np.int64)
+        endpoint_events = np.zeros(num_endpoints, dtype=np.int64)
+        for keys in self.keys.values():
+            daily_events += np.bincount(keys["day"], minlength=self.num_days)
+            endpoint_events += np.bincount(keys["endpoint"], minlength=num_endpoints)
+        active_days = np.flatnonzero(daily_events)
+        active_endpoints = np.flatnonzero(endpoint_events)
+
+        # Daily volumes over every event, resource moments over scans only
+        daily_moments = {"events": daily_events}
+        if scan_df is not None:
+            daily_moments.update(grouped_moments(
+                self.keys["scan"]["day"], self.num_days,
+                {field: float_values(scan_df[field]) for field in DAILY_SCAN_FIELDS}
+            ))
+        partials = {
+            "daily": self._label_frame({"date": self._day_dates(active_days)}, daily_moments, active_days),
+            "daily_endpoints": (self._daily_endpoint_pairs() if self.distinct_mode == "exact"
+                                else self._daily_endpoint_sketches(active_days))
+        }
+
+        # Endpoint volumes, scan outcomes and false positives
+        endpoint_moments = {"events": endpoint_events}
+        if scan_df is not None:
+            endpoint_moments.update(grouped_moments(
+                self.keys["scan"]["endpoint"], num_endpoints,
+                {field: float_values(scan_df[field]) for field in ENDPOINT_SCAN_SUMS + ENDPOINT_SCAN_MEANS}
+            ))
+        totals = {
+            "scan_events": len(scan_df) if scan_df is not None else 0,
+            "scan_failed": 0,
+            "threat_events": len(threat_df) if threat_df is not None else 0,
+            "feedback_events": len(feedback_df) if feedback_df is not None else 0,
+            "feedback_negative": 0
+        }
+        if threat_df is not None:
+            false_positive = float_values(threat_df["false_positive"])
+            endpoint_moments.update(grouped_moments(
+                self.keys["threat_detection"]["endpoint"], num_endpoints, {"false_positive": false_positive}
+            ))
+            totals.update(overall_moments({"false_positive": false_positive}))
+        partials["endpoint"] = self._label_frame(
+            {"endpoint_id": self.endpoints[active_endpoints]}, endpoint_moments, active_endpoints
+        )
+
+        # Threat type x severity, feedback type x sentiment
+        threat = {"threat_type": [], "severity": [], "events": []}
+        if threat_df is not None:
+            threat = self._category_pairs(threat_df, "threat_type", "severity", {"false_positive": false_positive})
+        partials["threat"] = pd.DataFrame(threat)
+        feedback = {"feedback_type": [], "sentiment": [], "events": []}
+        if feedback_df is not None:
+            feedback = self._category_pairs(feedback_df, "feedback_type", "sentiment",
+                                            {"resolved": float_values(feedback_df["resolved"])})
+        partials["feedback"] = pd.DataFrame(feedback)
+
+        # Hour-of-day performance
+        hourly = {"hour": [], "events": []}
+        if perf_df is not None:
+            hours = self.keys["performance"]["hour"]
+            perf_values = {field: float_values(perf_df[field]) for field in HOURLY_PERFORMANCE_FIELDS}
+            hourly_moments = {"events": np.bincount(hours, minlength=24)}
+            hourly_moments.update(grouped_moments(hours, 24, perf_values))
+            observed_hours = np.flatnonzero(hourly_moments["events"])
+            hourly = self._label_frame({"hour": observed_hours}, hourly_moments, observed_hours)
+            totals.update(overall_moments({"antivirus_cpu_impact": perf_values["antivirus_cpu_impact"]}))
+        partials["hourly"] = pd.DataFrame(hourly)
+
+        # Scan failures and negative feedback
+        if scan_df is not None:
+            totals["scan_failed"] = int((scan_df["scan_status"] != "completed").to_numpy().sum())
+        if feedback_df is not None:
+            totals["feedback_negative"] = int((feedback_df["sentiment"] == "negative").to_numpy().sum())
+        if self.distinct_mode == "hll":
+            totals["endpoints_hll"] = HyperLogLog(self.hll_precision).add_hashes(
+                hash_values(self.endpoints[active_endpoints])
+            ).to_bytes()
+        partials["totals"] = pd.DataFrame({name: [value] for name, value in totals.items()})
+
+        partials.update(self._quantile_partials())
+        return partials
+
+    def _quantile_partials(self) -> Dict[str, pd.DataFrame]:
+        """Sparse quantile-sketch bucket counts per endpoint, per hour and overall"""
+        groupings = {
+            "endpoint_quantiles": ("endpoint_id", "endpoint"),
+            "hourly_quantiles": ("hour", "hour"),
+            "quantiles": (None, None)
+        }
+        pieces = {name: [] for name in groupings}
+        for event_type, fields in QUANTILE_FIELDS.items():
+            table = self.tables.get(event_type)
+            if table is None:
+                continue
+            for field in fields:
+                values = float_values(table[field])
+                valid = ~np.isnan(values)
+                buckets = quantile_buckets(values[valid], self.quantile_accuracy)
+                for name, (label, key) in groupings.items():
+                    codes = self.keys[event_type][key][valid] if key else np.zeros(len(buckets), dtype=np.int64)
+                    group_codes, group_buckets, counts = grouped_bucket_counts(codes, buckets)
+                    piece = {}
+                    if label == "endpoint_id":
+                        piece[label] = pd.Categorical.from_codes(group_codes, self.endpoints)
+                    elif label:
+                        piece[label] = group_codes
+                    piece["field"] = pd.Categorical.from_codes(
+                        np.full(len(counts), QUANTILE_FIELD_NAMES.index(field)), QUANTILE_FIELD_NAMES
+                    )
+                    piece["bucket"] = group_buckets
+                    piece["count"] = counts
+                    pieces[name].append(pd.DataFrame(piece))
+
+        return {
+            name: (pd.concat(frames, ignore_index=True) if frames
+                   else pd.DataFrame(columns=PARTIAL_KEYS[name] + ["count"]))
+            for name, frames in pieces.items()
+        }
+
+    def _day_dates(self, day_codes: np.ndarray) -> np.ndarray:
+        return (day_codes + self.first_day).astype("datetime64[D]")
+
+    def _daily_endpoint_pairs(self) -> pd.DataFrame:
+        """Distinct (date, endpoint_id) pairs, for exact active-endpoint counts after merging"""
+        num_endpoints = len(self.endpoints)
+        if self.num_days * num_endpoints <= MAX_ACTIVE_BITMAP_CELLS:
+            seen = np.zeros(self.num_days * num_endpoints, dtype=bool)
+            for keys in self.keys.values():
+                seen[keys["day"] * num_endpoints + keys["endpoint"]] = True
+            pairs = np.flatnonzero(seen)
+        else:
+            pairs = np.unique(np.concatenate([
+                keys["day"] * num_endpoints + keys["endpoint"] for keys in self.keys.values()
+            ]))
+        return pd.DataFrame({
+            "date": self._day_dates(pairs // num_endpoints),
+            "endpoint_id": pd.Categorical.from_codes(pairs % num_endpoints, self.endpoints)
+        })
+
+    def _daily_endpoint_sketches(self, active_days: np.ndarray) -> pd.DataFrame:
+        """One serialized HyperLogLog of endpoint ids per active day"""
+        if not self.keys:
+            # Every table empty (e.g. an input whose events were all duplicates)
+            return pd.DataFrame({"date": self._day_dates(active_days), "endpoints_hll": []})
+        endpoint_hashes = hash_values(self.endpoints)
+        registers = grouped_registers(
+            np.concatenate([keys["day"] for keys in self.keys.values()]),
+            endpoint_hashes[np.concatenate([keys["endpoint"] for keys in self.keys.values()])],
+            self.num_days, self.hll_precision
+        )
+        return pd.DataFrame({
+            "date": self._day_dates(active_days),
+            "endpoints_hll": [HyperLogLog(self.hll_precision, registers[day]).to_bytes() for day in active_days]
+        })
+
+    def aggregate(self) -> Dict:
+        """Compute every output: aggregated metric frames, pain points and overview counts"""
+        return finalize_partials(self.partials(), self.quantile_accuracy, self.thresholds)
+
+
+def merge_rule(column: str):
+    """How a partial column combines across inputs"""
+    if column.endswith("_hll"):
+        return lambda sketches: HyperLogLog.merge_bytes(sketches)
+    if column.endswith("_min"):
+        return "min"
+    if column.endswith("_max"):
+        return "max"
+    return "sum"
+
+
+def merge_partials(partials_list: List[Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """Combine the partial aggregates of several inputs into one set of partials"""
+    merged = {}
+    for name, keys in PARTIAL_KEYS.items():
+        frames = [partials[name] for partials in partials_list if name in partials]
+        frames = [frame for frame in frames if not frame.empty] or frames[:1]
+        if not frames:
+            continue
+        if len(frames) == 1:
+            merged[name] = frames[0]
+            continue
+
+        combined = {}
+        for column in dict.fromkeys(column for frame in frames for column in frame.columns):
+            parts = [frame[column] for frame in frames if column in frame.columns]
+            if len(parts) == len(frames) and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+                combined[column] = pd.Series(union_categoricals(parts))
+            else:
+                combined[column] = pd.concat(
+                    [frame[column] if column in frame.columns else pd.Series(np.nan, index=frame.index)
+                     for frame in frames], ignore_index=True
+                )
+        combined = pd.DataFrame(combined)
+
+        keys = [key for key in keys if key in combined.columns]
+        values = [column for column in combined.columns if column not in keys]
+        if not keys:
+            merged[name] = pd.DataFrame({
+                column: [merge_rule(column)(combined[column]) if callable(merge_rule(column))
+                         else getattr(combined[column], merge_rule(column))()]
+                for column in values
+            })
+        elif not values:
+            merged[name] = combined.drop_duplicates(keys).reset_index(drop=True)
+        else:
+            merged[name] = combined.groupby(keys, observed=True, sort=True).agg(
+                {column: merge_rule(column) for column in values}
+            ).reset_index()
+    return merged
+
+
+def merge_partials_in_batches(partials: Iterable[Dict[str, pd.DataFrame]],
+                              batch_inputs: int = DEFAULT_MERGE_BATCH_INPUTS) -> Dict[str, pd.DataFrame]:
+    """merge_partials() over a stream of inputs, holding at most batch_inputs of them besides the running merge
+
+    Merged partials have the same layout as an input's, so each batch is
+    folded into the merge so far; memory stays bounded however many inputs
+    (days, shards, chunk partitions) there are.
+    """
+    merged, batch = [], []
+    for input_partials in partials:
+        batch.append(input_partials)
+        if len(batch) >= batch_inputs:
+            merged, batch = [merge_partials(merged + batch)], []
+    return merge_partials(merged + batch)
+
+
+def _mean(frame: pd.DataFrame, field: str) -> np.ndarray:
+    return ratio(frame[f"{field}_sum"].to_numpy(dtype=np.float64), frame[f"{field}_count"].to_numpy())
+
+
+def wide_quantiles(buckets: pd.DataFrame, group_column: str, accuracy: float) -> pd.DataFrame:
+    """Per-group percentiles as one <field>_p<NN> column per field and quantile"""
+    quantiles = grouped_quantiles(buckets, [group_column, "field"], accuracy=accuracy)
+    if quantiles.empty:
+        return pd.DataFrame(columns=[group_column])
+    quantiles["field"] = quantiles["field"].astype(str)
+    wide = quantiles.pivot(index=group_column, columns="field")
+    wide.columns = [f"{field}_{percentile}" for percentile, field in wide.columns]
+    ordered = [f"{field}_{percentile}" for field in QUANTILE_FIELD_NAMES
+               for percentile in quantiles.columns[2:] if f"{field}_{percentile}" in wide.columns]
+    return wide[ordered].round(2).reset_index()
+
+
+def finalize_partials(partials: Dict[str, pd.DataFrame], quantile_accuracy: float = DEFAULT_QUANTILE_ACCURACY,
+                      thresholds: Dict[str, float] = None) -> Dict:
+    """Turn (merged) partial aggregates into metric frames, pain points and overview counts
+
+    A pain point's status is raised when its value exceeds its threshold in
+    thresholds (percent; DEFAULT_THRESHOLD_SETTINGS for those not given).
+    """
+    thresholds = dict(DEFAULT_THRESHOLD_SETTINGS, **(thresholds or {}))
+    aggregated_data = {}
+    pain_points = {}
+    totals = partials["totals"].iloc[0]
+
+    # Daily metrics
+    daily = partials["daily"].sort_values("date").reset_index(drop=True)
+    dates = pd.to_datetime(daily["date"])
+    daily_endpoints = partials["daily_endpoints"]
+    if "endpoints_hll" in daily_endpoints.columns:
+        active = pd.Series(
+            [round(HyperLogLog.from_bytes(sketch).count()) for sketch in daily_endpoints["endpoints_hll"]],
+            index=pd.to_datetime(daily_endpoints["date"])
+        ).groupby(level=0).sum()
+    else:
+        active = daily_endpoints.groupby(pd.to_datetime(daily_endpoints["date"])).size()
+    daily_metrics = {
+        "timestamp": list(dates.dt.date),
+        "total_events": daily["events"].to_numpy(dtype=np.int64),
+        "active_endpoints": active.reindex(dates).fillna(0).to_numpy(dtype=np.int64)
+    }
+    for field in DAILY_SCAN_FIELDS:
+        if f"{field}_sum" in daily.columns:
+            daily_metrics[field] = _mean(daily, field)
+    aggregated_data["daily_metrics"] = pd.DataFrame(daily_metrics)
+
+    # Endpoint metrics
+    endpoint = partials["endpoint"]
+    endpoint = endpoint.assign(endpoint_id=endpoint["endpoint_id"].astype(str)).sort_values("endpoint_id")
+    endpoint_metrics = {
+        "endpoint_id": endpoint["endpoint_id"].to_numpy(),
+        "total_events": endpoint["events"].to_numpy(dtype=np.int64)
+    }
+    if "scan_duration_sum" in endpoint.columns:
+        for field in ENDPOINT_SCAN_SUMS:
+            endpoint_metrics[field] = endpoint[f"{field}_sum"].fillna(0).to_numpy(dtype=np.int64)
+        for field in ENDPOINT_SCAN_MEANS:
+            endpoint_metrics[field] = _mean(endpoint.fillna({f"{field}_count": 0}), field)
+    if "false_positive_sum" in endpoint.columns:
+        endpoint_metrics["false_positive"] = endpoint["false_positive_sum"].fillna(0).to_numpy(dtype=np.int64)
+        endpoint_metrics["threat_detections"] = endpoint["false_positive_count"].fillna(0).to_numpy(dtype=np.int64)
+    endpoint_quantiles = wide_quantiles(partials["endpoint_quantiles"], "endpoint_id", quantile_accuracy)
+    endpoint_quantiles["endpoint_id"] = endpoint_quantiles["endpoint_id"].astype(str)
+    aggregated_data["endpoint_metrics"] = pd.DataFrame(endpoint_metrics).merge(
+        endpoint_quantiles, on="endpoint_id", how="left"
+    )
+
+    # Threat analysis and false positive rate
+    if totals["threat_events"]:
+        threat = partials["threat"]
+        aggregated_data["threat_analysis"] = pd.DataFrame({
+            "threat_type": threat["threat_type"].astype(str).to_numpy(),
+            "severity": threat["severity"].astype(str).to_numpy(),
+            "threat_count": threat["events"].to_numpy(dtype=np.int64),
+            "false_positive": threat["false_positive_sum"].to_numpy(dtype=np.int64)
+        })
+        if totals.get("false_positive_count", 0):
+            false_positive_rate = totals["false_positive_sum"] / totals["false_positive_count"] * 100
+            pain_points["false_positive_rate"] = {
+                "value": round(float(false_positive_rate), 2),
+                "threshold": thresholds["false_positive_rate"],
+                "status": "critical" if false_positive_rate > thresholds["false_positive_rate"] else "normal"
+            }
+
+    # Feedback type x sentiment
+    feedback = partials.get("feedback")
+    if totals["feedback_events"] and feedback is not None and not feedback.empty:
+        aggregated_data["feedback_analysis"] = pd.DataFrame({
+            "feedback_type": feedback["feedback_type"].astype(str).to_numpy(),
+            "sentiment": feedback["sentiment"].astype(str).to_numpy(),
+            "feedback_count": feedback["events"].to_numpy(dtype=np.int64),
+            "resolved": feedback["resolved_sum"].to_numpy(dtype=np.int64)
+        })
+
+    # Hourly performance and system impact
+    hourly = partials["hourly"]
+    if not hourly.empty:
+        hourly = hourly.sort_values("hour")
+        performance = {"timestamp": hourly["hour"].to_numpy(dtype=np.int64),
+                       "events": hourly["events"].to_numpy(dtype=np.int64)}
+        for field in HOURLY_PERFORMANCE_FIELDS:
+            performance[field] = _mean(hourly, field)
+        hourly_quantiles = wide_quantiles(partials["hourly_quantiles"], "hour", quantile_accuracy)
+        aggregated_data["hourly_performance"] = pd.DataFrame(performance).merge(
+            hourly_quantiles.rename(columns={"hour": "timestamp"}).astype({"timestamp": np.int64}),
+            on="timestamp", how="left"
+        )
+
+        if totals.get("antivirus_cpu_impact_count", 0):
+            avg_cpu_impact = totals["antivirus_cpu_impact_sum"] / totals["antivirus_cpu_impact_count"]
+            pain_points["avg_cpu_impact"] = {
+                "value": round(float(avg_cpu_impact), 2),
+                "threshold": thresholds["avg_cpu_impact"],
+                "status": "warning" if avg_cpu_impact > thresholds["avg_cpu_impact"] else "normal"
+            }
+
+    # Scan failure rate
+    if totals["scan_events"]:
+        failure_rate = totals["scan_failed"] / totals["scan_events"] * 100
+        pain_points["scan_failure_rate"] = {
+            "value": round(float(failure_rate), 2),
+            "threshold": thresholds["scan_failure_rate"],
+            "status": "critical" if failure_rate > thresholds["scan_failure_rate"] else "normal"
+        }
+
+    # User satisfaction (based on feedback)
+    if totals["feedback_events"]:
+        negative_feedback_rate = totals["feedback_negative"] / totals["feedback_events"] * 100
+        pain_points["negative_feedback_rate"] = {
+            "value": round(float(negative_feedback_rate), 2),
+            "threshold": thresholds["negative_feedback_rate"],
+            "status": "warning" if negative_feedback_rate > thresholds["negative_feedback_rate"] else "normal"
+        }
+
+    # Tail percentiles behind the resource and scan pain points
+    overall = grouped_quantiles(partials["quantiles"], ["field"], accuracy=quantile_accuracy)
+    overall = {
+        str(row["field"]): {column: round(float(row[column]), 2) for column in overall.columns[1:]}
+        for _, row in overall.iterrows()
+    }
+    for metric, fields in PAIN_POINT_PERCENTILES.items():
+        if metric in pain_points:
+            pain_points[metric]["percentiles"] = {field: overall[field] for field in fields if field in overall}
+
+    date_range = [dates.min().date(), dates.max().date()] if len(dates) else [None, None]
+    overview = {
+        "total_events": int(daily["events"].sum()),
+        "unique_endpoints": (round(HyperLogLog.from_bytes(totals["endpoints_hll"]).count())
+                             if "endpoints_hll" in totals else int(len(endpoint))),
+        "date_range": f"{date_range[0]} to {date_range[1]}",
+        "threat_events": int(totals["threat_events"]),
+        "scan_events": int(totals["scan_events"])
+    }
+
+    return {"aggregated_data": aggregated_data, "pain_points": pain_points, "overview": overview}
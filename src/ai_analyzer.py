@@ -3,48 +3,251 @@ AI-Powered Cybersecurity Telemetry Analyzer
 Uses OpenAI API to generate intelligent insights and recommendations
 """
 
+import glob
 import json
+import queue
+import random
+import threading
+import time
 import pandas as pd
 import os
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
 import requests
 from datetime import datetime
 
+from aggregation import PARTIALS_VERSION, TelemetryAggregator, finalize_partials, merge_partials_in_batches
+from config_loader import ai_settings, load_config, threshold_settings
+from event_store import ColumnarEventStore
+from incremental import PartialAggregateStore
+from llm_backends import create_backend
+from output_sinks import atomic_write
+from rate_limiter import RateLimiter, request_tokens, text_tokens
+from response_cache import ResponseCache, request_key
+from segments import SEGMENT_RESULTS_NAME, SegmentResultsLog, load_registry, segment_summaries
+from sketches import DEFAULT_QUANTILE_ACCURACY
+from telemetry_schema import RAW_CSV_DTYPES
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Request fields that change how an answer is delivered, not the answer
+STREAM_FIELDS = ("stream", "stream_options")
+# Field holding the AI text of each fleet-wide analysis section
+SECTION_TEXT_FIELDS = ("ai_insights", "executive_summary", "trend_analysis")
+
+
+def read_processed_csv(path: str) -> pd.DataFrame:
+    """Read an exported processed table with the schema's column types and a parsed timestamp"""
+    df = pd.read_csv(path, dtype=RAW_CSV_DTYPES)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601')
+    return df
+
+
+def failed_answer(text: str) -> bool:
+    """Whether call_openai_api() returned an error or unavailability notice instead of an answer"""
+    return text.startswith(("AI analysis error", "AI analysis unavailable"))
+
+
+def category_totals(frame: pd.DataFrame, column: str, count_column: str) -> Dict:
+    """Counts per category of an aggregate table, largest first"""
+    totals = frame.groupby(column, observed=True)[count_column].sum().sort_values(ascending=False)
+    return {str(category): int(count) for category, count in totals.items()}
+
+
+def weighted_mean(frame: pd.DataFrame, column: str, weight_column: str) -> float:
+    """Mean of per-group means weighted by group sizes, ignoring groups without a mean"""
+    if column not in frame.columns:
+        return 0
+    valid = frame[column].notna()
+    weights = frame.loc[valid, weight_column]
+    return float((frame.loc[valid, column] * weights).sum() / weights.sum()) if weights.sum() else 0
+
 class AITelemetryAnalyzer:
-    def __init__(self, api_key: str = None, processed_data_path: str = "../data/processed"):
+    def __init__(self, api_key: str = None, processed_data_path: str = "../data/processed",
+                 settings: Dict = None, response_cache_dir: str = None, bypass_response_cache: bool = False,
+                 registry_path: str = None):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         self.processed_data_path = processed_data_path
-        self.base_url = "https://api.openai.com/v1/chat/completions"
-        
-        if not self.api_key:
-            print("Warning: OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
+        # Endpoint registry (department, OS) for segment analysis, by default in the raw data directory
+        self.registry_path = registry_path or os.path.join(
+            os.path.dirname(os.path.abspath(processed_data_path)), "raw", "endpoints_registry.csv")
+        self.settings = ai_settings(load_config()) if settings is None else settings
+        self.max_concurrency = max(1, int(self.settings['max_concurrency']))
+        
+        # Requests go through the configured backend (one pooled session shared by
+        # every analysis thread), with at most max_concurrency in flight and paced
+        # to the RPM/TPM quota
+        self.backend = create_backend(self.settings, api_key=self.api_key, pool_size=self.max_concurrency)
+        self.request_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.rate_limiter = RateLimiter.from_settings(self.settings)
+        # Per-thread metrics of the latest call, and answers to reuse from an interrupted run
+        self.call_local = threading.local()
+        self.calls = []  # Metrics of every call made, for run metrics
+        self.resumable = {}
+        self.bypass_response_cache = bypass_response_cache
+        
+        # Responses to byte-identical requests are reused across runs (by default from
+        # llm_cache next to the processed data directory)
+        self.response_cache = None
+        if self.settings['response_cache']:
+            self.response_cache = ResponseCache(
+                response_cache_dir or os.path.join(os.path.dirname(os.path.abspath(processed_data_path)), "llm_cache"),
+                ttl_seconds=self.settings['response_cache_ttl_hours'] * 3600,
+                max_bytes=int(self.settings['response_cache_max_mb'] * (1 << 20)),
+                bypass=bypass_response_cache
+            )
+        
+        if not self.backend.available:
+            print("Warning: OpenAI API key not found. Set OPENAI_API_KEY environment variable "
+                  "(or use the mock backend).")
     
-    def call_openai_api(self, prompt: str, model: str = "gpt-3.5-turbo") -> str:
-        """Make API call to OpenAI"""
-        if not self.api_key:
-            return "AI analysis unavailable - no API key configured"
-        
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": model,
+    def close(self):
+        """Release the backend's connections (and stop a mock server)"""
+        self.backend.close()
+    
+    def retry_delay(self, attempt: int, response: requests.Response = None) -> float:
+        """Seconds to wait before a retry: Retry-After when given, else exponential backoff with full jitter"""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.settings['max_backoff_seconds'])
+            except ValueError:
+                pass
+        backoff = min(self.settings['backoff_seconds'] * (2 ** attempt), self.settings['max_backoff_seconds'])
+        return random.uniform(0, backoff)
+    
+    def build_request(self, prompt: str, model: str = None) -> Dict:
+        """Chat completion request for an analysis prompt"""
+        request = {
+            "model": model or self.settings['openai_model'],
             "messages": [
                 {"role": "system", "content": "You are a cybersecurity expert analyzing telemetry data. Provide actionable insights and recommendations."},
                 {"role": "user", "content": prompt}
             ],
-            "max_tokens": 500,
-            "temperature": 0.7
+            "max_tokens": self.settings['max_tokens'],
+            "temperature": self.settings['temperature']
         }
+        if self.settings['stream']:
+            request.update(stream=True, stream_options={"include_usage": True})
+        return request
+    
+    def answer_identity(self, request: Dict) -> Dict:
+        """What determines a request's answer: the request less its delivery (stream) fields,
+        plus the backend, so mock answers never stand in for real ones"""
+        identity = {name: value for name, value in request.items() if name not in STREAM_FIELDS}
+        identity['backend'] = self.backend.name
+        return identity
+    
+    def last_call(self) -> Dict:
+        """Metrics of the calling thread's latest call_openai_api()"""
+        return getattr(self.call_local, 'metrics', None)
+    
+    def read_completion(self, response: requests.Response, started: float, metrics: Dict) -> (str, Dict):
+        """Content and usage of a completion, consuming server-sent events when streamed
         
-        try:
-            response = requests.post(self.base_url, headers=headers, json=data)
-            response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
-        except Exception as e:
-            return f"AI analysis error: {str(e)}"
+        Records time to first token and generation speed (completion tokens per
+        second after the first token when streamed, over the whole call otherwise).
+        """
+        if not metrics['streamed']:
+            body = response.json()
+            content, usage = body['choices'][0]['message']['content'], body.get('usage') or {}
+            first_token = elapsed = time.time() - started
+        else:
+            pieces, usage, first_token = [], {}, None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                chunk = json.loads(payload)
+                usage = chunk.get('usage') or usage
+                for choice in chunk.get('choices') or []:
+                    piece = (choice.get('delta') or {}).get('content')
+                    if piece:
+                        if first_token is None:
+                            first_token = time.time() - started
+                        pieces.append(piece)
+            content = ''.join(pieces)
+            elapsed = time.time() - started
+            first_token = elapsed if first_token is None else first_token
+        
+        completion_tokens = usage.get('completion_tokens') or text_tokens(content)
+        generation = elapsed - first_token if metrics['streamed'] else elapsed
+        metrics.update(
+            latency_seconds=round(elapsed, 3),
+            time_to_first_token_seconds=round(first_token, 3),
+            completion_tokens=completion_tokens,
+            tokens_per_second=round(completion_tokens / generation, 1) if generation > 0 else None
+        )
+        return content, usage
+    
+    def call_openai_api(self, prompt: str, model: str = None) -> str:
+        """Make API call to OpenAI, paced to the rate limits and retrying rate-limited and failed requests
+        
+        Metrics of the call (source, attempts, latency, time to first token,
+        tokens/sec) are available from last_call() on the same thread.
+        """
+        self.call_local.metrics = None
+        if not self.backend.available:
+            return "AI analysis unavailable - no API key configured"
+        
+        data = self.build_request(prompt, model)
+        identity = self.answer_identity(data)
+        key = request_key(identity)
+        metrics = self.call_local.metrics = {"request_key": key, "source": "api",
+                                             "streamed": bool(data.get('stream')), "attempts": 0}
+        self.calls.append(metrics)
+        
+        # Answers completed by an interrupted earlier run, then cached responses
+        if key in self.resumable:
+            metrics['source'] = "checkpoint"
+            return self.resumable[key]
+        if self.response_cache is not None:
+            cached = self.response_cache.get(identity)
+            if cached is not None:
+                metrics['source'] = "cache"
+                return cached
+        
+        tokens = request_tokens(data)
+        max_retries = self.settings['max_retries']
+        for attempt in range(max_retries + 1):
+            response = None
+            metrics['attempts'] = attempt + 1
+            try:
+                self.rate_limiter.acquire(tokens)
+                with self.request_slots:
+                    started = time.time()
+                    response = self.backend.send(data, timeout=self.settings['request_timeout'],
+                                                 stream=metrics['streamed'])
+                    retry = response.status_code in RETRY_STATUS_CODES and attempt < max_retries
+                    if retry:
+                        response.close()
+                    else:
+                        # Streamed bodies are read while holding the slot: they are still in flight
+                        response.raise_for_status()
+                        content, usage = self.read_completion(response, started, metrics)
+                if retry:
+                    delay = self.retry_delay(attempt, response)
+                    if response.status_code == 429:
+                        # The quota is shared: hold back every thread, not just this one.
+                        # A rejected request does not count against it
+                        self.rate_limiter.refund(tokens)
+                        self.rate_limiter.pause(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+                self.rate_limiter.settle(tokens, usage.get('total_tokens'))
+                if self.response_cache is not None:
+                    self.response_cache.put(identity, content)
+                return content
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt < max_retries:
+                    time.sleep(self.retry_delay(attempt))
+                    continue
+                return f"AI analysis error: {str(e)}"
+            except Exception as e:
+                return f"AI analysis error: {str(e)}"
     
     def load_insights_data(self) -> Dict:
         """Load processed insights data"""
@@ -54,26 +257,60 @@ class AITelemetryAnalyzer:
                 return json.load(f)
         return {}
     
+    def load_aggregates(self) -> Dict:
+        """Aggregate tables for a standalone run (see finalize_partials)
+
+        Merged from the processor's persisted partial aggregates when they
+        are current, which never touches full rows; otherwise computed in one
+        pass over the typed processed rows.
+        """
+        state = PartialAggregateStore(os.path.join(self.processed_data_path, "partials"))
+        settings = state.manifest.get("settings", {})
+        thresholds = threshold_settings(load_config())
+        if state.manifest["inputs"] and settings.get("partials_version") == PARTIALS_VERSION:
+            return finalize_partials(merge_partials_in_batches(state.iter_all()),
+                                     settings.get("quantile_accuracy", DEFAULT_QUANTILE_ACCURACY), thresholds)
+        
+        df = self.load_processed_data()
+        if df.empty:
+            return {}
+        tables = {str(event_type): table.reset_index(drop=True)
+                  for event_type, table in df.groupby('event_type', observed=True)}
+        return TelemetryAggregator(tables, thresholds=thresholds).aggregate()
+    
     def load_processed_data(self) -> pd.DataFrame:
-        """Load processed telemetry data"""
+        """Load processed telemetry data with its column types"""
+        store = ColumnarEventStore(os.path.join(self.processed_data_path, "columnar"))
+        if store.exists():
+            return store.to_dataframe()
+        
+        # Exported per-event-type processed tables (flat or partitioned), falling back to the legacy single wide file
+        table_paths = sorted(
+            glob.glob(os.path.join(self.processed_data_path, "telemetry_processed_*.csv*"))
+            + glob.glob(os.path.join(self.processed_data_path, "telemetry_processed", "**", "*.csv*"), recursive=True)
+        )
+        if table_paths:
+            return pd.concat([read_processed_csv(path) for path in table_paths], ignore_index=True, sort=False)
+        
         data_path = os.path.join(self.processed_data_path, "telemetry_processed.csv")
         if os.path.exists(data_path):
-            return pd.read_csv(data_path)
+            return read_processed_csv(data_path)
         return pd.DataFrame()
     
-    def analyze_threat_patterns(self, df: pd.DataFrame) -> Dict:
+    def analyze_threat_patterns(self, aggregates: Dict) -> Dict:
         """AI analysis of threat patterns"""
-        threat_df = df[df['event_type'] == 'threat_detection'].copy()
+        threats = aggregates['aggregated_data'].get('threat_analysis')
         
-        if threat_df.empty:
+        if threats is None or threats.empty:
             return {"analysis": "No threat data available for analysis"}
         
         # Prepare data summary for AI
+        total_threats = int(threats['threat_count'].sum())
         threat_summary = {
-            "total_threats": len(threat_df),
-            "threat_types": threat_df['threat_type'].value_counts().to_dict(),
-            "severity_distribution": threat_df['severity'].value_counts().to_dict(),
-            "false_positive_rate": (threat_df['false_positive'].sum() / len(threat_df)) * 100 if 'false_positive' in threat_df.columns else 0
+            "total_threats": total_threats,
+            "threat_types": category_totals(threats, 'threat_type', 'threat_count'),
+            "severity_distribution": category_totals(threats, 'severity', 'threat_count'),
+            "false_positive_rate": float(threats['false_positive'].sum() / total_threats * 100)
         }
         
         prompt = f"""
@@ -100,19 +337,19 @@ class AITelemetryAnalyzer:
             "generated_at": datetime.now().isoformat()
         }
     
-    def analyze_performance_impact(self, df: pd.DataFrame) -> Dict:
+    def analyze_performance_impact(self, aggregates: Dict) -> Dict:
         """AI analysis of system performance impact"""
-        perf_df = df[df['event_type'] == 'performance'].copy()
+        hourly = aggregates['aggregated_data'].get('hourly_performance')
         
-        if perf_df.empty:
+        if hourly is None or hourly.empty:
             return {"analysis": "No performance data available for analysis"}
         
-        # Calculate performance metrics
+        # Overall averages from the hourly means, weighted by each hour's events
         perf_summary = {
-            "avg_cpu_usage": perf_df['cpu_usage'].mean() if 'cpu_usage' in perf_df.columns else 0,
-            "avg_memory_usage": perf_df['memory_usage'].mean() if 'memory_usage' in perf_df.columns else 0,
-            "avg_antivirus_impact": perf_df['antivirus_cpu_impact'].mean() if 'antivirus_cpu_impact' in perf_df.columns else 0,
-            "peak_hours": "9-17" if not perf_df.empty else "Unknown"
+            "avg_cpu_usage": weighted_mean(hourly, 'cpu_usage', 'events'),
+            "avg_memory_usage": weighted_mean(hourly, 'memory_usage', 'events'),
+            "avg_antivirus_impact": weighted_mean(hourly, 'antivirus_cpu_impact', 'events'),
+            "peak_hours": "9-17"
         }
         
         prompt = f"""
@@ -139,19 +376,20 @@ class AITelemetryAnalyzer:
             "generated_at": datetime.now().isoformat()
         }
     
-    def analyze_user_experience(self, df: pd.DataFrame) -> Dict:
+    def analyze_user_experience(self, aggregates: Dict) -> Dict:
         """AI analysis of user experience and feedback"""
-        feedback_df = df[df['event_type'] == 'user_feedback'].copy()
+        feedback = aggregates['aggregated_data'].get('feedback_analysis')
         
-        if feedback_df.empty:
+        if feedback is None or feedback.empty:
             return {"analysis": "No user feedback data available for analysis"}
         
         # User experience metrics
+        total_feedback = int(feedback['feedback_count'].sum())
         ux_summary = {
-            "total_feedback": len(feedback_df),
-            "sentiment_distribution": feedback_df['sentiment'].value_counts().to_dict() if 'sentiment' in feedback_df.columns else {},
-            "feedback_types": feedback_df['feedback_type'].value_counts().to_dict() if 'feedback_type' in feedback_df.columns else {},
-            "resolution_rate": (feedback_df['resolved'].sum() / len(feedback_df)) * 100 if 'resolved' in feedback_df.columns else 0
+            "total_feedback": total_feedback,
+            "sentiment_distribution": category_totals(feedback, 'sentiment', 'feedback_count'),
+            "feedback_types": category_totals(feedback, 'feedback_type', 'feedback_count'),
+            "resolution_rate": float(feedback['resolved'].sum() / total_feedback * 100)
         }
         
         prompt = f"""
@@ -206,11 +444,11 @@ class AITelemetryAnalyzer:
             "generated_at": datetime.now().isoformat()
         }
     
-    def generate_predictive_insights(self, df: pd.DataFrame) -> Dict:
+    def generate_predictive_insights(self, aggregates: Dict) -> Dict:
         """Generate predictive insights using AI"""
         
         # Calculate trends
-        daily_stats = df.groupby(df['timestamp'].dt.date).size().describe()
+        daily_stats = aggregates['aggregated_data']['daily_metrics']['total_events'].describe()
         
         prompt = f"""
         Based on cybersecurity telemetry trends, provide predictive insights:
@@ -236,96 +474,251 @@ class AITelemetryAnalyzer:
             "generated_at": datetime.now().isoformat()
         }
     
-    def run_comprehensive_analysis(self) -> Dict:
-        """Run complete AI analysis pipeline"""
+    def run_comprehensive_analysis(self, aggregates: Dict = None, insights: Dict = None) -> Dict:
+        """Run complete AI analysis pipeline
+
+        aggregates (TelemetryDataProcessor.aggregates) and insights can be
+        handed over in memory; otherwise they are loaded from processed data.
+        """
         print("Starting AI-powered analysis...")
         
         # Load data
-        insights_data = self.load_insights_data()
-        df = self.load_processed_data()
+        insights_data = self.load_insights_data() if insights is None else insights
+        aggregates = self.load_aggregates() if aggregates is None else aggregates
         
-        if df.empty:
+        if not aggregates or aggregates['aggregated_data']['daily_metrics'].empty:
             return {"error": "No processed data available for AI analysis"}
         
-        # Run different analysis modules
-        analysis_results = {
-            "threat_analysis": self.analyze_threat_patterns(df),
-            "performance_analysis": self.analyze_performance_impact(df),
-            "user_experience_analysis": self.analyze_user_experience(df),
-            "executive_summary": self.generate_executive_summary(insights_data),
-            "predictive_insights": self.generate_predictive_insights(df),
-            "analysis_metadata": {
-                "total_records_analyzed": len(df),
-                "analysis_date": datetime.now().isoformat(),
-                "ai_model_used": "gpt-3.5-turbo"
-            }
+        # Sections an interrupted or partly failed earlier run completed are not asked again
+        if not self.bypass_response_cache:
+            self.resumable = self.load_checkpoint()
+            if self.resumable:
+                print(f"Resuming AI analysis: reusing {len(self.resumable)} completed section(s)")
+        
+        # Run the independent analysis modules concurrently; each waits on its own API call.
+        # Every section is checkpointed into ai_analysis.json as soon as it completes
+        modules = {
+            "threat_analysis": (self.analyze_threat_patterns, aggregates),
+            "performance_analysis": (self.analyze_performance_impact, aggregates),
+            "user_experience_analysis": (self.analyze_user_experience, aggregates),
+            "executive_summary": (self.generate_executive_summary, insights_data),
+            "predictive_insights": (self.generate_predictive_insights, aggregates)
         }
+        completed = {}
+        checkpoint_lock = threading.Lock()
+        
+        def run_section(name, module, data):
+            self.call_local.metrics = None
+            result = module(data)
+            if self.last_call() is not None:
+                result["llm_call"] = self.last_call()
+            with checkpoint_lock:
+                completed[name] = result
+                sections = {section: completed[section] for section in modules if section in completed}
+                self.save_analysis(dict(sections, analysis_metadata=self.analysis_metadata(
+                    aggregates, sections, status="in_progress")))
+            return result
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {name: executor.submit(run_section, name, module, data)
+                       for name, (module, data) in modules.items()}
+            analysis_results = {name: future.result() for name, future in futures.items()}
+        
+        if self.settings['segment_analysis']:
+            analysis_results["segment_analysis"] = self.run_segment_analysis(aggregates)
+        
+        failed = any(failed_answer(result.get(field, "")) for result in analysis_results.values()
+                     for field in SECTION_TEXT_FIELDS)
+        failed = failed or analysis_results.get("segment_analysis", {}).get("failed", 0) > 0
+        analysis_results["analysis_metadata"] = self.analysis_metadata(
+            aggregates, analysis_results, status="partial" if failed else "complete")
         
         # Save AI analysis results
-        output_path = os.path.join(self.processed_data_path, "ai_analysis.json")
-        with open(output_path, 'w') as f:
-            json.dump(analysis_results, f, indent=2, default=str)
+        output_path = self.save_analysis(analysis_results)
         
         print(f"AI analysis completed and saved to {output_path}")
         return analysis_results
     
-    def generate_mock_analysis(self) -> Dict:
-        """Generate mock AI analysis when API is not available"""
-        mock_analysis = {
-            "threat_analysis": {
-                "summary": {
-                    "total_threats": 12500,
-                    "threat_types": {"malware": 4500, "virus": 3200, "trojan": 2800, "spyware": 2000},
-                    "false_positive_rate": 12.5
-                },
-                "ai_insights": "The threat landscape shows elevated malware activity with a concerning false positive rate of 12.5%. Immediate attention needed for signature tuning. Recommend implementing machine learning-based detection to reduce false positives while maintaining security effectiveness.",
-                "generated_at": datetime.now().isoformat()
-            },
-            "performance_analysis": {
-                "summary": {
-                    "avg_cpu_usage": 45.2,
-                    "avg_memory_usage": 32.8,
-                    "avg_antivirus_impact": 18.5
-                },
-                "ai_insights": "System performance shows moderate impact from security software. CPU usage during scans peaks at unacceptable levels. Recommend implementing intelligent scheduling and resource throttling to minimize user impact during business hours.",
-                "generated_at": datetime.now().isoformat()
-            },
-            "user_experience_analysis": {
-                "summary": {
-                    "total_feedback": 450,
-                    "sentiment_distribution": {"negative": 285, "neutral": 120, "positive": 45},
-                    "resolution_rate": 68.5
-                },
-                "ai_insights": "User satisfaction is critically low with 63% negative feedback. Primary complaints center on system slowdown and scan interruptions. Urgent need for UX improvements and proactive communication about security operations.",
-                "generated_at": datetime.now().isoformat()
-            },
-            "executive_summary": {
-                "executive_summary": "Cybersecurity telemetry analysis reveals critical areas requiring immediate attention. While threat detection is effective, high false positive rates and performance impact are significantly affecting user satisfaction. Recommend prioritizing machine learning integration and performance optimization to maintain security effectiveness while improving user experience.",
-                "generated_at": datetime.now().isoformat()
+    def analysis_metadata(self, aggregates: Dict, sections: Dict, status: str) -> Dict:
+        """analysis_metadata block; status is in_progress while sections are still being checkpointed,
+        then complete, or partial when some AI calls failed"""
+        calls = [section["llm_call"] for section in sections.values()
+                 if isinstance(section, dict) and section.get("llm_call", {}).get("source") == "api"
+                 and "latency_seconds" in section["llm_call"]]
+        return {
+            "status": status,
+            "completed_sections": list(sections),
+            "total_records_analyzed": aggregates['overview']['total_events'],
+            "analysis_date": datetime.now().isoformat(),
+            "ai_model_used": self.settings['openai_model'],
+            "llm_backend": self.backend.name,
+            "llm_calls": {
+                "streamed": bool(self.settings['stream']),
+                "api_calls": len(calls),
+                "avg_time_to_first_token_seconds": round(sum(call["time_to_first_token_seconds"]
+                                                             for call in calls) / len(calls), 3) if calls else None,
+                "avg_latency_seconds": round(sum(call["latency_seconds"] for call in calls) / len(calls), 3)
+                if calls else None
             },
-            "predictive_insights": {
-                "trend_analysis": "Based on current patterns, expect 15% increase in daily events over next quarter. Capacity planning should account for peak loads during business hours. Risk forecasting indicates potential user compliance issues if performance problems persist.",
-                "generated_at": datetime.now().isoformat()
-            }
+            "rate_limiter": self.rate_limiter.stats(),
+            "response_cache": self.response_cache.stats() if self.response_cache else {"enabled": False}
         }
+    
+    def load_checkpoint(self) -> Dict[str, str]:
+        """AI answers of the sections an unfinished or partly failed earlier analysis completed, by request key"""
+        try:
+            with open(os.path.join(self.processed_data_path, "ai_analysis.json"), 'r') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if previous.get("analysis_metadata", {}).get("status", "complete") == "complete":
+            return {}
+        answers = {}
+        for section in previous.values():
+            call = section.get("llm_call") if isinstance(section, dict) else None
+            text = next((section[field] for field in SECTION_TEXT_FIELDS if field in section), None) \
+                if call else None
+            if text and not failed_answer(text):
+                answers[call["request_key"]] = text
+        return answers
+    
+    def segment_prompt(self, segment: Dict, fleet: Dict) -> str:
+        """Prompt for one segment, with fleet-wide figures for comparison"""
+        label = {"department": "department", "os": "operating system",
+                 "high_risk": "high-risk endpoint cohort"}.get(segment['segment_type'], segment['segment_type'])
+        metrics = "\n".join(f"        - {name.replace('_', ' ').capitalize()}: {value}"
+                             for name, value in segment.items()
+                             if name not in ('segment_type', 'segment') and pd.notna(value))
+        return f"""
+        Analyze the threat and performance telemetry of one endpoint segment:
+        
+        Segment: {label} "{segment['segment']}"
+{metrics}
+        
+        Fleet-wide comparison:
+        - Endpoints: {fleet['endpoints']}
+        - False positive rate: {fleet['false_positive_rate']:.2f}%
+        - Average antivirus CPU impact: {fleet['avg_antivirus_impact']:.2f}%
+        
+        Please provide:
+        1. Risks specific to this segment
+        2. How the segment compares to the fleet
+        3. Top 3 actions for the team that owns it
+        """
+    
+    def run_segment_analysis(self, aggregates: Dict) -> Dict:
+        """Fan out one AI analysis per department, OS and high-risk cohort
+        
+        Segment summaries come from the endpoint metrics joined with the endpoint
+        registry. Prompts go through a bounded work queue to max_concurrency
+        workers, so throughput is set by the concurrency and rate limits, and
+        each result is appended to segment_analysis.ndjson as it completes.
+        Segments answered successfully by an interrupted earlier run with the
+        same request are kept and not sent again.
+        """
+        endpoint_metrics = aggregates['aggregated_data'].get('endpoint_metrics')
+        results_path = os.path.join(self.processed_data_path, SEGMENT_RESULTS_NAME)
+        if endpoint_metrics is None or endpoint_metrics.empty:
+            return {"analysis": "No endpoint data available for segment analysis"}
+        
+        summaries = segment_summaries(endpoint_metrics, load_registry(self.registry_path),
+                                      self.settings['segment_dimensions'], self.settings['high_risk_percentile'])
+        hourly = aggregates['aggregated_data'].get('hourly_performance')
+        pain_points = aggregates.get('pain_points', {})
+        fleet = {
+            "endpoints": len(endpoint_metrics),
+            "false_positive_rate": pain_points.get('false_positive_rate', {}).get('value', 0),
+            "avg_antivirus_impact": weighted_mean(hourly, 'antivirus_cpu_impact', 'events')
+            if hourly is not None and not hourly.empty else 0
+        }
+        
+        segments = []
+        for segment in summaries.to_dict('records'):
+            prompt = self.segment_prompt(segment, fleet)
+            key = request_key(self.answer_identity(self.build_request(prompt)))
+            segments.append((key, segment, prompt))
+        
+        log = SegmentResultsLog(results_path)
+        previous = log.completed()
+        kept = [previous[key] for key, _, _ in segments if key in previous]
+        pending = [(key, segment, prompt) for key, segment, prompt in segments if key not in previous]
+        total = len(segments)
+        counts = {"completed": 0, "failed": 0}
+        counts_lock = threading.Lock()
+        if kept:
+            print(f"Resuming segment analysis: {len(kept)} of {total} segments already analyzed")
+        print(f"Analyzing {len(pending)} segments with {self.max_concurrency} concurrent requests...")
+        
+        # Bounded queue: the producer stays at most a few prompts ahead of the workers
+        work = queue.Queue(maxsize=2 * self.max_concurrency)
+        
+        def worker():
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                key, segment, prompt = item
+                insights = self.call_openai_api(prompt)
+                ok = not failed_answer(insights)
+                with counts_lock:
+                    counts["completed" if ok else "failed"] += 1
+                    done = counts["completed"] + counts["failed"]
+                log.append({
+                    "key": key,
+                    "segment_type": segment['segment_type'],
+                    "segment": segment['segment'],
+                    "status": "ok" if ok else "error",
+                    "summary": {name: value for name, value in segment.items()
+                                if name not in ('segment_type', 'segment')},
+                    "ai_insights": insights,
+                    "llm_call": self.last_call(),
+                    "progress": {"done": done + len(kept), "total": total},
+                    "generated_at": datetime.now().isoformat()
+                })
+        
+        log.start(kept)
+        workers = [threading.Thread(target=worker, name=f"segment-worker-{i}", daemon=True)
+                   for i in range(min(self.max_concurrency, len(pending)))]
+        try:
+            for thread in workers:
+                thread.start()
+            for item in pending:
+                work.put(item)
+        finally:
+            for _ in workers:
+                work.put(None)
+            for thread in workers:
+                thread.join()
+            log.close()
         
-        # Save mock analysis
+        return {
+            "segments": total,
+            "completed": len(kept) + counts["completed"],
+            "failed": counts["failed"],
+            "resumed": len(kept),
+            "by_type": summaries['segment_type'].value_counts().sort_index().to_dict(),
+            "results_file": SEGMENT_RESULTS_NAME
+        }
+    
+    def save_analysis(self, analysis: Dict) -> str:
+        """Write ai_analysis.json atomically; returns its path"""
         output_path = os.path.join(self.processed_data_path, "ai_analysis.json")
-        with open(output_path, 'w') as f:
-            json.dump(mock_analysis, f, indent=2, default=str)
         
-        return mock_analysis
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(analysis, f, indent=2, default=str)
+        atomic_write(output_path, write)
+        return output_path
 
 if __name__ == "__main__":
     analyzer = AITelemetryAnalyzer()
     
-    # Try to run real analysis first, fall back to mock if needed
-    try:
-        results = analyzer.run_comprehensive_analysis()
-    except Exception as e:
-        print(f"AI analysis failed: {e}")
-        print("Generating mock analysis for demonstration...")
-        results = analyzer.generate_mock_analysis()
+    # Without an API key, answer the prompts from the bundled mock backend
+    if not analyzer.backend.available:
+        print("Using the local mock LLM backend for demonstration...")
+        analyzer = AITelemetryAnalyzer(settings=dict(analyzer.settings, backend="mock"))
+    
+    results = analyzer.run_comprehensive_analysis()
     
     print("\n=== AI ANALYSIS SUMMARY ===")
     if "threat_analysis" in results:
@@ -0,0 +1,107 @@
+"""
+Pipeline Configuration
+Loads config/config.yaml and fills in defaults for settings it leaves out
+"""
+
+import copy
+import os
+from typing import Dict
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   "config", "config.yaml")
+CONFIG_SECTION = "cybersec_telemetry_config"
+
+DEFAULT_GENERATION_SETTINGS = {
+    "endpoints": 50000,           # Endpoint ids the telemetry references (and the registry lists)
+    "daily_events": 50000,        # Events per day; each day draws its count within +/-10% of this
+    "simulation_days": 7,
+    "output_formats": ["json", "csv"]
+}
+
+# Pain point flagged above each threshold (percent)
+DEFAULT_THRESHOLD_SETTINGS = {
+    "false_positive_rate": 10,
+    "avg_cpu_impact": 15,
+    "scan_failure_rate": 5,
+    "negative_feedback_rate": 30
+}
+
+DEFAULT_EXPORT_SETTINGS = {
+    "formats": ["json", "csv"],   # Default sink formats for every artifact
+    "artifacts": {},              # Per-artifact format overrides, e.g. processed_tables: [csv]
+    "include_raw_data": True,     # Export the full cleaned rows, not just aggregates
+    "compress": False,            # gzip every exported file
+    "partition_by": [],           # Directory partitioning of full rows: date and/or event_type
+    "writer_threads": 4
+}
+
+# Names of the llm_backends transports, kept here so command-line parsing does not import them
+LLM_BACKENDS = ["mock", "openai"]
+
+DEFAULT_AI_SETTINGS = {
+    "backend": "openai",          # openai (any compatible api_url) or mock (bundled local server)
+    "api_url": "https://api.openai.com/v1/chat/completions",
+    "openai_model": "gpt-3.5-turbo",
+    "max_tokens": 500,
+    "temperature": 0.7,
+    "max_concurrency": 5,         # Simultaneous API requests
+    "request_timeout": 60,        # Seconds per request (connect and read)
+    "stream": False,              # Stream completions as server-sent events (time to first token, tokens/sec)
+    "max_retries": 4,             # Retries on 429/5xx responses and connection errors
+    "backoff_seconds": 0.5,       # Base of the exponential backoff (with full jitter)
+    "max_backoff_seconds": 20,
+    "rate_limit_rpm": 0,          # Requests per minute allowed by our share of the quota (0: unlimited)
+    "rate_limit_tpm": 0,          # Tokens per minute, prompt plus max_tokens (0: unlimited)
+    "response_cache": True,       # Reuse responses to byte-identical requests
+    "response_cache_ttl_hours": 168,
+    "response_cache_max_mb": 64,
+    "segment_analysis": False,    # Also analyze each department, OS and high-risk endpoint cohort
+    "segment_dimensions": ["department", "os"],
+    "high_risk_percentile": 95,   # Endpoints at or above this risk-score percentile form high-risk cohorts
+    "mock_latency_seconds": 0.3,  # Mock backend: mean time to first token
+    "mock_latency_jitter": 0.1,
+    "mock_tokens_per_second": 200,  # Mock generation speed after the first token (0: instant)
+    "mock_error_rate": 0.0,       # Share of mock requests failing with 500/503
+    "mock_rate_limit_rpm": 0,     # Quota the mock enforces with 429s (0: unlimited)
+    "mock_rate_limit_tpm": 0
+}
+
+
+def load_config(path: str = None) -> Dict:
+    """Load the telemetry section of the YAML config (empty when the file does not exist)"""
+    path = path or DEFAULT_CONFIG_PATH
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        document = yaml.safe_load(f) or {}
+    return document.get(CONFIG_SECTION, document)
+
+
+def generation_settings(config: Dict = None) -> Dict:
+    """Data generation settings from a loaded config, with defaults for missing keys"""
+    settings = copy.deepcopy(DEFAULT_GENERATION_SETTINGS)
+    settings.update((config or {}).get("data_generation") or {})
+    return settings
+
+
+def threshold_settings(config: Dict = None) -> Dict:
+    """Pain point thresholds from a loaded config, with defaults for missing keys"""
+    settings = copy.deepcopy(DEFAULT_THRESHOLD_SETTINGS)
+    settings.update((config or {}).get("pain_point_thresholds") or {})
+    return settings
+
+
+def export_settings(config: Dict = None) -> Dict:
+    """Export sink settings from a loaded config, with defaults for missing keys"""
+    settings = copy.deepcopy(DEFAULT_EXPORT_SETTINGS)
+    settings.update((config or {}).get("export") or {})
+    return settings
+
+
+def ai_settings(config: Dict = None) -> Dict:
+    """AI analysis settings from a loaded config, with defaults for missing keys"""
+    settings = copy.deepcopy(DEFAULT_AI_SETTINGS)
+    settings.update((config or {}).get("ai_analysis") or {})
+    return settings
@@ -8,38 +8,73 @@ import csv
 import random
 import datetime
 import os
-from typing import List, Dict
+from typing import Callable, List, Dict, Iterator
 import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config_loader import generation_settings, load_config
+from event_store import ColumnarEventStore
+from telemetry_writers import stream_events
+from telemetry_schema import (
+    EVENT_TYPES, EVENT_TYPE_WEIGHTS, THREAT_TYPES, SCAN_TYPES, SEVERITY_LEVELS,
+    DEPARTMENTS, OS_TYPES, SCAN_STATUSES, SCAN_STATUS_WEIGHTS, THREAT_ACTIONS,
+    THREAT_ACTION_WEIGHTS, FALSE_POSITIVE_WEIGHTS, FILE_PATH_USERS, FILE_PATH_FOLDERS,
+    FEEDBACK_TYPES, FEEDBACK_TEXTS, SENTIMENTS, SENTIMENT_WEIGHTS, PRIORITIES,
+    RESOLVED_WEIGHTS
+)
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECONDS_PER_DAY = 86400 * 1000000
+# Events drawn as NumPy columns at a time in batched mode
+DEFAULT_CHUNK_SIZE = 1000000
+# Each day's event count is drawn uniformly within this fraction of daily_events
+DAILY_EVENTS_JITTER = 0.1
+
+
+def daily_event_range(daily_events: int) -> (int, int):
+    """Lowest and highest event count a day may draw (inclusive)"""
+    spread = int(daily_events * DAILY_EVENTS_JITTER)
+    return max(1, daily_events - spread), daily_events + spread
+
 
 class TelemetryDataGenerator:
-    def __init__(self, config_path: str = None):
-        self.endpoints = 50000  # Number of endpoints
-        self.daily_events = 15000000  # Daily events
-        self.threat_types = [
-            "malware", "virus", "trojan", "spyware", "adware", 
-            "ransomware", "rootkit", "worm", "suspicious_file", "phishing"
-        ]
-        self.scan_types = ["scheduled", "on_demand", "real_time", "quick", "full"]
-        self.severity_levels = ["low", "medium", "high", "critical"]
-        self.departments = ["IT", "Finance", "HR", "Sales", "Marketing", "Operations", "Legal"]
-        self.os_types = ["Windows 10", "Windows 11", "macOS", "Linux Ubuntu", "Windows Server"]
+    def __init__(self, config_path: str = None, settings: Dict = None):
+        settings = generation_settings(load_config(config_path)) if settings is None else settings
+        self.endpoints = settings["endpoints"]  # Number of endpoints
+        self.daily_events = settings["daily_events"]  # Mean events per day
+        self.threat_types = list(THREAT_TYPES)
+        self.scan_types = list(SCAN_TYPES)
+        self.severity_levels = list(SEVERITY_LEVELS)
+        self.departments = list(DEPARTMENTS)
+        self.os_types = list(OS_TYPES)
         
-    def generate_endpoint_info(self) -> Dict:
-        """Generate endpoint information"""
+    def generate_endpoint_info(self, rng: random.Random = None,
+                               reference_time: datetime.datetime = None, endpoint_id: str = None) -> Dict:
+        """Generate endpoint information (a random UUID id unless endpoint_id is given)"""
+        if rng is None:
+            rng = random
+            endpoint_id = endpoint_id or str(uuid.uuid4())
+        elif endpoint_id is None:
+            endpoint_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
         return {
-            "endpoint_id": str(uuid.uuid4()),
-            "hostname": f"PC-{random.randint(1000, 9999)}",
-            "ip_address": f"192.168.{random.randint(1, 255)}.{random.randint(1, 255)}",
-            "os": random.choice(self.os_types),
-            "department": random.choice(self.departments),
-            "last_seen": self.random_timestamp().isoformat(),
-            "antivirus_version": f"2024.{random.randint(1, 12)}.{random.randint(1, 30)}"
+            "endpoint_id": endpoint_id,
+            "hostname": f"PC-{rng.randint(1000, 9999)}",
+            "ip_address": f"192.168.{rng.randint(1, 255)}.{rng.randint(1, 255)}",
+            "os": rng.choice(self.os_types),
+            "department": rng.choice(self.departments),
+            "last_seen": self.random_timestamp(rng=rng, reference_time=reference_time).isoformat(),
+            "antivirus_version": f"2024.{rng.randint(1, 12)}.{rng.randint(1, 30)}"
         }
     
-    def random_timestamp(self, days_back: int = 30) -> datetime.datetime:
+    def random_timestamp(self, days_back: int = 30, rng: random.Random = None,
+                         reference_time: datetime.datetime = None) -> datetime.datetime:
         """Generate random timestamp within last N days"""
-        now = datetime.datetime.now()
-        random_days = random.uniform(0, days_back)
+        rng = rng or random
+        now = reference_time or datetime.datetime.now()
+        random_days = rng.uniform(0, days_back)
         return now - datetime.timedelta(days=random_days)
     
     def generate_scan_event(self, endpoint_id: str) -> Dict:
@@ -57,10 +92,7 @@ class TelemetryDataGenerator:
             "files_scanned": random.randint(10000, 500000),
             "threats_found": random.randint(0, 50),
             "threats_cleaned": random.randint(0, 45),
-            "scan_status": random.choices(
-                ["completed", "failed", "cancelled"], 
-                weights=[85, 10, 5]
-            )[0],
+            "scan_status": random.choices(SCAN_STATUSES, weights=SCAN_STATUS_WEIGHTS)[0],
             "cpu_usage_avg": round(random.uniform(10, 90), 2),
             "memory_usage_mb": random.randint(100, 2048)
         }
@@ -74,13 +106,10 @@ class TelemetryDataGenerator:
             "event_type": "threat_detection",
             "threat_type": random.choice(self.threat_types),
             "threat_name": f"Threat.{random.choice(self.threat_types).title()}.{random.randint(1000, 9999)}",
-            "file_path": f"C:\\Users\\{random.choice(['admin', 'user', 'guest'])}\\{random.choice(['Downloads', 'Documents', 'Desktop'])}\\suspicious_file_{random.randint(1, 999)}.exe",
+            "file_path": f"C:\\Users\\{random.choice(FILE_PATH_USERS)}\\{random.choice(FILE_PATH_FOLDERS)}\\suspicious_file_{random.randint(1, 999)}.exe",
             "severity": random.choice(self.severity_levels),
-            "action_taken": random.choices(
-                ["quarantined", "deleted", "blocked", "allowed"], 
-                weights=[40, 30, 20, 10]
-            )[0],
-            "false_positive": random.choices([True, False], weights=[15, 85])[0]
+            "action_taken": random.choices(THREAT_ACTIONS, weights=THREAT_ACTION_WEIGHTS)[0],
+            "false_positive": random.choices([True, False], weights=FALSE_POSITIVE_WEIGHTS)[0]
         }
     
     def generate_performance_event(self, endpoint_id: str) -> Dict:
@@ -100,22 +129,7 @@ class TelemetryDataGenerator:
     
     def generate_user_feedback_event(self, endpoint_id: str) -> Dict:
         """Generate user feedback/complaint event"""
-        feedback_types = [
-            "slow_performance", "false_positive", "scan_interruption", 
-            "update_failure", "interface_issue", "feature_request"
-        ]
-        
-        sentiments = ["negative", "neutral", "positive"]
-        feedback_texts = {
-            "slow_performance": "System is running very slow during scans",
-            "false_positive": "Important file was blocked incorrectly",
-            "scan_interruption": "Scan keeps interrupting my work",
-            "update_failure": "Updates keep failing to install",
-            "interface_issue": "Interface is confusing and hard to use",
-            "feature_request": "Need better scheduling options"
-        }
-        
-        feedback_type = random.choice(feedback_types)
+        feedback_type = random.choice(FEEDBACK_TYPES)
         
         return {
             "event_id": str(uuid.uuid4()),
@@ -123,16 +137,30 @@ class TelemetryDataGenerator:
             "endpoint_id": endpoint_id,
             "event_type": "user_feedback",
             "feedback_type": feedback_type,
-            "feedback_text": feedback_texts[feedback_type],
-            "sentiment": random.choices(sentiments, weights=[60, 25, 15])[0],
-            "priority": random.choice(["low", "medium", "high"]),
-            "resolved": random.choices([True, False], weights=[70, 30])[0]
+            "feedback_text": FEEDBACK_TEXTS[feedback_type],
+            "sentiment": random.choices(SENTIMENTS, weights=SENTIMENT_WEIGHTS)[0],
+            "priority": random.choice(PRIORITIES),
+            "resolved": random.choices([True, False], weights=RESOLVED_WEIGHTS)[0]
         }
     
-    def generate_daily_logs(self, date: datetime.date, num_events: int = 50000) -> List[Dict]:
+    def generate_daily_logs(self, date: datetime.date, num_events: int = 50000, batched: bool = False) -> List[Dict]:
         """Generate a day's worth of telemetry logs"""
-        events = []
-        
+        return list(self.iter_daily_logs(date, num_events, batched=batched))
+
+    def iter_daily_logs(self, date: datetime.date, num_events: int = 50000, batched: bool = False,
+                        rng: np.random.Generator = None, reference_time: datetime.datetime = None,
+                        endpoint_pool: np.ndarray = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+        """Yield a day's worth of telemetry logs one event at a time
+
+        Batched mode draws columns chunk_size events at a time, so memory stays
+        bounded by the chunk rather than the day.
+        """
+        if batched:
+            for columns in self.iter_daily_columns(date, num_events, rng, reference_time,
+                                                   endpoint_pool, chunk_size):
+                yield from self.columns_to_events(columns)
+            return
+
         # Generate endpoint pool for the day
         active_endpoints = random.sample(
             [f"endpoint_{i}" for i in range(self.endpoints)], 
@@ -143,10 +171,7 @@ class TelemetryDataGenerator:
             endpoint_id = random.choice(active_endpoints)
             
             # Event type distribution
-            event_type = random.choices(
-                ["scan", "threat_detection", "performance", "user_feedback"],
-                weights=[40, 25, 30, 5]
-            )[0]
+            event_type = random.choices(EVENT_TYPES, weights=EVENT_TYPE_WEIGHTS)[0]
             
             if event_type == "scan":
                 event = self.generate_scan_event(endpoint_id)
@@ -157,10 +182,216 @@ class TelemetryDataGenerator:
             else:
                 event = self.generate_user_feedback_event(endpoint_id)
             
-            events.append(event)
-        
-        return events
-    
+            yield event
+
+    def iter_daily_columns(self, date: datetime.date, num_events: int = 50000,
+                           rng: np.random.Generator = None, reference_time: datetime.datetime = None,
+                           endpoint_pool: np.ndarray = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+        """Yield a day's batched columns in chunks that share one endpoint pool"""
+        rng = rng if rng is not None else np.random.default_rng()
+        reference_time = reference_time or datetime.datetime.now()
+        if endpoint_pool is None:
+            endpoint_pool = self._draw_endpoint_pool(rng, num_events)
+        for start in range(0, num_events, chunk_size):
+            yield self.generate_daily_columns(
+                date, min(chunk_size, num_events - start), rng=rng,
+                reference_time=reference_time, endpoint_pool=endpoint_pool
+            )
+
+    def write_day(self, date: datetime.date, num_events: int, base_path: str,
+                  output_formats: List[str] = ("json", "csv"), compress: bool = False,
+                  store: ColumnarEventStore = None, part: str = "part-00", batched: bool = False,
+                  rng: np.random.Generator = None, reference_time: datetime.datetime = None,
+                  endpoint_pool: np.ndarray = None, split_by_type: bool = True,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Generate one day (or shard) and write it to every requested output format
+
+        The "columnar" format writes chunk partitions of up to chunk_size events
+        into store; their manifest entries are returned alongside the event
+        count for the caller to commit.
+        """
+        text_formats = [fmt for fmt in output_formats if fmt != "columnar"]
+        entries = []
+
+        if "columnar" not in output_formats:
+            events = self.iter_daily_logs(date, num_events, batched=batched, rng=rng,
+                                          reference_time=reference_time, endpoint_pool=endpoint_pool,
+                                          chunk_size=chunk_size)
+            return stream_events(events, base_path, text_formats, compress,
+                                 split_by_type=split_by_type), entries
+
+        def chunks_to_store():
+            chunks = self.iter_daily_columns(date, num_events, rng, reference_time, endpoint_pool, chunk_size)
+            for i, columns in enumerate(chunks):
+                entries.extend(store.write_day_columns(columns, part=f"{part}-{i:03d}"))
+                yield columns
+
+        if text_formats:
+            events = (event for columns in chunks_to_store() for event in self.columns_to_events(columns))
+            count = stream_events(events, base_path, text_formats, compress, split_by_type=split_by_type)
+        else:
+            count = sum(columns["num_events"] for columns in chunks_to_store())
+        return count, entries
+
+    def _draw_endpoint_pool(self, rng: np.random.Generator, num_events: int) -> np.ndarray:
+        """Draw the distinct endpoint indices active on a day"""
+        pool_size = max(1, min(num_events // 10, self.endpoints))
+        return rng.choice(self.endpoints, size=pool_size, replace=False).astype(np.int32)
+
+    @staticmethod
+    def _draw_codes(rng: np.random.Generator, values: List, size: int, weights: List = None) -> np.ndarray:
+        """Draw categorical codes (indices into values) with optional weights"""
+        p = None
+        if weights is not None:
+            p = np.asarray(weights, dtype=np.float64)
+            p = p / p.sum()
+        return rng.choice(len(values), size=size, p=p).astype(np.uint8)
+
+    @staticmethod
+    def _draw_uuids(rng: np.random.Generator, size: int) -> np.ndarray:
+        """Draw random version-4 UUIDs as (size, 2) uint64 [high, low] words"""
+        words = rng.integers(0, np.iinfo(np.uint64).max, size=(size, 2), dtype=np.uint64, endpoint=True)
+        # Stamp version (4) and RFC 4122 variant bits like uuid.uuid4()
+        words[:, 0] = (words[:, 0] & np.uint64(0xFFFFFFFFFFFF0FFF)) | np.uint64(0x4000)
+        words[:, 1] = (words[:, 1] & np.uint64(0x3FFFFFFFFFFFFFFF)) | np.uint64(0x8000000000000000)
+        return words
+
+    def generate_daily_columns(self, date: datetime.date, num_events: int = 50000,
+                               rng: np.random.Generator = None,
+                               reference_time: datetime.datetime = None,
+                               days_back: int = 30, endpoint_pool: np.ndarray = None) -> Dict:
+        """Generate a day's worth of telemetry as NumPy column arrays
+
+        Common columns cover every event in order; per-type fields hold one
+        entry per event of that type, in the order those events occur.
+        Categorical fields are uint8 codes into telemetry_schema.FIELD_VOCABULARIES.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        reference_time = reference_time or datetime.datetime.now()
+        reference_us = (reference_time - EPOCH) // datetime.timedelta(microseconds=1)
+
+        # Endpoint pool for the day, then uniform picks from the pool
+        if endpoint_pool is None:
+            endpoint_pool = self._draw_endpoint_pool(rng, num_events)
+        endpoint = endpoint_pool[rng.integers(0, len(endpoint_pool), size=num_events)]
+
+        event_type = self._draw_codes(rng, EVENT_TYPES, num_events, EVENT_TYPE_WEIGHTS)
+        offsets = (rng.random(num_events) * (days_back * MICROSECONDS_PER_DAY)).astype(np.int64)
+        timestamp = np.int64(reference_us) - offsets
+        event_id = self._draw_uuids(rng, num_events)
+
+        counts = np.bincount(event_type, minlength=len(EVENT_TYPES))
+        n_scan, n_threat, n_perf, n_feedback = (int(c) for c in counts)
+
+        fields = {
+            "scan": {
+                "scan_type": self._draw_codes(rng, SCAN_TYPES, n_scan),
+                "scan_duration": rng.integers(30, 3601, size=n_scan, dtype=np.int32),
+                "files_scanned": rng.integers(10000, 500001, size=n_scan, dtype=np.int32),
+                "threats_found": rng.integers(0, 51, size=n_scan, dtype=np.int32),
+                "threats_cleaned": rng.integers(0, 46, size=n_scan, dtype=np.int32),
+                "scan_status": self._draw_codes(rng, SCAN_STATUSES, n_scan, SCAN_STATUS_WEIGHTS),
+                "cpu_usage_avg": np.round(rng.uniform(10, 90, size=n_scan), 2),
+                "memory_usage_mb": rng.integers(100, 2049, size=n_scan, dtype=np.int32)
+            },
+            "threat_detection": {
+                "threat_type": self._draw_codes(rng, THREAT_TYPES, n_threat),
+                "threat_name_type": self._draw_codes(rng, THREAT_TYPES, n_threat),
+                "threat_name_number": rng.integers(1000, 10000, size=n_threat, dtype=np.int32),
+                "file_path_user": self._draw_codes(rng, FILE_PATH_USERS, n_threat),
+                "file_path_folder": self._draw_codes(rng, FILE_PATH_FOLDERS, n_threat),
+                "file_path_number": rng.integers(1, 1000, size=n_threat, dtype=np.int32),
+                "severity": self._draw_codes(rng, SEVERITY_LEVELS, n_threat),
+                "action_taken": self._draw_codes(rng, THREAT_ACTIONS, n_threat, THREAT_ACTION_WEIGHTS),
+                "false_positive": rng.random(n_threat) < FALSE_POSITIVE_WEIGHTS[0] / sum(FALSE_POSITIVE_WEIGHTS)
+            },
+            "performance": {
+                "cpu_usage": np.round(rng.uniform(5, 95, size=n_perf), 2),
+                "memory_usage": np.round(rng.uniform(20, 85, size=n_perf), 2),
+                "disk_usage": np.round(rng.uniform(30, 90, size=n_perf), 2),
+                "network_usage_kb": rng.integers(100, 10001, size=n_perf, dtype=np.int32),
+                "antivirus_cpu_impact": np.round(rng.uniform(1, 25, size=n_perf), 2),
+                "boot_time_seconds": rng.integers(30, 181, size=n_perf, dtype=np.int32)
+            },
+            "user_feedback": {
+                "feedback_type": self._draw_codes(rng, FEEDBACK_TYPES, n_feedback),
+                "sentiment": self._draw_codes(rng, SENTIMENTS, n_feedback, SENTIMENT_WEIGHTS),
+                "priority": self._draw_codes(rng, PRIORITIES, n_feedback),
+                "resolved": rng.random(n_feedback) < RESOLVED_WEIGHTS[0] / sum(RESOLVED_WEIGHTS)
+            }
+        }
+
+        return {
+            "date": date,
+            "num_events": num_events,
+            "event_id": event_id,
+            "timestamp": timestamp,
+            "endpoint": endpoint,
+            "event_type": event_type,
+            "fields": fields
+        }
+
+    def columns_to_events(self, columns: Dict) -> Iterator[Dict]:
+        """Yield event dicts from batched columns, matching the per-event generators"""
+        fields = columns["fields"]
+        positions = [0] * len(EVENT_TYPES)
+
+        for i in range(columns["num_events"]):
+            type_code = int(columns["event_type"][i])
+            event_type = EVENT_TYPES[type_code]
+            j = positions[type_code]
+            positions[type_code] += 1
+            f = fields[event_type]
+
+            hi, lo = columns["event_id"][i]
+            event = {
+                "event_id": str(uuid.UUID(int=(int(hi) << 64) | int(lo))),
+                "timestamp": (EPOCH + datetime.timedelta(microseconds=int(columns["timestamp"][i]))).isoformat(),
+                "endpoint_id": f"endpoint_{columns['endpoint'][i]}",
+                "event_type": event_type
+            }
+
+            if event_type == "scan":
+                event.update({
+                    "scan_type": SCAN_TYPES[f["scan_type"][j]],
+                    "scan_duration": int(f["scan_duration"][j]),
+                    "files_scanned": int(f["files_scanned"][j]),
+                    "threats_found": int(f["threats_found"][j]),
+                    "threats_cleaned": int(f["threats_cleaned"][j]),
+                    "scan_status": SCAN_STATUSES[f["scan_status"][j]],
+                    "cpu_usage_avg": float(f["cpu_usage_avg"][j]),
+                    "memory_usage_mb": int(f["memory_usage_mb"][j])
+                })
+            elif event_type == "threat_detection":
+                event.update({
+                    "threat_type": THREAT_TYPES[f["threat_type"][j]],
+                    "threat_name": f"Threat.{THREAT_TYPES[f['threat_name_type'][j]].title()}.{f['threat_name_number'][j]}",
+                    "file_path": f"C:\\Users\\{FILE_PATH_USERS[f['file_path_user'][j]]}\\{FILE_PATH_FOLDERS[f['file_path_folder'][j]]}\\suspicious_file_{f['file_path_number'][j]}.exe",
+                    "severity": SEVERITY_LEVELS[f["severity"][j]],
+                    "action_taken": THREAT_ACTIONS[f["action_taken"][j]],
+                    "false_positive": bool(f["false_positive"][j])
+                })
+            elif event_type == "performance":
+                event.update({
+                    "cpu_usage": float(f["cpu_usage"][j]),
+                    "memory_usage": float(f["memory_usage"][j]),
+                    "disk_usage": float(f["disk_usage"][j]),
+                    "network_usage_kb": int(f["network_usage_kb"][j]),
+                    "antivirus_cpu_impact": float(f["antivirus_cpu_impact"][j]),
+                    "boot_time_seconds": int(f["boot_time_seconds"][j])
+                })
+            else:
+                feedback_type = FEEDBACK_TYPES[f["feedback_type"][j]]
+                event.update({
+                    "feedback_type": feedback_type,
+                    "feedback_text": FEEDBACK_TEXTS[feedback_type],
+                    "sentiment": SENTIMENTS[f["sentiment"][j]],
+                    "priority": PRIORITIES[f["priority"][j]],
+                    "resolved": bool(f["resolved"][j])
+                })
+
+            yield event
+
     def save_to_json(self, data: List[Dict], filename: str):
         """Save data to JSON file"""
         with open(filename, 'w') as f:
@@ -187,33 +418,179 @@ class TelemetryDataGenerator:
                 complete_row = {field: row.get(field, None) for field in fieldnames}
                 writer.writerow(complete_row)
     
-    def generate_sample_datasets(self, output_dir: str = "data/raw"):
-        """Generate sample datasets for different time periods"""
+    def generate_sample_datasets(self, output_dir: str = "data/raw", days: int = 7,
+                                 workers: int = 1, seed: int = None, shards_per_day: int = 1,
+                                 end_date: datetime.date = None,
+                                 output_formats: List[str] = ("json", "csv"), compress: bool = False,
+                                 split_by_type: bool = True,
+                                 day_written: Callable[[datetime.date], None] = None,
+                                 daily_events: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Generate sample datasets for different time periods
+
+        Each day draws its event count within DAILY_EVENTS_JITTER of
+        daily_events (the configured daily_events when None).
+
+        Days are generated in batched mode, holding at most chunk_size events
+        per worker in memory. With workers > 1, a seed or sub-day shards, they
+        run on a process pool, and every (date, shard) draws from its own RNG
+        derived from the master seed and the date, so output files are
+        byte-identical regardless of the worker count.
+
+        Events are streamed straight into the requested output formats
+        ("json", "ndjson", "csv", optionally gzip-compressed), so a day is
+        never held in memory as a list. "columnar" writes the memory-mapped
+        store under output_dir/columnar instead of re-encoding text.
+
+        By default each event type is written to its own table
+        (telemetry_<date>_<event_type>.csv) with only that type's fields;
+        split_by_type=False writes the legacy wide, sparse layout.
+
+        day_written, when given, is called with each date as soon as all its
+        files are complete (and its columnar partitions committed), so a
+        consumer can start on that day while later days are generated.
+        Returns the number of events generated.
+        """
         os.makedirs(output_dir, exist_ok=True)
+        daily_events = daily_events or self.daily_events
+        end_date = end_date or datetime.date.today()
+        dates = [end_date - datetime.timedelta(days=i) for i in range(days)]
+
+        # A stale store would shadow freshly written text files for the processor
+        store = ColumnarEventStore(os.path.join(output_dir, "columnar"))
+        if "columnar" in output_formats:
+            store.drop_dates(date.isoformat() for date in dates)
+        elif store.exists():
+            store.clear()
+
+        if workers > 1 or seed is not None or shards_per_day > 1:
+            if seed is None:
+                seed = int(np.random.SeedSequence().entropy % (2 ** 63))
+            print(f"Generating {days} days with {workers} worker(s), "
+                  f"{shards_per_day} shard(s) per day, master seed {seed}")
+            total_events = self._generate_days_parallel(output_dir, dates, workers, seed, shards_per_day,
+                                         output_formats, compress, store, split_by_type, day_written,
+                                         daily_events, chunk_size)
+        else:
+            total_events = 0
+            for date in dates:
+                date_str = date.strftime("%Y%m%d")
+                count, entries = self.write_day(date, random.randint(*daily_event_range(daily_events)),
+                                                f"{output_dir}/telemetry_{date_str}",
+                                                output_formats, compress, store=store, batched=True,
+                                                split_by_type=split_by_type, chunk_size=chunk_size)
+                if entries:
+                    store.commit(entries)
+
+                total_events += count
+                print(f"Generated {count} events for {date}")
+                if day_written is not None:
+                    day_written(date)
         
-        # Generate 7 days of data
-        for i in range(7):
-            date = datetime.date.today() - datetime.timedelta(days=i)
-            events = self.generate_daily_logs(date, num_events=random.randint(45000, 55000))
-            
-            # Save as both JSON and CSV
-            date_str = date.strftime("%Y%m%d")
-            self.save_to_json(events, f"{output_dir}/telemetry_{date_str}.json")
-            self.save_to_csv(events, f"{output_dir}/telemetry_{date_str}.csv")
-            
-            print(f"Generated {len(events)} events for {date}")
-        
-        # Generate endpoint registry
-        endpoints = []
-        for i in range(1000):  # Sample of endpoints
-            endpoints.append(self.generate_endpoint_info())
+        # Generate endpoint registry: one record per endpoint id the telemetry can reference,
+        # so events join to their department and OS
+        registry_rng = random.Random(seed) if seed is not None else None
+        reference_time = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time()) \
+            if seed is not None else None
+        endpoints = [
+            self.generate_endpoint_info(rng=registry_rng, reference_time=reference_time, endpoint_id=f"endpoint_{i}")
+            for i in range(self.endpoints)
+        ]
         
         self.save_to_json(endpoints, f"{output_dir}/endpoints_registry.json")
         self.save_to_csv(endpoints, f"{output_dir}/endpoints_registry.csv")
         
         print(f"Generated {len(endpoints)} endpoint records")
+        return total_events
+
+    def _generate_days_parallel(self, output_dir: str, dates: List[datetime.date],
+                                workers: int, seed: int, shards_per_day: int,
+                                output_formats: List[str], compress: bool, store: ColumnarEventStore,
+                                split_by_type: bool, day_written: Callable[[datetime.date], None] = None,
+                                daily_events: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """Fan (date, shard) tasks out across a process pool, completing days in order; returns the event count"""
+        tasks = [
+            (self.endpoints, daily_events or self.daily_events, seed, date, shard, shards_per_day, output_dir,
+             tuple(output_formats), compress, store.root, split_by_type, chunk_size)
+            for date in dates for shard in range(shards_per_day)
+        ]
+
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        def pooled_results():
+            # At most two tasks per worker in flight, so a slow day_written consumer
+            # holds generation back instead of letting it run arbitrarily far ahead
+            in_flight = deque()
+            for task in tasks:
+                in_flight.append(executor.submit(_generate_day_shard, task))
+                if len(in_flight) >= 2 * workers:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+        results = pooled_results() if executor else map(_generate_day_shard, tasks)
+
+        daily_totals = {}
+        store_entries = {}
+        try:
+            # Results arrive in task order, so a day is complete with its last shard
+            for date, shard, count, entries in results:
+                daily_totals[date] = daily_totals.get(date, 0) + count
+                store_entries.setdefault(date, []).extend(entries)
+                if shard < shards_per_day - 1:
+                    continue
+                if store_entries[date]:
+                    store.commit(store_entries[date])
+                print(f"Generated {daily_totals[date]} events for {date}")
+                if day_written is not None:
+                    day_written(date)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return sum(daily_totals.values())
+
+
+def day_seed_sequence(seed: int, date: datetime.date, *key: int) -> np.random.SeedSequence:
+    """Derive an independent seed sequence from the master seed, the date and an optional sub-key"""
+    return np.random.SeedSequence(entropy=seed, spawn_key=(date.toordinal(),) + key)
+
+
+def plan_day(seed: int, date: datetime.date, endpoints: int, daily_events: int):
+    """Draw a day's event count and endpoint pool, shared by all shards of that day"""
+    rng = np.random.default_rng(day_seed_sequence(seed, date, 0))
+    low, high = daily_event_range(daily_events)
+    num_events = int(rng.integers(low, high + 1))
+    pool_size = max(1, min(num_events // 10, endpoints))
+    pool = rng.choice(endpoints, size=pool_size, replace=False).astype(np.int32)
+    return num_events, pool
+
+
+def _generate_day_shard(task):
+    """Process-pool worker: generate and save one shard of one day"""
+    (endpoints, daily_events, seed, date, shard, shards_per_day, output_dir,
+     output_formats, compress, store_root, split_by_type, chunk_size) = task
+
+    generator = TelemetryDataGenerator(settings=generation_settings())
+    generator.endpoints = endpoints
+    num_events, pool = plan_day(seed, date, endpoints, daily_events)
+    shard_events = num_events // shards_per_day + (1 if shard < num_events % shards_per_day else 0)
+
+    rng = np.random.default_rng(day_seed_sequence(seed, date, shard + 1))
+    reference_time = datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time())
+
+    date_str = date.strftime("%Y%m%d")
+    suffix = f"_{shard:02d}" if shards_per_day > 1 else ""
+    count, entries = generator.write_day(
+        date, shard_events, f"{output_dir}/telemetry_{date_str}{suffix}", output_formats, compress,
+        store=ColumnarEventStore(store_root), part=f"part-{shard:02d}", batched=True,
+        rng=rng, reference_time=reference_time, endpoint_pool=pool, split_by_type=split_by_type,
+        chunk_size=chunk_size
+    )
+
+    return date, shard, count, entries
 
 if __name__ == "__main__":
     generator = TelemetryDataGenerator()
-    generator.generate_sample_datasets("../data/raw")
+    settings = generation_settings(load_config())
+    generator.generate_sample_datasets("../data/raw", days=settings["simulation_days"],
+                                       output_formats=settings["output_formats"])
     print("Data generation completed!")
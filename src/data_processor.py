@@ -4,33 +4,201 @@ Cleans, processes, and prepares raw telemetry data for analysis
 """
 
 import pandas as pd
-import json
 import os
-from datetime import datetime, timedelta
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from typing import Dict, List, Tuple
+from pandas.api.types import union_categoricals
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from aggregation import (
+    DEFAULT_MERGE_BATCH_INPUTS, PARTIALS_VERSION, TelemetryAggregator, finalize_partials, merge_partials_in_batches
+)
+from config_loader import export_settings, load_config, threshold_settings
+from dedup import EventKeyIndex, duplicated_keys, event_keys
+from event_store import ColumnarEventStore
+from incremental import PartialAggregateStore
+from output_sinks import PARTITIONED_ROWS_DIR, OutputSinks
+from run_metrics import StepTimes
+from sketches import DEFAULT_HLL_PRECISION, DEFAULT_QUANTILE_ACCURACY
+from telemetry_schema import (
+    EVENT_TYPES, EVENT_FIELDS, TELEMETRY_CSV_FIELDS, DYNAMIC_CATEGORICAL_FIELDS, NUMERIC_FIELD_DTYPES,
+    RAW_CSV_DTYPES, TIMESTAMP_FORMAT
+)
+
+# Nullable integers parse much faster as float32 and are cast afterwards
+NULLABLE_INT_FIELDS = {field: dtype for field, dtype in NUMERIC_FIELD_DTYPES.items() if dtype.startswith('Int')}
+RAW_CSV_PARSE_DTYPES = {**RAW_CSV_DTYPES, **{field: 'float32' for field in NULLABLE_INT_FIELDS}}
 
 class TelemetryDataProcessor:
-    def __init__(self, raw_data_path: str = "../data/raw", processed_data_path: str = "../data/processed"):
+    def __init__(self, raw_data_path: str = "../data/raw", processed_data_path: str = "../data/processed",
+                 distinct_mode: str = "hll", hll_precision: int = DEFAULT_HLL_PRECISION,
+                 quantile_accuracy: float = DEFAULT_QUANTILE_ACCURACY, export: Dict = None,
+                 thresholds: Dict = None, merge_batch_inputs: int = DEFAULT_MERGE_BATCH_INPUTS):
         self.raw_data_path = raw_data_path
         self.processed_data_path = processed_data_path
+        self.distinct_mode = distinct_mode
+        self.hll_precision = hll_precision
+        self.quantile_accuracy = quantile_accuracy
+        config = load_config() if export is None or thresholds is None else {}
+        self.export = export_settings(config) if export is None else export
+        self.thresholds = threshold_settings(config) if thresholds is None else thresholds
+        self.merge_batch_inputs = merge_batch_inputs  # Inputs' partials held at once while merging
+        self.aggregates = None  # Aggregate tables of the last process_all_data() run, for in-process handoff
+        self.steps = StepTimes()  # Time spent per step (load, clean, aggregate, save, merge, export)
         os.makedirs(processed_data_path, exist_ok=True)
     
-    def load_raw_data(self) -> pd.DataFrame:
-        """Load all raw telemetry data files"""
-        all_data = []
+    def raw_data_files(self) -> List[str]:
+        """List raw telemetry CSV files in a stable order"""
+        return sorted(
+            os.path.join(self.raw_data_path, filename)
+            for filename in os.listdir(self.raw_data_path)
+            if filename.startswith("telemetry_") and filename.endswith((".csv", ".csv.gz"))
+        )
+    
+    @staticmethod
+    def raw_file_event_type(file_path: str) -> str:
+        """Event type of a split raw table file, or None for a legacy wide file"""
+        stem = os.path.basename(file_path).split('.')[0]
+        for event_type in EVENT_TYPES:
+            if stem.endswith(f"_{event_type}"):
+                return event_type
+        return None
+    
+    def iter_raw_chunks(self, columns: List[str] = None, chunksize: int = None,
+                        files: List[str] = None) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """Yield (event_type, typed frame) pairs from the raw CSV files (or the given files)
+
+        Split table files are read with only their event type's fields; legacy
+        wide files are split by event type as each chunk is read. Files are read
+        chunksize rows at a time (whole files when None).
+        """
+        for file_path in (files if files is not None else self.raw_data_files()):
+            event_type = self.raw_file_event_type(file_path)
+            fields = EVENT_FIELDS[event_type] if event_type else TELEMETRY_CSV_FIELDS
+            usecols = [field for field in fields if columns is None or field in columns]
+            if event_type is None:
+                usecols = lambda name, wanted=set(usecols): name in wanted
+            
+            reader = pd.read_csv(file_path, dtype=RAW_CSV_PARSE_DTYPES, usecols=usecols, chunksize=chunksize)
+            for chunk in ([reader] if chunksize is None else reader):
+                for field in NULLABLE_INT_FIELDS.keys() & set(chunk.columns):
+                    chunk[field] = chunk[field].astype(NULLABLE_INT_FIELDS[field])
+                if 'timestamp' in chunk.columns:
+                    chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], format=TIMESTAMP_FORMAT)
+                
+                if event_type is not None:
+                    yield event_type, chunk
+                else:
+                    yield from self.split_event_tables(chunk).items()
+    
+    @staticmethod
+    def split_event_tables(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Split a wide frame into per-event-type tables holding only that type's fields"""
+        tables = {}
+        if df.empty or 'event_type' not in df.columns:
+            return tables
+        for event_type, group in df.groupby('event_type', observed=True, sort=False):
+            fields = [field for field in EVENT_FIELDS.get(str(event_type), df.columns) if field in group.columns]
+            tables[str(event_type)] = group[fields].reset_index(drop=True)
+        return tables
+    
+    def load_raw_tables(self, columns: List[str] = None, chunksize: int = None) -> Dict[str, pd.DataFrame]:
+        """Load raw telemetry as one typed table per event type"""
+        store = ColumnarEventStore(os.path.join(self.raw_data_path, "columnar"))
+        if store.exists():
+            print(f"Loading columnar store: {len(store.partitions())} partitions")
+            tables = {
+                event_type: store.to_dataframe(columns=columns, event_types=[event_type])
+                for event_type in EVENT_TYPES
+            }
+            return {event_type: table for event_type, table in tables.items() if not table.empty}
         
-        for filename in os.listdir(self.raw_data_path):
-            if filename.startswith("telemetry_") and filename.endswith(".csv"):
-                file_path = os.path.join(self.raw_data_path, filename)
-                df = pd.read_csv(file_path)
-                all_data.append(df)
+        chunks = {}
+        for event_type, chunk in self.iter_raw_chunks(columns, chunksize):
+            chunks.setdefault(event_type, []).append(chunk)
         
-        if all_data:
-            combined_df = pd.concat(all_data, ignore_index=True)
-            return combined_df
-        else:
+        tables = {event_type: self.concat_typed(frames) for event_type, frames in chunks.items()}
+        self.report_memory(tables)
+        return tables
+    
+    def load_raw_data(self, columns: List[str] = None, chunksize: int = None, typed: bool = True) -> pd.DataFrame:
+        """Load all raw telemetry data files as one wide frame"""
+        if not typed:
+            all_data = [pd.read_csv(file_path, usecols=columns) for file_path in self.raw_data_files()]
+            return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+        
+        tables = self.load_raw_tables(columns, chunksize)
+        if not tables:
             return pd.DataFrame()
+        return self.concat_typed(list(tables.values()))
+    
+    @staticmethod
+    def concat_typed(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """Concatenate typed chunks, unifying data-driven categories so they stay categorical"""
+        columns = list(frames[0].columns)
+        dynamic = {
+            col: union_categoricals([frame.pop(col) for frame in frames])
+            for col in DYNAMIC_CATEGORICAL_FIELDS
+            if col in columns and all(isinstance(frame[col].dtype, pd.CategoricalDtype)
+                                      for frame in frames if col in frame.columns)
+            and all(col in frame.columns for frame in frames)
+        }
+        combined_df = pd.concat(frames, ignore_index=True, sort=False)
+        for col in sorted(dynamic, key=columns.index):
+            combined_df.insert(columns.index(col), col, dynamic[col])
+        return combined_df
+    
+    def report_memory(self, tables: Dict[str, pd.DataFrame], sample_rows: int = 10000):
+        """Print in-memory bytes per row, typed tables vs. an untyped sample of the first raw file"""
+        rows = sum(len(table) for table in tables.values())
+        if not rows:
+            return
+        typed_bpr = sum(table.memory_usage(deep=True).sum() for table in tables.values()) / rows
+        sample = pd.read_csv(self.raw_data_files()[0], nrows=sample_rows)
+        untyped_bpr = sample.memory_usage(deep=True).sum() / max(len(sample), 1)
+        print(f"Loaded {rows:,} rows: {typed_bpr:.0f} bytes/row typed "
+              f"vs {untyped_bpr:.0f} bytes/row untyped ({untyped_bpr / typed_bpr:.1f}x smaller)")
+    
+    def load_columnar_data(self, store: ColumnarEventStore, columns: List[str] = None,
+                           event_types: List[str] = None) -> pd.DataFrame:
+        """Load raw telemetry from the memory-mapped columnar store"""
+        print(f"Loading columnar store: {len(store.partitions())} partitions")
+        return store.to_dataframe(columns=columns, event_types=event_types)
+    
+    def raw_inputs(self) -> Dict[str, List[str]]:
+        """Units of incremental processing: each raw CSV file, or each columnar store partition
+
+        Maps an input name to the files whose contents identify it.
+        """
+        store = ColumnarEventStore(os.path.join(self.raw_data_path, "columnar"))
+        if store.exists():
+            return {
+                f"columnar/{partition['path']}": store.partition_files(partition)
+                for partition in store.partitions()
+            }
+        return {os.path.basename(path): [path] for path in self.raw_data_files()}
+    
+    def load_input_tables(self, name: str, paths: List[str]) -> Dict[str, pd.DataFrame]:
+        """Load one raw input as typed per-event-type tables"""
+        if name.startswith("columnar/"):
+            store = ColumnarEventStore(os.path.join(self.raw_data_path, "columnar"))
+            partition_path = name[len("columnar/"):]
+            event_type = store.partitions(paths=[partition_path])[0]["event_type"]
+            return {event_type: store.to_dataframe(paths=[partition_path])}
+        
+        chunks = {}
+        for event_type, chunk in self.iter_raw_chunks(files=paths):
+            chunks.setdefault(event_type, []).append(chunk)
+        return {event_type: self.concat_typed(frames) for event_type, frames in chunks.items()}
+    
+    @staticmethod
+    def processed_key(name: str) -> str:
+        """Output name stem for one raw input, e.g. 20240101_scan or 20240101_part-00-000_scan"""
+        if name.startswith("columnar/"):
+            date, event_type, part = [piece.split("=")[-1] for piece in name.split("/")[1:]]
+            return f"{date}_{part}_{event_type}"
+        return os.path.basename(name).split('.')[0].replace("telemetry_", "", 1)
     
     def load_endpoints_data(self) -> pd.DataFrame:
         """Load endpoints registry data"""
@@ -57,127 +225,77 @@ class TelemetryDataProcessor:
         numeric_columns = df.select_dtypes(include=[np.number]).columns
         df[numeric_columns] = df[numeric_columns].fillna(0)
         
-        # Fill missing values for string columns
-        string_columns = df.select_dtypes(include=['object']).columns
-        for col in string_columns:
-            if col not in critical_fields:
+        # Fill missing values for string and categorical columns
+        for col in df.columns:
+            if col in critical_fields:
+                continue
+            dtype = df[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                if df[col].isna().any():
+                    if 'unknown' not in dtype.categories:
+                        df[col] = df[col].cat.add_categories('unknown')
+                    df[col] = df[col].fillna('unknown')
+            elif pd.api.types.is_object_dtype(dtype) or isinstance(dtype, pd.StringDtype):
                 df[col] = df[col].fillna('unknown')
         
         print(f"Cleaned data shape: {df.shape}")
         return df
     
-    def create_aggregated_metrics(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    def clean_tables(self, tables: Dict[str, pd.DataFrame], key_index: EventKeyIndex = None) -> Dict[str, pd.DataFrame]:
+        """Clean and validate per-event-type tables
+
+        Tables only carry their own event type's fields, so no sparse columns
+        need filling with placeholder zeros or 'unknown'. Events are
+        deduplicated on 128-bit event_id keys, and also against key_index
+        (events already counted from other inputs) when one is given.
+        """
+        critical_fields = ['event_id', 'timestamp', 'endpoint_id']
+        cleaned = {}
+        
+        for event_type, df in tables.items():
+            original_rows = len(df)
+            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = df.dropna(subset=[field for field in critical_fields if field in df.columns])
+            
+            keys = event_keys(df['event_id'].to_numpy())
+            new = key_index.filter_new(keys) if key_index is not None else ~duplicated_keys(keys)
+            if not new.all():
+                df = df[new]
+            cleaned[event_type] = df.reset_index(drop=True)
+            print(f"Cleaned {event_type}: {original_rows:,} -> {len(df):,} rows, {df.shape[1]} columns")
+        
+        return cleaned
+    
+    def _as_tables(self, data) -> Dict[str, pd.DataFrame]:
+        """Accept either per-event-type tables or a legacy wide frame"""
+        if isinstance(data, pd.DataFrame):
+            return self.split_event_tables(data)
+        return data
+    
+    def aggregate(self, tables) -> Dict:
+        """Run the single-pass aggregation engine over per-event-type tables"""
+        return self.aggregator(self._as_tables(tables)).aggregate()
+    
+    def aggregator(self, tables: Dict[str, pd.DataFrame]) -> TelemetryAggregator:
+        """Aggregation engine configured with this processor's distinct-count mode"""
+        return TelemetryAggregator(tables, distinct_mode=self.distinct_mode, hll_precision=self.hll_precision,
+                                   quantile_accuracy=self.quantile_accuracy, thresholds=self.thresholds)
+    
+    def create_aggregated_metrics(self, tables) -> Dict[str, pd.DataFrame]:
         """Create aggregated metrics for different analysis levels"""
-        aggregated_data = {}
-        
-        # Daily aggregations
-        daily_agg = df.groupby(df['timestamp'].dt.date).agg({
-            'event_id': 'count',
-            'endpoint_id': 'nunique',
-            'cpu_usage_avg': 'mean',
-            'memory_usage_mb': 'mean'
-        }).reset_index()
-        daily_agg.rename(columns={'event_id': 'total_events', 'endpoint_id': 'active_endpoints'}, inplace=True)
-        aggregated_data['daily_metrics'] = daily_agg
-        
-        # Endpoint-level aggregations
-        endpoint_agg = df.groupby('endpoint_id').agg({
-            'event_id': 'count',
-            'threats_found': 'sum',
-            'threats_cleaned': 'sum',
-            'scan_duration': 'mean',
-            'cpu_usage_avg': 'mean',
-            'false_positive': lambda x: x.sum() if x.dtype == bool else 0
-        }).reset_index()
-        endpoint_agg.rename(columns={'event_id': 'total_events'}, inplace=True)
-        aggregated_data['endpoint_metrics'] = endpoint_agg
-        
-        # Threat analysis
-        threat_df = df[df['event_type'] == 'threat_detection'].copy()
-        if not threat_df.empty:
-            threat_agg = threat_df.groupby(['threat_type', 'severity']).agg({
-                'event_id': 'count',
-                'false_positive': lambda x: x.sum() if x.dtype == bool else 0
-            }).reset_index()
-            threat_agg.rename(columns={'event_id': 'threat_count'}, inplace=True)
-            aggregated_data['threat_analysis'] = threat_agg
-        
-        # Performance metrics
-        perf_df = df[df['event_type'] == 'performance'].copy()
-        if not perf_df.empty:
-            perf_agg = perf_df.groupby(perf_df['timestamp'].dt.hour).agg({
-                'cpu_usage': 'mean',
-                'memory_usage': 'mean',
-                'antivirus_cpu_impact': 'mean'
-            }).reset_index()
-            aggregated_data['hourly_performance'] = perf_agg
-        
-        return aggregated_data
+        return self.aggregate(tables)['aggregated_data']
     
-    def identify_pain_points(self, df: pd.DataFrame) -> Dict[str, any]:
+    def identify_pain_points(self, tables) -> Dict[str, any]:
         """Identify key pain points from the data"""
-        pain_points = {}
-        
-        # High false positive rate
-        threat_df = df[df['event_type'] == 'threat_detection'].copy()
-        if not threat_df.empty and 'false_positive' in threat_df.columns:
-            false_positive_rate = threat_df['false_positive'].mean() * 100
-            pain_points['false_positive_rate'] = {
-                'value': round(false_positive_rate, 2),
-                'threshold': 10,  # 10% threshold
-                'status': 'critical' if false_positive_rate > 10 else 'normal'
-            }
-        
-        # System performance impact
-        perf_df = df[df['event_type'] == 'performance'].copy()
-        if not perf_df.empty and 'antivirus_cpu_impact' in perf_df.columns:
-            avg_cpu_impact = perf_df['antivirus_cpu_impact'].mean()
-            pain_points['avg_cpu_impact'] = {
-                'value': round(avg_cpu_impact, 2),
-                'threshold': 15,  # 15% threshold
-                'status': 'warning' if avg_cpu_impact > 15 else 'normal'
-            }
-        
-        # Scan failure rate
-        scan_df = df[df['event_type'] == 'scan'].copy()
-        if not scan_df.empty and 'scan_status' in scan_df.columns:
-            failure_rate = (scan_df['scan_status'] != 'completed').mean() * 100
-            pain_points['scan_failure_rate'] = {
-                'value': round(failure_rate, 2),
-                'threshold': 5,  # 5% threshold
-                'status': 'critical' if failure_rate > 5 else 'normal'
-            }
-        
-        # User satisfaction (based on feedback)
-        feedback_df = df[df['event_type'] == 'user_feedback'].copy()
-        if not feedback_df.empty and 'sentiment' in feedback_df.columns:
-            negative_feedback_rate = (feedback_df['sentiment'] == 'negative').mean() * 100
-            pain_points['negative_feedback_rate'] = {
-                'value': round(negative_feedback_rate, 2),
-                'threshold': 30,  # 30% threshold
-                'status': 'warning' if negative_feedback_rate > 30 else 'normal'
-            }
-        
-        return pain_points
+        return self.aggregate(tables)['pain_points']
     
-    def generate_insights_summary(self, df: pd.DataFrame, pain_points: Dict) -> Dict:
+    def generate_insights_summary(self, tables, pain_points: Dict, overview: Dict = None) -> Dict:
         """Generate summary insights for executive dashboard"""
-        total_events = len(df)
-        unique_endpoints = df['endpoint_id'].nunique()
-        date_range = f"{df['timestamp'].min().date()} to {df['timestamp'].max().date()}"
-        
-        # Calculate key metrics
-        threat_events = len(df[df['event_type'] == 'threat_detection'])
-        scan_events = len(df[df['event_type'] == 'scan'])
+        if overview is None:
+            overview = self.aggregate(tables)['overview']
         
         summary = {
-            'overview': {
-                'total_events': total_events,
-                'unique_endpoints': unique_endpoints,
-                'date_range': date_range,
-                'threat_events': threat_events,
-                'scan_events': scan_events
-            },
+            'overview': overview,
             'pain_points': pain_points,
             'recommendations': self.generate_recommendations(pain_points)
         }
@@ -204,51 +322,221 @@ class TelemetryDataProcessor:
         
         return recommendations
     
-    def save_processed_data(self, df: pd.DataFrame, aggregated_data: Dict, insights: Dict):
-        """Save all processed data to files"""
-        # Save main processed dataset
-        df.to_csv(os.path.join(self.processed_data_path, "telemetry_processed.csv"), index=False)
-        df.to_json(os.path.join(self.processed_data_path, "telemetry_processed.json"), orient='records', indent=2)
-        
-        # Save aggregated datasets
-        for name, data in aggregated_data.items():
-            data.to_csv(os.path.join(self.processed_data_path, f"{name}.csv"), index=False)
-            data.to_json(os.path.join(self.processed_data_path, f"{name}.json"), orient='records', indent=2)
-        
-        # Save insights
-        with open(os.path.join(self.processed_data_path, "insights_summary.json"), 'w') as f:
-            json.dump(insights, f, indent=2, default=str)
+    def output_sinks(self) -> OutputSinks:
+        return OutputSinks.from_settings(self.processed_data_path, self.export)
+    
+    def row_export_settings(self) -> Dict:
+        """Export settings that shape each input's processed table files (a change redoes every input)"""
+        return {
+            'include_raw_data': self.export['include_raw_data'],
+            'formats': self.export['artifacts'].get('processed_tables', self.export['formats']),
+            'compress': self.export['compress'],
+            'partition_by': self.export['partition_by']
+        }
+    
+    def save_processed_tables(self, tables: Dict[str, pd.DataFrame], key: str) -> Tuple[List[str], List[Dict]]:
+        """Save one input's cleaned tables; returns the exported file names and columnar store entries
+
+        Each event type goes to the processed columnar store under part <key>
+        and, when export.include_raw_data is set, to the processed_tables sinks
+        as telemetry_processed_<key>[_<event_type>]. The store entries are left
+        for the caller to commit.
+        """
+        store = ColumnarEventStore(os.path.join(self.processed_data_path, "columnar"))
+        entries = []
+        with self.output_sinks() as sinks:
+            for event_type, table in tables.items():
+                stem = key if key.endswith(f"_{event_type}") else f"{key}_{event_type}"
+                if self.export["include_raw_data"]:
+                    sinks.write_rows("processed_tables", f"telemetry_processed_{stem}", table)
+                entries.extend(store.write_frame(table, part=key, commit=False))
+        return sinks.outputs, entries
+    
+    def process_input(self, name: str, paths: List[str], key_index: EventKeyIndex) -> Dict:
+        """Map step: load, clean, deduplicate, aggregate and save one raw input
+
+        Returns its partial aggregates, output files, store entries, the
+        sorted keys of the events it kept (not yet committed to key_index) and
+        the time spent in each step.
+        """
+        steps = StepTimes()
+        with steps.step("load") as step:
+            tables = self.load_input_tables(name, paths)
+            step["rows"] = sum(len(table) for table in tables.values())
+        with steps.step("clean") as step:
+            tables = self.clean_tables(tables, key_index)
+            keys, duplicates = key_index.take_pending()
+            step["rows"] = sum(len(table) for table in tables.values())
+        with steps.step("aggregate") as step:
+            partials = self.aggregator(tables).partials()
+            step["rows"] = sum(len(table) for table in tables.values())
+        with steps.step("save") as step:
+            outputs, entries = self.save_processed_tables(tables, self.processed_key(name))
+            step["rows"] = sum(len(table) for table in tables.values())
+        return {'partials': partials, 'outputs': outputs, 'entries': entries,
+                'keys': keys, 'duplicates': duplicates, 'steps': steps.steps}
+    
+    def remove_processed_tables(self, outputs: List[str], key: str):
+        """Delete the processed tables saved for an input that no longer exists or changed"""
+        ColumnarEventStore(os.path.join(self.processed_data_path, "columnar")).drop_parts([key])
+        for name in outputs:
+            path = os.path.join(self.processed_data_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def clear_processed_tables(self):
+        """Delete every processed table, including those written before incremental processing"""
+        ColumnarEventStore(os.path.join(self.processed_data_path, "columnar")).clear()
+        shutil.rmtree(os.path.join(self.processed_data_path, PARTITIONED_ROWS_DIR), ignore_errors=True)
+        for name in os.listdir(self.processed_data_path):
+            if name.startswith("telemetry_processed") and name.endswith((".csv", ".json", ".ndjson", ".gz")):
+                os.remove(os.path.join(self.processed_data_path, name))
+    
+    def save_processed_data(self, aggregated_data: Dict, insights: Dict):
+        """Save aggregated datasets and insights, serializing them concurrently"""
+        with self.output_sinks() as sinks:
+            for name, data in aggregated_data.items():
+                sinks.write_frame(name, name, data)
+            sinks.write_json("insights_summary.json", insights)
         
         print(f"Processed data saved to {self.processed_data_path}")
     
-    def process_all_data(self):
-        """Main processing pipeline"""
+    def inputs_for_date(self, date) -> Dict[str, List[str]]:
+        """Raw inputs holding one day's telemetry"""
+        prefix = date.strftime("%Y%m%d")
+        return {name: paths for name, paths in self.raw_inputs().items()
+                if self.processed_key(name).startswith(prefix)}
+    
+    def update_inputs(self, state: PartialAggregateStore, key_index: EventKeyIndex, inputs: Dict[str, List[str]],
+                      changed: List[str], removed: List[str], executor: ProcessPoolExecutor = None) -> List[Dict]:
+        """Drop removed inputs, then map and reduce the changed ones into state
+
+        Returns the processed columnar store entries, left for the caller to commit.
+        """
+        if removed or any(state.entry(name) for name in changed):
+            # Events owned by a removed or changed input may have been dropped as
+            # duplicates elsewhere, so inputs that dropped duplicates are redone
+            # (those outside inputs are dropped and processed again when next planned)
+            redo = [name for name, entry in state.manifest['inputs'].items()
+                    if entry.get('duplicates') and name not in changed and name not in removed]
+            changed += [name for name in redo if name in inputs]
+            removed = removed + [name for name in redo if name not in inputs]
+        changed.sort()
+        
+        for name in removed + [name for name in changed if state.entry(name)]:
+            self.remove_processed_tables(state.remove(name)["outputs"], self.processed_key(name))
+            key_index.remove(name)
+        
+        # Map: load, clean, deduplicate and aggregate each new or changed input
+        parallel = executor is not None and len(changed) > 1
+        if parallel:
+            tasks = [(self.raw_data_path, self.processed_data_path, self.distinct_mode, self.hll_precision,
+                      self.quantile_accuracy, self.export, self.thresholds, name, inputs[name]) for name in changed]
+            results = executor.map(_process_input, tasks)
+        else:
+            results = (self.process_input(name, inputs[name], key_index) for name in changed)
+        
+        # Reduce, in input order
+        entries = []
+        for name, result in zip(changed, results):
+            if parallel and key_index.contains(result['keys']).any():
+                # Workers only see keys committed before this run; redo an input that
+                # shares events with an earlier input of the same run
+                result = self.process_input(name, inputs[name], key_index)
+            key_index.write_segment(name, result['keys'])
+            if result['duplicates']:
+                print(f"Dropped {result['duplicates']:,} duplicate events from {name}")
+            entries.extend(result['entries'])
+            self.steps.merge(result['steps'])
+            state.save(name, inputs[name], result['partials'], result['outputs'],
+                       duplicates=result['duplicates'])
+        return entries
+    
+    def process_all_data(self, incremental: bool = True, workers: int = 1, arrivals: Iterable = None):
+        """Main processing pipeline
+
+        Only raw inputs that are new or changed since the last run are loaded,
+        cleaned and aggregated; their partial aggregates are merged with the
+        persisted partials of every unchanged input. With workers > 1 the
+        inputs are processed in a process pool and only their compact
+        partials come back to be merged.
+
+        arrivals, when given, yields dates as their raw files are completed
+        (by a generator still writing later days): each day's inputs are
+        processed as soon as it arrives, and the final pass over all raw
+        inputs then finds them unchanged and only handles what remains.
+        """
         print("Starting data processing pipeline...")
+        self.steps = StepTimes()
         
-        # Load raw data
-        raw_df = self.load_raw_data()
-        if raw_df.empty:
+        if arrivals is None and not self.raw_inputs():
             print("No raw data found!")
             return
         
-        # Clean data
-        cleaned_df = self.clean_data(raw_df)
-        
-        # Create aggregations
-        aggregated_data = self.create_aggregated_metrics(cleaned_df)
-        
-        # Identify pain points
-        pain_points = self.identify_pain_points(cleaned_df)
+        state = PartialAggregateStore(os.path.join(self.processed_data_path, "partials"), settings={
+            'distinct_mode': self.distinct_mode, 'hll_precision': self.hll_precision,
+            'quantile_accuracy': self.quantile_accuracy, 'partials_version': PARTIALS_VERSION,
+            'row_exports': self.row_export_settings()
+        })
+        key_index = EventKeyIndex(os.path.join(self.processed_data_path, "event_keys"))
+        if not incremental or not state.exists() or not state.compatible():
+            state.clear()
+            key_index.clear()
+            self.clear_processed_tables()
+        
+        store = ColumnarEventStore(os.path.join(self.processed_data_path, "columnar"))
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        entries = []
+        try:
+            for date in (arrivals or []):
+                day_inputs = self.inputs_for_date(date)
+                changed, _ = state.plan(day_inputs)
+                print(f"Raw inputs for {date} ready: {len(changed)} new or changed, "
+                      f"{len(day_inputs) - len(changed)} unchanged")
+                entries.extend(self.update_inputs(state, key_index, day_inputs, changed, [], executor))
+            
+            inputs = self.raw_inputs()
+            if not inputs:
+                print("No raw data found!")
+                return
+            changed, removed = state.plan(inputs)
+            print(f"Raw inputs: {len(changed)} new or changed, {len(inputs) - len(changed)} unchanged, "
+                  f"{len(removed)} removed")
+            entries.extend(self.update_inputs(state, key_index, inputs, changed, removed, executor))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        store.commit(entries)
+        state.commit()
+        
+        # Merge partial aggregates and identify pain points
+        with self.steps.step("merge") as step:
+            results = finalize_partials(merge_partials_in_batches(state.iter_all(), self.merge_batch_inputs),
+                                        self.quantile_accuracy, self.thresholds)
+            step["rows"] = results['overview']['total_events']
+        aggregated_data = results['aggregated_data']
+        self.aggregates = results
         
         # Generate insights
-        insights = self.generate_insights_summary(cleaned_df, pain_points)
+        insights = self.generate_insights_summary(None, results['pain_points'], results['overview'])
         
         # Save processed data
-        self.save_processed_data(cleaned_df, aggregated_data, insights)
+        with self.steps.step("export"):
+            self.save_processed_data(aggregated_data, insights)
         
         print("Data processing completed!")
         return insights
 
+def _process_input(task):
+    """Process-pool worker: the map step for one raw input"""
+    (raw_data_path, processed_data_path, distinct_mode, hll_precision, quantile_accuracy, export, thresholds,
+     name, paths) = task
+    processor = TelemetryDataProcessor(raw_data_path, processed_data_path, distinct_mode=distinct_mode,
+                                       hll_precision=hll_precision, quantile_accuracy=quantile_accuracy,
+                                       export=export, thresholds=thresholds)
+    key_index = EventKeyIndex(os.path.join(processed_data_path, "event_keys"))
+    return processor.process_input(name, paths, key_index)
+
 if __name__ == "__main__":
     processor = TelemetryDataProcessor()
     insights = processor.process_all_data()
@@ -0,0 +1,166 @@
+"""
+Event Deduplication
+128-bit event keys and a persistent sorted-key index for deduplicating across files and runs
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+# ASCII byte -> hex nibble value (255 for non-hex bytes)
+HEX_LOOKUP = np.full(256, 255, dtype=np.uint8)
+for _value, _char in enumerate(b"0123456789abcdef"):
+    HEX_LOOKUP[_char] = _value
+    HEX_LOOKUP[ord(chr(_char).upper())] = _value
+
+UUID_LENGTH = 36
+UUID_DASH_POSITIONS = [8, 13, 18, 23]
+UUID_HEX_POSITIONS = np.array([i for i in range(UUID_LENGTH) if i not in UUID_DASH_POSITIONS])
+NIBBLE_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)
+
+# Fallback hash keys (16 bytes each) for event ids that are not canonical UUIDs
+FALLBACK_HASH_KEYS = ("event-key-high-1", "event-key-low-02")
+# Ids converted per block: the conversion briefly needs about 500 bytes per id
+KEY_BLOCK_ROWS = 1 << 18
+
+
+def event_keys(event_ids) -> np.ndarray:
+    """Convert event ids to (n, 2) uint64 [high, low] keys without a Python loop
+
+    Canonical UUID strings map to their 128-bit value; any other id falls back
+    to two independent 64-bit hashes of the string. Ids are converted
+    KEY_BLOCK_ROWS at a time, so the temporaries stay bounded.
+    """
+    ids = pd.Series(event_ids, dtype=object).astype(str)
+    if len(ids) > KEY_BLOCK_ROWS:
+        return np.concatenate([block_keys(ids.iloc[start:start + KEY_BLOCK_ROWS])
+                               for start in range(0, len(ids), KEY_BLOCK_ROWS)])
+    return block_keys(ids)
+
+
+def block_keys(ids: pd.Series) -> np.ndarray:
+    """event_keys() of one block of string ids"""
+    raw = ids.to_numpy().astype(f"U{UUID_LENGTH}")
+    try:
+        chars = raw.astype(f"S{UUID_LENGTH}").view(np.uint8).reshape(-1, UUID_LENGTH)
+    except UnicodeEncodeError:
+        chars = np.zeros((len(ids), UUID_LENGTH), dtype=np.uint8)
+
+    nibbles = HEX_LOOKUP[chars[:, UUID_HEX_POSITIONS]].astype(np.uint64)
+    valid = ((ids.str.len().to_numpy() == UUID_LENGTH)
+             & (chars[:, UUID_DASH_POSITIONS] == ord("-")).all(axis=1)
+             & (nibbles != 255).all(axis=1))
+
+    keys = np.empty((len(ids), 2), dtype=np.uint64)
+    keys[:, 0] = np.bitwise_or.reduce(nibbles[:, :16] << NIBBLE_SHIFTS, axis=1)
+    keys[:, 1] = np.bitwise_or.reduce(nibbles[:, 16:] << NIBBLE_SHIFTS, axis=1)
+    if not valid.all():
+        other = ids.to_numpy()[~valid]
+        for word, hash_key in enumerate(FALLBACK_HASH_KEYS):
+            keys[~valid, word] = pd.util.hash_array(other, hash_key=hash_key)
+    return keys
+
+
+def sortable_keys(keys: np.ndarray) -> np.ndarray:
+    """View (n, 2) uint64 keys as big-endian 16-byte strings, which sort in key order"""
+    return np.ascontiguousarray(keys.astype(">u8")).view("S16").ravel()
+
+
+def duplicated_keys(keys: np.ndarray) -> np.ndarray:
+    """Mask of keys that repeat an earlier key in the same array"""
+    return pd.DataFrame(keys).duplicated().to_numpy()
+
+
+class EventKeyIndex:
+    """Sorted 128-bit keys of every event already counted, one segment per raw input
+
+    Segments are sorted .npy arrays, memory-mapped for membership tests with
+    binary search. They are exact (no false positives) at 16 bytes per event,
+    and an input's keys can be dropped by deleting its segment, so changed or
+    removed inputs release the events they owned.
+
+    Chunks are filtered with filter_new(); the keys they accept stay pending
+    until commit() writes them as the input's segment.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.pending: List[np.ndarray] = []
+        self.duplicates = 0
+
+    def segment_path(self, name: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(name.encode("utf-8")).hexdigest()[:16] + ".npy")
+
+    def segments(self) -> List[np.ndarray]:
+        """Memory-map every committed segment"""
+        return [np.load(path, mmap_mode='r') for path in sorted(glob.glob(os.path.join(self.root, "*.npy")))]
+
+    def size(self) -> int:
+        """Number of committed keys"""
+        return sum(len(segment) for segment in self.segments())
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Mask of keys already committed to the index or pending in this run
+
+        Accepts (n, 2) uint64 keys or their sortable 16-byte form.
+        """
+        needles = keys if keys.dtype == np.dtype("S16") else sortable_keys(keys)
+        order = np.argsort(needles)
+        sorted_needles = needles[order]
+        found = np.zeros(len(needles), dtype=bool)
+        for segment in self.segments() + self.pending:
+            if len(segment) == 0:
+                continue
+            positions = np.searchsorted(segment, sorted_needles)
+            hit = positions < len(segment)
+            hit[hit] = segment[positions[hit]] == sorted_needles[hit]
+            found[order[hit]] = True
+        return found
+
+    def filter_new(self, keys: np.ndarray) -> np.ndarray:
+        """Mask of first occurrences of keys not yet seen; accepted keys become pending"""
+        new = ~duplicated_keys(keys)
+        new[new] = ~self.contains(keys[new])
+        self.pending.append(np.sort(sortable_keys(keys[new])))
+        self.duplicates += int(len(keys) - new.sum())
+        return new
+
+    def take_pending(self):
+        """Remove and return (sorted pending keys, duplicates rejected) since the last commit"""
+        keys = np.sort(np.concatenate(self.pending)) if self.pending else np.array([], dtype="S16")
+        duplicates = self.duplicates
+        self.pending, self.duplicates = [], 0
+        return keys, duplicates
+
+    def write_segment(self, name: str, keys: np.ndarray):
+        """Write sorted 16-byte keys as the named input's segment"""
+        os.makedirs(self.root, exist_ok=True)
+        path = self.segment_path(name)
+        # Not named *.npy, so workers listing segments never load a half-written one
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, keys, allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def commit(self, name: str) -> int:
+        """Write pending keys as the named input's segment; returns the duplicates it rejected"""
+        keys, duplicates = self.take_pending()
+        self.write_segment(name, keys)
+        return duplicates
+
+    def remove(self, name: str):
+        """Forget the keys owned by an input"""
+        path = self.segment_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def clear(self):
+        """Forget every key"""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        self.pending, self.duplicates = [], 0
@@ -0,0 +1,303 @@
+"""
+Columnar Event Store
+Memory-mapped, partitioned NumPy column files for raw and processed telemetry
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from telemetry_schema import (
+    EVENT_TYPES, FIELD_VOCABULARIES, FEEDBACK_TYPES, FEEDBACK_TEXTS, THREAT_TYPES
+)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Largest dictionary kept in the manifest; higher-cardinality strings are stored as fixed-width bytes
+MAX_DICTIONARY_SIZE = 4096
+
+# Raw text columns rebuilt from component code columns on read
+DERIVED_TEMPLATES = {
+    "threat_name": ("Threat.{}.{}", ["threat_name_type", "threat_name_number"]),
+    "file_path": ("C:\\Users\\{}\\{}\\suspicious_file_{}.exe",
+                  ["file_path_user", "file_path_folder", "file_path_number"])
+}
+
+# Component columns that only exist to rebuild derived text columns
+DERIVED_INPUTS = {name for _, inputs in DERIVED_TEMPLATES.values() for name in inputs}
+
+
+def uuid_words_to_strings(words: np.ndarray) -> np.ndarray:
+    """Format (n, 2) uint64 [high, low] words as canonical UUID strings without a Python loop"""
+    hex_digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    raw = np.ascontiguousarray(words.astype(">u8")).view(np.uint8).reshape(-1, 16)
+    nibbles = np.empty((len(raw), 32), dtype=np.uint8)
+    nibbles[:, 0::2] = raw >> 4
+    nibbles[:, 1::2] = raw & 0x0F
+    chars = np.full((len(raw), 36), ord("-"), dtype=np.uint8)
+    # (output offset, nibble offset, width) of the 8-4-4-4-12 hex groups
+    for dst, src, width in ((0, 0, 8), (9, 8, 4), (14, 12, 4), (19, 16, 4), (24, 20, 12)):
+        chars[:, dst:dst + width] = hex_digits[nibbles[:, src:src + width]]
+    return chars.view("S36").ravel().astype("U36")
+
+
+class ColumnarEventStore:
+    """One .npy file per column per (date, event_type) partition, plus a JSON manifest
+
+    Columns are opened with numpy.load(mmap_mode='r'), so opening a store is a
+    manifest read and only the pages of projected columns are ever touched.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def load_manifest(self) -> Dict:
+        """Load the store manifest (empty when the store has not been written yet)"""
+        if not self.exists():
+            return {"version": MANIFEST_VERSION, "partitions": []}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def clear(self):
+        """Remove every partition and the manifest"""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+
+    def drop_dates(self, dates: Iterable[str]):
+        """Remove all partitions for the given ISO dates"""
+        dates = set(dates)
+        manifest = self.load_manifest()
+        for date in dates:
+            shutil.rmtree(os.path.join(self.root, f"date={date.replace('-', '')}"), ignore_errors=True)
+        if self.exists():
+            manifest["partitions"] = [p for p in manifest["partitions"] if p["date"] not in dates]
+            self._write_manifest(manifest)
+
+    def commit(self, entries: List[Dict]):
+        """Add partition entries to the manifest, replacing entries with the same path
+
+        The manifest is written to a temporary file and renamed into place, so
+        readers never observe a half-written manifest.
+        """
+        manifest = self.load_manifest()
+        by_path = {entry["path"]: entry for entry in manifest["partitions"]}
+        for entry in entries:
+            by_path[entry["path"]] = entry
+        manifest["partitions"] = sorted(by_path.values(), key=lambda e: (e["date"], e["event_type"], e["path"]))
+        self._write_manifest(manifest)
+
+    def _write_manifest(self, manifest: Dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_partition(self, date: str, event_type: str, part: str, arrays: Dict[str, np.ndarray],
+                         column_meta: Dict[str, Dict], rows: int) -> Dict:
+        """Write one partition's column files and return its manifest entry"""
+        rel_path = os.path.join(f"date={date.replace('-', '')}", f"event_type={event_type}", part)
+        partition_dir = os.path.join(self.root, rel_path)
+        os.makedirs(partition_dir, exist_ok=True)
+
+        columns = {}
+        for name, meta in column_meta.items():
+            if name in arrays:
+                array = np.ascontiguousarray(arrays[name])
+                # Replace rather than overwrite, so readers and hard-linked snapshots keep the old file
+                path = os.path.join(partition_dir, f"{name}.npy")
+                np.save(path + ".tmp.npy", array, allow_pickle=False)
+                os.replace(path + ".tmp.npy", path)
+                meta = dict(meta, dtype=array.dtype.str, shape=list(array.shape))
+            columns[name] = meta
+
+        return {"date": date, "event_type": event_type, "path": rel_path, "rows": rows, "columns": columns}
+
+    def write_day_columns(self, columns: Dict, part: str = "part-00") -> List[Dict]:
+        """Write batched generator columns (see TelemetryDataGenerator.generate_daily_columns)
+
+        Returns manifest entries; call commit() with them once all parts are written.
+        """
+        date = columns["date"].isoformat()
+        entries = []
+
+        for type_code, event_type in enumerate(EVENT_TYPES):
+            mask = columns["event_type"] == type_code
+            rows = int(mask.sum())
+            if rows == 0:
+                continue
+
+            arrays = {
+                "event_id": columns["event_id"][mask],
+                "timestamp": columns["timestamp"][mask],
+                "endpoint_id": columns["endpoint"][mask],
+                "event_type": np.full(rows, type_code, dtype=np.uint8)
+            }
+            arrays.update(columns["fields"][event_type])
+
+            meta = {
+                "event_id": {"encoding": "uuid128"},
+                "timestamp": {"encoding": "timestamp_us"},
+                "endpoint_id": {"encoding": "prefixed_index", "prefix": "endpoint_"},
+                "event_type": {"encoding": "dictionary", "dictionary": EVENT_TYPES}
+            }
+            for name in columns["fields"][event_type]:
+                if name == "threat_name_type":
+                    meta[name] = {"encoding": "dictionary", "dictionary": [t.title() for t in THREAT_TYPES]}
+                elif name in FIELD_VOCABULARIES:
+                    meta[name] = {"encoding": "dictionary", "dictionary": FIELD_VOCABULARIES[name]}
+                else:
+                    meta[name] = {"encoding": "plain"}
+            if event_type == "user_feedback":
+                meta["feedback_text"] = {
+                    "encoding": "dictionary", "codes_from": "feedback_type",
+                    "dictionary": [FEEDBACK_TEXTS[t] for t in FEEDBACK_TYPES]
+                }
+            for name, (template, inputs) in DERIVED_TEMPLATES.items():
+                if inputs[0] in arrays:
+                    meta[name] = {"encoding": "template", "template": template, "inputs": inputs}
+
+            entries.append(self._write_partition(date, event_type, part, arrays, meta, rows))
+
+        return entries
+
+    def write_frame(self, df, part: str = "part-00", commit: bool = True) -> List[Dict]:
+        """Write a DataFrame partitioned by timestamp date and event_type, then commit it
+
+        With commit=False the manifest entries are only returned, for a single
+        writer (e.g. the parent of worker processes) to commit.
+        """
+        import pandas as pd
+
+        entries = []
+        dates = df["timestamp"].dt.date
+        for (date, event_type), group in df.groupby([dates, "event_type"], sort=True, observed=True):
+            arrays, meta = {}, {}
+            for name in group.columns:
+                series = group[name]
+                if series.isna().all():
+                    continue  # Columns that do not apply to this event type are omitted
+                if pd.api.types.is_datetime64_any_dtype(series):
+                    arrays[name] = series.to_numpy(dtype="datetime64[us]").astype(np.int64)
+                    meta[name] = {"encoding": "timestamp_us"}
+                elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+                    # Nullable extension columns keep their compact numpy dtype unless they hold nulls
+                    numpy_dtype = getattr(series.dtype, "numpy_dtype", None)
+                    if numpy_dtype is not None and series.isna().any():
+                        numpy_dtype = np.float64 if numpy_dtype.kind in "iuf" else None
+                    if numpy_dtype is None and series.isna().any():
+                        codes, uniques = pd.factorize(series)
+                        arrays[name] = codes.astype(np.int32)
+                        meta[name] = {"encoding": "dictionary", "dictionary": [
+                            v.item() if isinstance(v, np.generic) else v for v in uniques
+                        ]}
+                        continue
+                    arrays[name] = series.to_numpy(dtype=numpy_dtype)
+                    meta[name] = {"encoding": "plain"}
+                else:
+                    codes, uniques = pd.factorize(series)
+                    if len(uniques) <= MAX_DICTIONARY_SIZE and len(uniques) * 2 <= len(series):
+                        arrays[name] = codes.astype(np.int32)
+                        meta[name] = {"encoding": "dictionary", "dictionary": [
+                            v.item() if isinstance(v, np.generic) else v for v in uniques
+                        ]}
+                    else:
+                        arrays[name] = series.astype(str).str.encode("utf-8").to_numpy().astype(bytes)
+                        meta[name] = {"encoding": "bytes"}
+            entries.append(self._write_partition(str(date), str(event_type), part, arrays, meta, len(group)))
+
+        if commit:
+            self.commit(entries)
+        return entries
+
+    def drop_parts(self, parts: Iterable[str]):
+        """Remove every partition written under the given part names"""
+        parts = set(parts)
+        manifest = self.load_manifest()
+        dropped = [p for p in manifest["partitions"] if os.path.basename(p["path"]) in parts]
+        for partition in dropped:
+            shutil.rmtree(os.path.join(self.root, partition["path"]), ignore_errors=True)
+        if dropped:
+            manifest["partitions"] = [p for p in manifest["partitions"] if p not in dropped]
+            self._write_manifest(manifest)
+
+    def partitions(self, dates: Iterable[str] = None, event_types: Iterable[str] = None,
+                   paths: Iterable[str] = None) -> List[Dict]:
+        """List manifest partitions, optionally filtered by ISO date, event type and partition path"""
+        dates = set(dates) if dates is not None else None
+        event_types = set(event_types) if event_types is not None else None
+        paths = set(paths) if paths is not None else None
+        return [
+            p for p in self.load_manifest()["partitions"]
+            if (dates is None or p["date"] in dates) and (event_types is None or p["event_type"] in event_types)
+            and (paths is None or p["path"] in paths)
+        ]
+
+    def partition_files(self, partition: Dict) -> List[str]:
+        """Paths of a partition's stored column files"""
+        partition_dir = os.path.join(self.root, partition["path"])
+        return sorted(os.path.join(partition_dir, name) for name in os.listdir(partition_dir))
+
+    def open_column(self, partition: Dict, name: str) -> np.ndarray:
+        """Memory-map one stored column of a partition"""
+        return np.load(os.path.join(self.root, partition["path"], f"{name}.npy"), mmap_mode='r')
+
+    def _decode_column(self, partition: Dict, name: str):
+        """Decode a column of one partition to values suitable for a pandas column"""
+        meta = partition["columns"][name]
+        encoding = meta["encoding"]
+
+        if encoding == "template":
+            pieces = meta["template"].split("{}")
+            out = np.full(partition["rows"], pieces[0], dtype=object)
+            for input_name, suffix in zip(meta["inputs"], pieces[1:]):
+                values = np.asarray(self._decode_column(partition, input_name)).astype(str).astype(object)
+                out = out + values + suffix
+            return out
+        if encoding == "dictionary" and "codes_from" in meta:
+            return np.asarray(meta["dictionary"], dtype=object)[self.open_column(partition, meta["codes_from"])]
+
+        array = self.open_column(partition, name)
+        if encoding == "uuid128":
+            return uuid_words_to_strings(array).astype(object)
+        if encoding == "timestamp_us":
+            return array.astype("datetime64[us]")
+        if encoding == "prefixed_index":
+            return np.char.add(meta["prefix"], array.astype(str)).astype(object)
+        if encoding == "dictionary":
+            # Code -1 marks a null and indexes the trailing None
+            return np.asarray(meta["dictionary"] + [None], dtype=object)[array]
+        if encoding == "bytes":
+            return np.array([value.decode("utf-8") for value in array.tolist()], dtype=object)
+        return array
+
+    def to_dataframe(self, columns: List[str] = None, dates: Iterable[str] = None,
+                     event_types: Iterable[str] = None, paths: Iterable[str] = None):
+        """Assemble selected partitions and columns into one DataFrame
+
+        Only the projected columns are read from their memory maps. Columns
+        missing from a partition are filled with nulls, as in the wide CSV layout.
+        """
+        import pandas as pd
+
+        frames = []
+        for partition in self.partitions(dates, event_types, paths):
+            names = columns or list(partition["columns"])
+            if columns is None:
+                names = [n for n in names if n not in DERIVED_INPUTS]
+            data = {name: self._decode_column(partition, name)
+                    for name in names if name in partition["columns"]}
+            frames.append(pd.DataFrame(data))
+
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True, sort=False)
+
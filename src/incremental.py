@@ -0,0 +1,152 @@
+"""
+Incremental Processing State
+Manifest of processed raw inputs and their persisted, mergeable partial aggregates
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from stage_cache import content_hash, file_stats
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def save_partials(path: str, partials: Dict[str, pd.DataFrame]):
+    """Write partial aggregate frames to one .npz file (categoricals as codes + categories)"""
+    arrays = {}
+    for name, frame in partials.items():
+        for column in frame.columns:
+            series = frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                arrays[f"{name}/{column}/codes"] = series.cat.codes.to_numpy()
+                arrays[f"{name}/{column}/categories"] = np.asarray(series.cat.categories).astype(str)
+            elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                arrays[f"{name}/{column}"] = series.to_numpy()
+            elif len(series) and isinstance(series.iloc[0], bytes):
+                # Serialized sketches; NumPy trims trailing zero bytes, which from_bytes() restores
+                arrays[f"{name}/{column}"] = series.to_numpy().astype(bytes)
+            else:
+                arrays[f"{name}/{column}"] = series.to_numpy().astype(str)
+
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_partials(path: str) -> Dict[str, pd.DataFrame]:
+    """Read partial aggregate frames written by save_partials()"""
+    columns = {}
+    with np.load(path, allow_pickle=False) as data:
+        for key in data.files:
+            name, column, *part = key.split("/")
+            frame = columns.setdefault(name, {})
+            if not part:
+                frame[column] = data[key]
+            elif part[0] == "codes":
+                frame[column] = pd.Categorical.from_codes(
+                    data[key], data[f"{name}/{column}/categories"].astype(object)
+                )
+    return {name: pd.DataFrame(frame) for name, frame in columns.items()}
+
+
+class PartialAggregateStore:
+    """Per-input partial aggregates plus a manifest of the raw inputs they came from
+
+    Each raw input (a file, or a columnar store partition) is recorded with its
+    size, modification time and content hash. An input is reprocessed only when
+    its size or mtime changed and its content hash no longer matches. Partials
+    are only mergeable with partials built under the same settings.
+    """
+
+    def __init__(self, root: str, settings: Dict = None):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.settings = settings or {}
+        self.manifest = self.load_manifest()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def load_manifest(self) -> Dict:
+        """Load the manifest (empty when nothing has been processed yet)"""
+        if not self.exists():
+            return {"version": MANIFEST_VERSION, "settings": self.settings, "inputs": {}}
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def clear(self):
+        """Forget every processed input and its partials"""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        self.manifest = {"version": MANIFEST_VERSION, "settings": self.settings, "inputs": {}}
+
+    def compatible(self) -> bool:
+        """Whether the recorded partials were built with the current settings"""
+        return self.manifest.get("settings", {}) == self.settings
+
+    def plan(self, inputs: Dict[str, List[str]]) -> Tuple[List[str], List[str]]:
+        """Split inputs into (new or changed, removed) input names
+
+        Inputs whose stats changed but whose content hash still matches are
+        kept, with their recorded stats refreshed.
+        """
+        changed = []
+        for name, paths in inputs.items():
+            entry = self.manifest["inputs"].get(name)
+            stats = file_stats(paths)
+            if entry is None:
+                changed.append(name)
+            elif stats["size"] != entry["size"] or stats["mtime_ns"] != entry["mtime_ns"]:
+                if stats["size"] == entry["size"] and content_hash(paths) == entry["sha256"]:
+                    entry.update(stats)
+                else:
+                    changed.append(name)
+
+        removed = [name for name in self.manifest["inputs"] if name not in inputs]
+        return changed, removed
+
+    def entry(self, name: str) -> Dict:
+        return self.manifest["inputs"].get(name)
+
+    def save(self, name: str, paths: List[str], partials: Dict[str, pd.DataFrame], outputs: List[str],
+             duplicates: int = 0):
+        """Persist one input's partial aggregates and record it in the (uncommitted) manifest"""
+        os.makedirs(self.root, exist_ok=True)
+        partial_file = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16] + ".npz"
+        save_partials(os.path.join(self.root, partial_file), partials)
+        self.manifest["inputs"][name] = dict(
+            file_stats(paths), sha256=content_hash(paths), partials=partial_file, outputs=outputs,
+            duplicates=duplicates
+        )
+
+    def remove(self, name: str) -> Dict:
+        """Drop one input's partial aggregates; returns its manifest entry"""
+        entry = self.manifest["inputs"].pop(name)
+        partial_path = os.path.join(self.root, entry["partials"])
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return entry
+
+    def commit(self):
+        """Write the manifest atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def iter_all(self) -> Iterator[Dict[str, pd.DataFrame]]:
+        """Load the partial aggregates of every recorded input, one input at a time"""
+        for _, entry in sorted(self.manifest["inputs"].items()):
+            yield load_partials(os.path.join(self.root, entry["partials"]))
+
+    def load_all(self) -> List[Dict[str, pd.DataFrame]]:
+        """Load the partial aggregates of every recorded input"""
+        return list(self.iter_all())
@@ -0,0 +1,74 @@
+"""
+LLM Backends
+Transports for chat completion requests, selected by the ai_analysis backend setting
+"""
+
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mock_llm_server import MockLLMServer
+
+
+class OpenAIBackend:
+    """OpenAI-compatible chat completions API over one pooled HTTP session
+
+    Also serves any compatible endpoint (e.g. a standalone mock server) via
+    the api_url setting.
+    """
+
+    name = "openai"
+
+    def __init__(self, settings: Dict, api_key: str = None, pool_size: int = 1):
+        self.api_url = settings['api_url']
+        self.api_key = api_key
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def send(self, request: Dict, timeout: float, stream: bool = False) -> requests.Response:
+        """POST one chat completion request (with stream, the body is read by the caller as it arrives)"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        return self.session.post(self.api_url, headers=headers, json=request, timeout=timeout, stream=stream)
+
+    def close(self):
+        self.session.close()
+
+
+class MockBackend(OpenAIBackend):
+    """OpenAI-compatible backend answered by a bundled local mock server
+
+    The server (see mock_llm_server) starts on a free local port and is
+    configured by the mock_* settings, so analyses run offline with realistic
+    latency, errors and quota responses.
+    """
+
+    name = "mock"
+
+    def __init__(self, settings: Dict, api_key: str = None, pool_size: int = 1):
+        self.server = MockLLMServer.from_settings(settings).start()
+        super().__init__(dict(settings, api_url=self.server.url), api_key="mock", pool_size=pool_size)
+
+    def close(self):
+        super().close()
+        self.server.stop()
+
+
+BACKENDS = {backend.name: backend for backend in (OpenAIBackend, MockBackend)}
+
+
+def create_backend(settings: Dict, api_key: str = None, pool_size: int = 1):
+    """Backend named by the backend setting"""
+    name = settings.get('backend', OpenAIBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {name} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name](settings, api_key=api_key, pool_size=pool_size)
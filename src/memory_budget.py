@@ -0,0 +1,175 @@
+"""
+Memory Budget
+Per-row memory estimated from the telemetry schema, and the chunk sizes, worker counts and
+on-disk partitioning that keep generation and processing within a memory limit
+"""
+
+import math
+import os
+import re
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+from data_generator import DAILY_EVENTS_JITTER, DEFAULT_CHUNK_SIZE
+from telemetry_schema import (
+    BOOLEAN_FIELDS, CATEGORICAL_FIELDS, DYNAMIC_CATEGORICAL_FIELDS, EVENT_FIELDS, EVENT_TYPES,
+    EVENT_TYPE_WEIGHTS, NUMERIC_FIELD_DTYPES
+)
+
+MB = 1 << 20
+SIZE_UNITS = {"K": 1 << 10, "M": MB, "G": 1 << 30, "T": 1 << 40}
+
+# In-memory bytes per value of a typed raw table column
+EVENT_ID_BYTES = sys.getsizeof("0" * 36) + 8  # A UUID string object plus its pointer
+TIMESTAMP_BYTES = 8
+CATEGORY_CODE_BYTES = 1   # Fixed vocabularies
+DYNAMIC_CODE_BYTES = 4    # Data-driven categories (e.g. 50,000 endpoint ids need int32 codes)
+BOOLEAN_BYTES = 2         # Nullable: value plus mask
+
+# Loading, cleaning, deduplicating and aggregating an input peaks at about this
+# multiple of its typed size (measured 2.9-4.4x on split CSV tables of 0.15-1.2M rows)
+PROCESS_WORKING_SET_FACTOR = 5
+# Batched generation holds a chunk as NumPy columns plus temporaries (measured about 185 bytes/event)
+GENERATION_ROW_BYTES = 256
+# Interpreter, pandas, NumPy, per-endpoint aggregation state and allocator slack of
+# each process (a 15.6M-event day in two shards peaked at 2.5 GB, about 500 MB over the working sets)
+PROCESS_BASE_BYTES = 512 * MB
+# Partial aggregates of one input are bounded by its endpoints (quantile buckets
+# dominate; measured up to 1.2 KB per endpoint), and merging a batch briefly
+# holds about three copies of it
+PARTIAL_BYTES_PER_ENDPOINT = 2048
+MERGE_WORKING_SET_FACTOR = 3
+MAX_MERGE_BATCH_INPUTS = 64
+# Share of the limit that is planned for; the rest absorbs allocator fragmentation and estimate error
+LIMIT_HEADROOM = 0.8
+# Fewest events per day, shard or chunk a worker must be able to take; below this
+# a worker is not worth its base memory, and with one worker the limit is too small
+MIN_INPUT_EVENTS = 100000
+# Chunk sizes are rounded down to a multiple of this
+CHUNK_ROUNDING = 10000
+
+
+def parse_memory_size(text: str) -> int:
+    """Bytes in a size like 16G, 512M or 1.5GiB (a plain number is megabytes)"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*", str(text), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid memory size: {text} (expected e.g. 16G or 512M)")
+    value, unit = match.groups()
+    return int(float(value) * SIZE_UNITS[unit.upper() or "M"])
+
+
+def field_bytes(field: str) -> int:
+    """In-memory bytes of one value of a raw field, as the processor types it"""
+    if field == "event_id":
+        return EVENT_ID_BYTES
+    if field == "timestamp":
+        return TIMESTAMP_BYTES
+    if field in CATEGORICAL_FIELDS:
+        return CATEGORY_CODE_BYTES
+    if field in DYNAMIC_CATEGORICAL_FIELDS:
+        return DYNAMIC_CODE_BYTES
+    if field in BOOLEAN_FIELDS:
+        return BOOLEAN_BYTES
+    dtype = NUMERIC_FIELD_DTYPES[field]
+    # Nullable integers carry a one-byte mask
+    return np.dtype(dtype.lower()).itemsize + (1 if dtype.startswith("Int") else 0)
+
+
+def row_bytes(event_type: str) -> int:
+    """Typed in-memory bytes of one row of an event type's table"""
+    return sum(field_bytes(field) for field in EVENT_FIELDS[event_type])
+
+
+def event_type_shares() -> Dict[str, float]:
+    total = sum(EVENT_TYPE_WEIGHTS)
+    return {event_type: weight / total for event_type, weight in zip(EVENT_TYPES, EVENT_TYPE_WEIGHTS)}
+
+
+class MemoryBudget:
+    """Chunk sizes, worker counts and raw data partitioning that fit a run into a memory limit
+
+    Every process is charged PROCESS_BASE_BYTES. Each processing worker (and,
+    with a pool, the parent, which may redo an input) is also charged the
+    working set of the largest raw input it may load: PROCESS_WORKING_SET_FACTOR
+    times that input's typed size, estimated per row from the schema dtypes.
+    Split raw tables are one event type each, so the busiest type of a day
+    (scans) sets the size; a wide raw file holds every type.
+
+    When a whole day's input does not fit, the day is spilled to disk as
+    smaller partitions that are processed one at a time: columnar raw data
+    as chunk partitions of chunk_size events, text formats as shards_per_day
+    separate files. Workers are only added while each can still take inputs
+    of MIN_INPUT_EVENTS events. Pipelined runs also charge the generation workers
+    running alongside processing.
+
+    Once the workers are done, the parent merges the inputs' partial
+    aggregates in batches sized to the whole budget.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+
+    def input_bytes_per_event(self, split_by_type: bool = True) -> float:
+        """Processing working set of the largest input per event of the day or chunk it comes from"""
+        costs = {event_type: share * row_bytes(event_type) * PROCESS_WORKING_SET_FACTOR
+                 for event_type, share in event_type_shares().items()}
+        return max(costs.values()) if split_by_type else sum(costs.values())
+
+    def merge_batch_inputs(self, endpoints: int) -> int:
+        """Inputs whose partial aggregates fit the budget together while being merged"""
+        batch_bytes = MERGE_WORKING_SET_FACTOR * max(1, endpoints) * PARTIAL_BYTES_PER_ENDPOINT
+        free = self.limit_bytes * LIMIT_HEADROOM - PROCESS_BASE_BYTES
+        return max(2, min(MAX_MERGE_BATCH_INPUTS, int(free / batch_bytes)))
+
+    def plan(self, daily_events: int, endpoints: int, workers: int = None, shards_per_day: int = 1,
+             output_formats: List[str] = ("json", "csv"), split_by_type: bool = True,
+             pipelined: bool = False) -> Dict:
+        """Workers, chunk size, shards per day and merge batches for a run of daily_events per day
+
+        workers caps the worker count (the CPU count when None) and
+        shards_per_day is the least sharding to use. Raises ValueError when
+        the limit cannot fit a single worker.
+        """
+        budget = self.limit_bytes * LIMIT_HEADROOM
+        per_event = self.input_bytes_per_event(split_by_type)
+        columnar = "columnar" in output_formats
+        chunk_bytes = DEFAULT_CHUNK_SIZE * GENERATION_ROW_BYTES
+
+        for workers in range(max(1, workers or os.cpu_count() or 1), 0, -1):
+            slots = workers + 1 if workers > 1 else 1
+            fixed = slots * PROCESS_BASE_BYTES
+            if pipelined:
+                # A single worker generates on a thread of this process, more on a pool of their own
+                fixed += workers * (PROCESS_BASE_BYTES + chunk_bytes) if workers > 1 else chunk_bytes
+            # Events of a day, shard or chunk whose largest input fits one slot
+            input_events = max(0, int((budget - fixed) / slots / per_event))
+            if input_events >= MIN_INPUT_EVENTS:
+                break
+        else:
+            needed = (PROCESS_BASE_BYTES + MIN_INPUT_EVENTS * per_event
+                      + (chunk_bytes if pipelined else 0)) / LIMIT_HEADROOM
+            raise ValueError(f"A memory limit of {self.limit_bytes / MB:,.0f} MB is too small for one worker "
+                             f"(at least {needed / MB:,.0f} MB needed)")
+
+        day_events = daily_events * (1 + DAILY_EVENTS_JITTER)
+        chunk_size = DEFAULT_CHUNK_SIZE
+        if columnar:
+            # Each chunk partition is an input, so chunks are sized to fit
+            chunk_size = min(chunk_size, max(CHUNK_ROUNDING, input_events // CHUNK_ROUNDING * CHUNK_ROUNDING))
+        else:
+            # Each shard file is an input, so a day is split until its shards fit
+            shards_per_day = max(shards_per_day, math.ceil(day_events / input_events))
+        largest_input = min(day_events / shards_per_day, chunk_size if columnar else day_events)
+        return {
+            "memory_limit_mb": round(self.limit_bytes / MB),
+            "workers": workers,
+            "chunk_size": chunk_size,
+            "shards_per_day": shards_per_day,
+            "spill": largest_input < day_events,
+            "max_input_events": int(largest_input),
+            "merge_batch_inputs": self.merge_batch_inputs(endpoints),
+            "row_bytes": {event_type: row_bytes(event_type) for event_type in EVENT_TYPES},
+            "estimated_peak_mb": round((fixed + slots * largest_input * per_event) / MB)
+        }
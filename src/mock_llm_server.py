@@ -0,0 +1,326 @@
+"""
+Mock LLM Server
+Local OpenAI-compatible chat completions endpoint with configurable latency, error rate and quota, for offline runs and load tests
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+from rate_limiter import TokenBucket, estimate_tokens, request_tokens, text_tokens
+
+COMPLETIONS_PATH = "/v1/chat/completions"
+STATS_PATH = "/stats"
+
+# Canned answers, picked by the topic of the prompt
+MOCK_RESPONSES = {
+    "threat": "The threat landscape shows elevated malware activity with a concerning false positive rate. "
+              "Immediate attention needed for signature tuning. Recommend implementing machine learning-based "
+              "detection to reduce false positives while maintaining security effectiveness.",
+    "performance": "System performance shows moderate impact from security software. CPU usage during scans "
+                   "peaks at unacceptable levels. Recommend implementing intelligent scheduling and resource "
+                   "throttling to minimize user impact during business hours.",
+    "user experience": "User satisfaction is critically low with mostly negative feedback. Primary complaints "
+                       "center on system slowdown and scan interruptions. Urgent need for UX improvements and "
+                       "proactive communication about security operations.",
+    "executive summary": "Cybersecurity telemetry analysis reveals critical areas requiring immediate attention. "
+                         "While threat detection is effective, high false positive rates and performance impact "
+                         "are significantly affecting user satisfaction. Recommend prioritizing machine learning "
+                         "integration and performance optimization to maintain security effectiveness while "
+                         "improving user experience.",
+    "predictive": "Based on current patterns, expect 15% increase in daily events over next quarter. Capacity "
+                  "planning should account for peak loads during business hours. Risk forecasting indicates "
+                  "potential user compliance issues if performance problems persist."
+}
+DEFAULT_RESPONSE = "Telemetry reviewed. No anomalies beyond the reported pain points."
+
+
+def mock_response(prompt: str) -> str:
+    """Canned answer for the topic mentioned earliest in a prompt"""
+    prompt = prompt.lower()
+    mentions = [(prompt.find(topic), text) for topic, text in MOCK_RESPONSES.items() if topic in prompt]
+    return min(mentions)[1] if mentions else DEFAULT_RESPONSE
+
+
+class MockLLMServer:
+    """OpenAI-compatible chat completions server on a background thread
+
+    Every request waits latency +/- latency_jitter seconds before its first
+    token, then generates at tokens_per_second (0: instantly). Requests with
+    "stream": true get the completion as server-sent events, one chunk per
+    word, ending with a usage chunk and [DONE]; others get it all at once
+    when generation finishes. A share of requests given by error_rate fails
+    with a 500 or 503. When requests_per_minute or
+    tokens_per_minute are set, the server enforces them like the real API:
+    requests over quota get a 429 with Retry-After. Usage is reported with the
+    same token estimate the client limiter uses. GET /stats returns counters.
+    Port 0 picks a free port; see url once started.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.3, latency_jitter: float = 0.1,
+                 error_rate: float = 0.0, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 tokens_per_second: float = 0, seed: int = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+        self.counters = {"requests": 0, "completed": 0, "errors": 0, "rate_limited": 0, "tokens": 0}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{COMPLETIONS_PATH}"
+
+    def start(self) -> "MockLLMServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return dict(self.counters)
+
+    def admit(self, tokens: int) -> float:
+        """Charge a request against the quota; 0 when admitted, else seconds until it would be"""
+        with self.lock:
+            self.counters["requests"] += 1
+            now = time.monotonic()
+            wait = self.requests.try_take(1, now) if self.requests else 0.0
+            if not wait and self.tokens:
+                wait = self.tokens.try_take(tokens, now)
+                if wait and self.requests:
+                    self.requests.give_back(1)
+            if wait:
+                self.counters["rate_limited"] += 1
+            return wait
+
+    def complete(self, request: Dict) -> (int, Dict, Dict):
+        """Status, headers and body for a chat completion request"""
+        messages = request.get("messages", [])
+        prompt_tokens = estimate_tokens(messages)
+        wait = self.admit(prompt_tokens + int(request.get("max_tokens") or 0))
+        if wait:
+            return 429, {"Retry-After": f"{wait:.3f}"}, {"error": {"type": "rate_limit_exceeded",
+                                                                   "message": "Mock quota exceeded"}}
+
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.latency_jitter, self.latency_jitter))
+            status = self.random.choice([500, 503]) if self.random.random() < self.error_rate else 200
+        time.sleep(delay)
+        if status != 200:
+            with self.lock:
+                self.counters["errors"] += 1
+            return status, {}, {"error": {"type": "server_error", "message": "Mock server error"}}
+
+        content = mock_response(messages[-1].get("content", "") if messages else "")
+        completion_tokens = min(text_tokens(content), int(request.get("max_tokens") or 1 << 30))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        with self.lock:
+            self.counters["completed"] += 1
+            self.counters["tokens"] += prompt_tokens + completion_tokens
+            response_id = f"mock-{self.counters['completed']}"
+        chunk = {"id": response_id, "created": int(time.time()), "model": request.get("model", "mock")}
+
+        if request.get("stream"):
+            include_usage = bool((request.get("stream_options") or {}).get("include_usage"))
+            return 200, {"Content-Type": "text/event-stream"}, self.stream_chunks(chunk, content, usage,
+                                                                                include_usage)
+
+        self.generate(completion_tokens)
+        return 200, {}, dict(chunk, object="chat.completion", usage=usage, choices=[
+            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+        ])
+
+    def generate(self, tokens: int):
+        """Wait as long as generating tokens takes"""
+        if self.tokens_per_second:
+            time.sleep(tokens / self.tokens_per_second)
+
+    def stream_chunks(self, chunk: Dict, content: str, usage: Dict, include_usage: bool) -> Iterator[Dict]:
+        """Completion chunks, one per word, paced at tokens_per_second"""
+        chunk = dict(chunk, object="chat.completion.chunk")
+        yield dict(chunk, choices=[{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}])
+        for piece in re.findall(r"\S+\s*", content):
+            self.generate(text_tokens(piece))
+            yield dict(chunk, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        yield dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if include_usage:
+            yield dict(chunk, choices=[], usage=usage)
+
+    def handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def send_json(self, status, headers, body):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if self.path == STATS_PATH:
+                    self.send_json(200, {}, server.stats())
+                else:
+                    self.send_json(404, {}, {"error": {"message": "Not found"}})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path != COMPLETIONS_PATH:
+                    self.send_json(404, {}, {"error": {"message": "Not found"}})
+                    return
+                try:
+                    request = json.loads(body or b"{}")
+                except ValueError:
+                    self.send_json(400, {}, {"error": {"message": "Invalid JSON"}})
+                    return
+                status, headers, response = server.complete(request)
+                if isinstance(response, dict):
+                    self.send_json(status, headers, response)
+                else:
+                    self.send_events(status, headers, response)
+
+            def send_events(self, status, headers, events):
+                """Server-sent events over chunked transfer encoding, flushed as they are produced"""
+                self.send_response(status)
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                for event in events:
+                    self.write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def write_chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @classmethod
+    def from_settings(cls, settings: Dict, **overrides) -> "MockLLMServer":
+        """Server configured by the mock_* AI settings (see config_loader.ai_settings)"""
+        options = {
+            "latency": settings["mock_latency_seconds"],
+            "latency_jitter": settings["mock_latency_jitter"],
+            "error_rate": settings["mock_error_rate"],
+            "requests_per_minute": settings["mock_rate_limit_rpm"],
+            "tokens_per_minute": settings["mock_rate_limit_tpm"],
+            "tokens_per_second": settings["mock_tokens_per_second"]
+        }
+        options.update(overrides)
+        return cls(**options)
+
+
+def benchmark(num_requests: int, settings: Dict) -> Dict:
+    """Send num_requests prompts through the analyzer's client to a mock server with the same quota
+
+    Measures how close the client's rate limiter runs to the quota without
+    tripping it. quota_bound_seconds is the shortest run the quota permits
+    (one minute's burst, then the sustained rate); quota_utilization is that
+    bound over the measured time, so 1.0 means running right at the limit.
+    """
+    from ai_analyzer import AITelemetryAnalyzer
+
+    settings = dict(settings, backend="openai", response_cache=False)
+    with MockLLMServer.from_settings(settings, requests_per_minute=settings["rate_limit_rpm"],
+                                     tokens_per_minute=settings["rate_limit_tpm"]) as server:
+        analyzer = AITelemetryAnalyzer(api_key="mock", settings=dict(settings, api_url=server.url))
+        prompts = [f"Summarize threat telemetry batch {i}" for i in range(num_requests)]
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=analyzer.max_concurrency) as executor:
+            answers = list(executor.map(analyzer.call_openai_api, prompts))
+        elapsed = time.time() - start
+        stats = server.stats()
+        costs = {"rate_limit_rpm": num_requests,
+                 "rate_limit_tpm": sum(request_tokens(analyzer.build_request(prompt)) for prompt in prompts)}
+        quota_bound = max([(cost - settings[limit]) / settings[limit] * 60
+                           for limit, cost in costs.items() if settings[limit]] + [0.0])
+
+    return {
+        "requests": num_requests,
+        "failed": sum(answer.startswith("AI analysis error") for answer in answers),
+        "elapsed_seconds": round(elapsed, 2),
+        "quota_bound_seconds": round(quota_bound, 2),
+        "quota_utilization": round(quota_bound / elapsed, 3) if quota_bound else None,
+        "requests_per_minute": round(stats["completed"] / elapsed * 60, 1),
+        "tokens_per_minute": round(stats["tokens"] / elapsed * 60, 1),
+        "rate_limited": stats["rate_limited"],
+        "server_errors": stats["errors"],
+        "limiter": analyzer.rate_limiter.stats()
+    }
+
+
+if __name__ == "__main__":
+    from config_loader import ai_settings, load_config
+
+    settings = ai_settings(load_config())
+    parser = argparse.ArgumentParser(description="Local mock of the chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=settings["mock_latency_seconds"],
+                        help="Mean response latency in seconds (default: %(default)s)")
+    parser.add_argument("--jitter", type=float, default=settings["mock_latency_jitter"],
+                        help="Uniform latency jitter in seconds (default: %(default)s)")
+    parser.add_argument("--tps", type=float, default=settings["mock_tokens_per_second"],
+                        help="Generated tokens per second after the first (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=settings["mock_error_rate"],
+                        help="Share of requests failing with 500/503 (default: %(default)s)")
+    parser.add_argument("--rpm", type=float, default=settings["mock_rate_limit_rpm"],
+                        help="Requests per minute before answering 429 (default: unlimited)")
+    parser.add_argument("--tpm", type=float, default=settings["mock_rate_limit_tpm"],
+                        help="Tokens per minute before answering 429 (default: unlimited)")
+    parser.add_argument("--benchmark", type=int, metavar="N",
+                        help="Instead of serving, push N requests through the rate-limited client "
+                             "against a mock enforcing --rpm/--tpm, and report throughput")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        settings.update(mock_latency_seconds=args.latency, mock_latency_jitter=args.jitter,
+                        mock_tokens_per_second=args.tps,
+                        mock_error_rate=args.error_rate, rate_limit_rpm=args.rpm, rate_limit_tpm=args.tpm)
+        print(json.dumps(benchmark(args.benchmark, settings), indent=2))
+    else:
+        server = MockLLMServer(args.host, args.port, latency=args.latency, latency_jitter=args.jitter,
+                               tokens_per_second=args.tps, error_rate=args.error_rate, requests_per_minute=args.rpm,
+                               tokens_per_minute=args.tpm)
+        print(f"Mock LLM server listening on {server.url} (Ctrl+C to stop)")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
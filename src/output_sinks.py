@@ -0,0 +1,141 @@
+"""
+Processed Output Sinks
+Atomic, optionally compressed and partitioned CSV/JSON/NDJSON exports written on a thread pool
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+# Formats written by the sinks; other export formats (e.g. pdf reports) are not data sinks
+SINK_FORMATS = ["csv", "json", "ndjson"]
+PARTITION_KEYS = ["date", "event_type"]
+PARTITIONED_ROWS_DIR = "telemetry_processed"
+
+
+def atomic_write(path: str, write: Callable[[str], None]):
+    """Call write() on a temporary file, then rename it into place
+
+    Readers never observe a half-written file, and a failed write leaves the
+    previous version untouched.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_frame_file(df: pd.DataFrame, path: str, fmt: str, compress: bool = False, indent: int = None):
+    """Write one DataFrame as CSV, a JSON records array or NDJSON, atomically"""
+    compression = "gzip" if compress else None
+    if fmt == "csv":
+        atomic_write(path, lambda tmp: df.to_csv(tmp, index=False, compression=compression))
+    elif fmt == "json":
+        atomic_write(path, lambda tmp: df.to_json(tmp, orient='records', indent=indent,
+                                                  compression=compression))
+    elif fmt == "ndjson":
+        atomic_write(path, lambda tmp: df.to_json(tmp, orient='records', lines=True,
+                                                  compression=compression))
+    else:
+        raise ValueError(f"Unsupported sink format: {fmt}")
+
+
+class OutputSinks:
+    """Exports for processed artifacts, serialized concurrently on a thread pool
+
+    Each artifact (an aggregate such as daily_metrics, or processed_tables for
+    the full cleaned rows) is written in the formats configured for it, or the
+    default formats. Writes are queued with write_frame()/write_rows()/write_json()
+    and run in the background; wait() blocks until they finish and returns the
+    written file names relative to root, re-raising the first failure.
+    """
+
+    def __init__(self, root: str, formats: List[str] = ("json", "csv"), artifacts: Dict[str, List[str]] = None,
+                 compress: bool = False, partition_by: List[str] = (), writer_threads: int = 4):
+        unknown = set(partition_by) - set(PARTITION_KEYS)
+        if unknown:
+            raise ValueError(f"Unsupported partition keys: {sorted(unknown)} (expected {PARTITION_KEYS})")
+        self.root = root
+        self.formats = list(formats)
+        self.artifacts = artifacts or {}
+        self.compress = compress
+        self.partition_by = [key for key in PARTITION_KEYS if key in partition_by]
+        self.executor = ThreadPoolExecutor(max_workers=max(1, writer_threads))
+        self.futures = []
+        self.outputs: List[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def formats_for(self, artifact: str) -> List[str]:
+        """Sink formats configured for an artifact"""
+        return [fmt for fmt in self.artifacts.get(artifact, self.formats) if fmt in SINK_FORMATS]
+
+    def filename(self, stem: str, fmt: str) -> str:
+        return f"{stem}.{fmt}.gz" if self.compress else f"{stem}.{fmt}"
+
+    def _submit(self, name: str, write: Callable, *args, **kwargs):
+        self.futures.append((name, self.executor.submit(write, *args, **kwargs)))
+
+    def write_frame(self, artifact: str, stem: str, df: pd.DataFrame, indent: int = 2):
+        """Queue one DataFrame as <stem>.<format> for each of the artifact's formats"""
+        for fmt in self.formats_for(artifact):
+            name = self.filename(stem, fmt)
+            self._submit(name, write_frame_file, df, os.path.join(self.root, name), fmt, self.compress, indent)
+
+    def write_rows(self, artifact: str, stem: str, df: pd.DataFrame):
+        """Queue full event rows, split into date=/event_type= directories when partitioned
+
+        Rows are written as compact JSON; they are for machines, not for reading.
+        """
+        if not self.partition_by:
+            self.write_frame(artifact, stem, df, indent=None)
+            return
+
+        keys = {
+            "date": df["timestamp"].dt.strftime("%Y%m%d"),
+            "event_type": df["event_type"].astype(str)
+        }
+        by = [keys[key] for key in self.partition_by]
+        for values, group in df.groupby(by if len(by) > 1 else by[0], sort=True, observed=True):
+            values = values if isinstance(values, tuple) else (values,)
+            directory = os.path.join(PARTITIONED_ROWS_DIR, *[f"{key}={value}" for key, value in
+                                                             zip(self.partition_by, values)])
+            self.write_frame(artifact, os.path.join(directory, stem), group, indent=None)
+
+    def write_json(self, name: str, data: Dict):
+        """Queue a JSON document (always plain JSON: dashboards and the analyzer read it directly)"""
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
+        self._submit(name, atomic_write, os.path.join(self.root, name), write)
+
+    def wait(self) -> List[str]:
+        """Wait for every queued write; returns the file names written"""
+        futures, self.futures = self.futures, []
+        for name, future in futures:
+            future.result()
+            self.outputs.append(name)
+        return self.outputs
+
+    @classmethod
+    def from_settings(cls, root: str, settings: Dict) -> "OutputSinks":
+        """Sinks configured from export settings (see config_loader.export_settings)"""
+        return cls(root, formats=settings["formats"], artifacts=settings["artifacts"],
+                   compress=settings["compress"], partition_by=settings["partition_by"],
+                   writer_threads=settings["writer_threads"])
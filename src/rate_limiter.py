@@ -0,0 +1,172 @@
+"""
+LLM Rate Limiting
+Token buckets for requests-per-minute and tokens-per-minute API quotas, shared by threads and coroutines
+"""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Dict, List
+
+# Chat formatting overhead per message and per request, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+CHARS_PER_TOKEN = 4
+# The API starts counting a burst when the first request arrives, slightly after
+# the client reserved it; a second of refill kept in reserve absorbs that lag
+BURST_HEADROOM_SECONDS = 1.0
+
+
+def text_tokens(text: str) -> int:
+    """Approximate tokens of plain text (about four characters per token)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Approximate prompt tokens of chat messages, including chat formatting"""
+    return REQUEST_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + text_tokens(str(message.get("content", ""))) for message in messages
+    )
+
+
+def request_tokens(request: Dict) -> int:
+    """Tokens a chat request counts against a TPM quota: its prompt plus max_tokens of completion"""
+    return estimate_tokens(request.get("messages", [])) + int(request.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """A bucket holding up to capacity units, refilled continuously at rate units per second
+
+    Not thread-safe on its own; RateLimiter and the mock server serialize access.
+    """
+
+    def __init__(self, capacity: float, rate: float, now: float = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount, going into debt if needed; returns seconds until the debt is repaid"""
+        self.refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def try_take(self, amount: float, now: float) -> float:
+        """Take amount only if available; returns 0 on success, else seconds until it would be"""
+        self.refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            self.level -= amount
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits for one API quota
+
+    Each bucket holds about one minute of quota (less BURST_HEADROOM_SECONDS),
+    so a cold start may burst up to nearly the full limit and then proceeds at
+    the sustained rate. Callers reserve a
+    request's estimated tokens up front, waiting until both buckets cover it,
+    and settle() once the response reports actual usage. A
+    limit of 0 disables that bucket. pause() holds back every caller, e.g.
+    when the API answers 429 with Retry-After. Reservations are taken under a
+    lock and the wait happens outside it, so the limiter can be shared by
+    threads (acquire) and coroutines (acquire_async) alike.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        now = time.monotonic()
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = self.bucket(requests_per_minute, now) if requests_per_minute else None
+        self.tokens = self.bucket(tokens_per_minute, now) if tokens_per_minute else None
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+        self.waited_seconds = 0.0
+        self.reservations = 0
+
+    @staticmethod
+    def bucket(per_minute: float, now: float) -> TokenBucket:
+        rate = per_minute / 60.0
+        return TokenBucket(max(1.0, per_minute - rate * BURST_HEADROOM_SECONDS), rate, now)
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and tokens; returns seconds to wait before sending it"""
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.paused_until - now)
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            self.reservations += 1
+            self.waited_seconds += delay
+            return delay
+
+    def acquire(self, tokens: int) -> float:
+        """Block the calling thread until a request of tokens fits the quota; returns seconds waited"""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: int) -> float:
+        """Coroutine counterpart of acquire()"""
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def settle(self, reserved: int, used: int):
+        """Charge tokens a response used beyond its reservation (the prompt estimate was low)
+
+        Unused completion tokens are not credited back: the API counts
+        max_tokens against the quota when it admits a request.
+        """
+        if self.tokens is None or used is None or used <= reserved:
+            return
+        with self.lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.give_back(reserved - used)
+
+    def refund(self, tokens: int):
+        """Credit back a request the API rejected without counting it"""
+        with self.lock:
+            now = time.monotonic()
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    bucket.give_back(amount)
+
+    def pause(self, seconds: float):
+        """Hold back every new request for seconds (the API reported the quota exhausted)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict:
+        """Limits and time spent waiting, for analysis_metadata"""
+        return {
+            "requests_per_minute": self.requests_per_minute or None,
+            "tokens_per_minute": self.tokens_per_minute or None,
+            "reservations": self.reservations,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> "RateLimiter":
+        """Limiter for the rate_limit_rpm/rate_limit_tpm AI settings"""
+        return cls(settings.get("rate_limit_rpm") or 0, settings.get("rate_limit_tpm") or 0)
@@ -0,0 +1,139 @@
+"""
+LLM Response Cache
+On-disk cache of chat completion responses keyed by a hash of the full request, with TTL and LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from output_sinks import atomic_write
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+def request_key(request: Dict) -> str:
+    """SHA-256 of a request's model, messages and sampling parameters"""
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cached responses, one JSON file per request hash
+
+    Entries older than ttl_seconds are misses and are deleted. A hit refreshes
+    the entry's modification time, which is the LRU clock: once the cache
+    holds more than max_bytes, the least recently used entries are removed.
+    Entry sizes are read from disk once, on the first write, and then kept
+    in LRU order in memory, so writes do not rescan the cache.
+    With bypass set, lookups always miss but fresh responses are still stored.
+    Safe to share between the analyzer's threads.
+    """
+
+    def __init__(self, root: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES,
+                 bypass: bool = False):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.entries = None  # Entry path -> size, least recently used first (loaded by the first write)
+        self.total_bytes = 0
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, request: Dict) -> Optional[str]:
+        """Cached response for a request, or None"""
+        response = None if self.bypass else self._read(request_key(request))
+        with self.lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def _read(self, key: str) -> Optional[str]:
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["created"] > self.ttl_seconds:
+            self._remove(path)
+            with self.lock:
+                if self.entries is not None and path in self.entries:
+                    self.total_bytes -= self.entries.pop(path)
+            return None
+        os.utime(path)
+        with self.lock:
+            if self.entries is not None and path in self.entries:
+                self.entries.move_to_end(path)
+        return entry["response"]
+
+    def put(self, request: Dict, response: str):
+        """Store a response, then evict least recently used entries beyond max_bytes"""
+        entry = {"created": time.time(), "model": request.get("model"), "response": response}
+
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(entry, f)
+        path = self.entry_path(request_key(request))
+        atomic_write(path, write)
+        with self.lock:
+            self._load_entries()
+            self.total_bytes -= self.entries.pop(path, 0)
+            self.entries[path] = os.path.getsize(path)
+            self.total_bytes += self.entries[path]
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def _load_entries(self):
+        """Scan entry sizes once, ordered by modification time (called with the lock held)"""
+        if self.entries is not None:
+            return
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path, stat.st_size))
+        self.entries = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self.total_bytes = sum(self.entries.values())
+
+    def evict(self):
+        """Remove least recently used entries until the cache holds at most max_bytes"""
+        with self.lock:
+            self._load_entries()
+            while self.total_bytes > self.max_bytes and self.entries:
+                path, size = self.entries.popitem(last=False)
+                self._remove(path)
+                self.total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for analysis_metadata"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bypassed": self.bypass
+        }
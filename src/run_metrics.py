@@ -0,0 +1,258 @@
+"""
+Run Metrics
+Per-stage and per-step wall/CPU time, throughput, memory and I/O, LLM call latencies and optional profiles, saved as run_metrics.json
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+RUN_METRICS_NAME = "run_metrics.json"
+PROFILES_DIR = "profiles"
+DEFAULT_PROFILE_TOP = 20
+STEP_TOTALS = ["calls", "wall_seconds", "cpu_seconds", "rows", "bytes_read", "bytes_written"]
+MB = 1 << 20
+
+
+def io_counters() -> Dict[str, int]:
+    """Bytes this process has read and written through system calls (zeros where /proc is unavailable)"""
+    try:
+        with open("/proc/self/io", 'r') as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return {"read": int(fields["rchar"]), "written": int(fields["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return {"read": 0, "written": 0}
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process (since the last reset_peak_rss() where supported)"""
+    try:
+        with open("/proc/self/status", 'r') as f:
+            return int(re.search(r"VmHWM:\s+(\d+) kB", f.read()).group(1)) * 1024
+    except (OSError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 if resource else 0
+
+
+def reset_peak_rss() -> bool:
+    """Restart peak RSS tracking (Linux only); returns False when peaks cover the whole process instead"""
+    try:
+        with open("/proc/self/clear_refs", 'w') as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def children_cpu_seconds() -> float:
+    """CPU time of finished child processes (e.g. shut-down worker pools)"""
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def llm_call_summary(calls: List[Dict]) -> Dict:
+    """Counts by source and latency percentiles of LLM calls (see AITelemetryAnalyzer.calls)"""
+    sources = {}
+    for call in calls:
+        sources[call.get("source")] = sources.get(call.get("source"), 0) + 1
+    sent = [call for call in calls if call.get("source") == "api" and "latency_seconds" in call]
+    latencies = [call["latency_seconds"] for call in sent]
+    first_tokens = [call["time_to_first_token_seconds"] for call in sent]
+    return {
+        "calls": len(calls),
+        "by_source": sources,
+        "attempts": sum(call.get("attempts", 0) for call in calls),
+        "completion_tokens": sum(call.get("completion_tokens", 0) for call in sent),
+        "latency_seconds": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                            "max": max(latencies, default=None)},
+        "time_to_first_token_seconds": {"p50": percentile(first_tokens, 50), "p95": percentile(first_tokens, 95)}
+    }
+
+
+class StepTimes:
+    """Wall time, CPU time, rows and I/O accumulated per named sub-step
+
+    CPU time is the calling thread's own; I/O is counted process-wide, so
+    steps running at the same time on other threads share their bytes.
+    Totals recorded in worker processes come back as plain dicts and are
+    folded in with merge().
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name: str):
+        """Time one call of a step; yields a dict whose "rows" the caller may set"""
+        record = {"rows": 0}
+        wall, cpu, io = time.perf_counter(), time.thread_time(), io_counters()
+        try:
+            yield record
+        finally:
+            end_io = io_counters()
+            self.add(name, {
+                "calls": 1,
+                "wall_seconds": time.perf_counter() - wall,
+                "cpu_seconds": time.thread_time() - cpu,
+                "rows": record["rows"],
+                "bytes_read": end_io["read"] - io["read"],
+                "bytes_written": end_io["written"] - io["written"]
+            })
+
+    def add(self, name: str, totals: Dict):
+        with self.lock:
+            step = self.steps.setdefault(name, dict.fromkeys(STEP_TOTALS, 0))
+            for field, value in totals.items():
+                step[field] += value
+
+    def merge(self, steps: Dict[str, Dict]):
+        for name, totals in steps.items():
+            self.add(name, totals)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Totals per step, with rows/sec and each step's share of the summed step time"""
+        total_wall = sum(step["wall_seconds"] for step in self.steps.values())
+        return {
+            name: dict(
+                {field: round(value, 3) if isinstance(value, float) else value for field, value in step.items()},
+                rows_per_second=round(step["rows"] / step["wall_seconds"]) if step["wall_seconds"] else None,
+                share_of_wall=round(step["wall_seconds"] / total_wall, 3) if total_wall else None
+            )
+            for name, step in self.steps.items()
+        }
+
+
+class RunMetrics:
+    """Metrics of one pipeline run, recorded per stage
+
+    Each stage records wall time, CPU time (this process and any child
+    processes that finished during the stage), rows and rows/sec, bytes read
+    and written, and peak RSS, plus whatever the stage adds to its record
+    (sub-steps, LLM call latencies). With trace_memory, the tracemalloc peak
+    of Python allocations is recorded too; with profile_top, each stage runs
+    under cProfile, its stats are dumped to profiles_path/<stage>.prof and
+    the profile_top functions by own time are listed. Memory peaks are
+    process-wide, so stages that overlap (pipelined generation and
+    processing) share them, and cProfile only sees the stage's own thread.
+    """
+
+    def __init__(self, profile_top: int = 0, trace_memory: bool = False, profiles_path: str = None,
+                 options: Dict = None):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.profile_top = profile_top
+        self.trace_memory = trace_memory
+        self.profiles_path = profiles_path
+        self.options = options or {}
+        self.stages: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measure one stage; yields its record for the stage to fill in rows and details"""
+        record = {"status": "ok", "rows": 0}
+        record["peak_rss_scope"] = "stage" if reset_peak_rss() else "process"
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        profiler = None
+        if self.profile_top:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active on this interpreter (Python 3.12+ allows only one)
+                profiler = None
+                record["profile"] = {"skipped": "another profiler was active"}
+        wall, cpu, children, io = time.perf_counter(), time.process_time(), children_cpu_seconds(), io_counters()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - wall
+            end_io = io_counters()
+            record.update(
+                wall_seconds=round(elapsed, 3),
+                cpu_seconds=round(time.process_time() - cpu, 3),
+                child_cpu_seconds=round(children_cpu_seconds() - children, 3),
+                rows_per_second=round(record["rows"] / elapsed) if elapsed and record["rows"] else None,
+                bytes_read=end_io["read"] - io["read"],
+                bytes_written=end_io["written"] - io["written"],
+                peak_rss_mb=round(peak_rss_bytes() / MB, 1)
+            )
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record.update(tracemalloc_current_mb=round(current / MB, 1), tracemalloc_peak_mb=round(peak / MB, 1))
+            if profiler is not None:
+                record["profile"] = self.dump_profile(name, profiler)
+            with self.lock:
+                self.stages[name] = record
+
+    def annotate(self, name: str, **fields):
+        """Add fields to a recorded stage"""
+        with self.lock:
+            self.stages.setdefault(name, {}).update(fields)
+
+    def dump_profile(self, name: str, profiler: cProfile.Profile) -> Dict:
+        """Write a stage's cProfile stats and list its hottest functions by own time"""
+        os.makedirs(self.profiles_path, exist_ok=True)
+        path = os.path.join(self.profiles_path, f"{name}.prof")
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler).stats
+        hottest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.profile_top]
+        return {
+            "stats_file": path,
+            "hot_functions": [
+                {"function": pstats.func_std_string(function), "calls": calls,
+                 "own_seconds": round(own, 4), "cumulative_seconds": round(cumulative, 4)}
+                for function, (_, calls, own, cumulative, _) in hottest
+            ]
+        }
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            stages = {name: dict(record) for name, record in self.stages.items()}
+        return {
+            "started_at": self.started_at.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            # Resetting the peak per stage resets the process-wide one too, so take the highest
+            "peak_rss_mb": max([round(peak_rss_bytes() / MB, 1)] +
+                               [record.get("peak_rss_mb", 0) for record in stages.values()]),
+            "options": dict(self.options, profile_top=self.profile_top, trace_memory=self.trace_memory),
+            "stages": stages
+        }
+
+    def save(self, path: str) -> str:
+        """Write the metrics as JSON atomically; returns the path"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
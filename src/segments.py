@@ -0,0 +1,142 @@
+"""
+Endpoint Segments
+Per-department, per-OS and high-risk cohort summaries for segment-level AI analysis, and their NDJSON results log
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from output_sinks import atomic_write
+
+SEGMENT_DIMENSIONS = ["department", "os"]
+HIGH_RISK_SEGMENT = "high_risk"
+UNKNOWN_SEGMENT = "unknown"
+SEGMENT_RESULTS_NAME = "segment_analysis.ndjson"
+
+# Endpoint metric sums and endpoint-level means reported per segment, when present
+SEGMENT_SUMS = {
+    "events": "total_events",
+    "threat_detections": "threat_detections",
+    "false_positives": "false_positive",
+    "threats_found": "threats_found",
+    "threats_cleaned": "threats_cleaned",
+    "high_risk_endpoints": "high_risk"
+}
+SEGMENT_MEANS = {
+    "avg_scan_duration": "scan_duration",
+    "avg_scan_cpu": "cpu_usage_avg",
+    "p95_antivirus_cpu_impact": "antivirus_cpu_impact_p95",
+    "p95_boot_time_seconds": "boot_time_seconds_p95"
+}
+
+
+def load_registry(path: str) -> pd.DataFrame:
+    """Endpoint id, department and OS from the endpoint registry (empty when missing)"""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["endpoint_id"] + SEGMENT_DIMENSIONS)
+    registry = pd.read_csv(path, usecols=lambda column: column in ["endpoint_id"] + SEGMENT_DIMENSIONS,
+                           dtype=str)
+    return registry.drop_duplicates("endpoint_id")
+
+
+def risk_scores(endpoints: pd.DataFrame) -> np.ndarray:
+    """Per-endpoint risk: confirmed threat detections plus threats scans found but did not clean"""
+    def column(name):
+        return endpoints[name].to_numpy(dtype=np.float64) if name in endpoints.columns else 0.0
+    return (column("threat_detections") - column("false_positive")
+            + np.maximum(column("threats_found") - column("threats_cleaned"), 0))
+
+
+def segment_summaries(endpoint_metrics: pd.DataFrame, registry: pd.DataFrame,
+                      dimensions: List[str] = SEGMENT_DIMENSIONS, high_risk_percentile: float = 95) -> pd.DataFrame:
+    """Summary metrics per segment, computed with one groupby over all segments
+
+    Each endpoint belongs to one segment per dimension (its department, its
+    OS) and, when its risk score is in the top high_risk_percentile and
+    positive, to the high-risk cohort of its department and OS. Endpoints
+    missing from the registry fall into "unknown" segments. Means are across
+    endpoints.
+    """
+    endpoints = endpoint_metrics.merge(registry, on="endpoint_id", how="left")
+    for dimension in dimensions:
+        endpoints[dimension] = endpoints[dimension].fillna(UNKNOWN_SEGMENT).astype(str) \
+            if dimension in endpoints.columns else UNKNOWN_SEGMENT
+    scores = risk_scores(endpoints)
+    threshold = np.percentile(scores, high_risk_percentile) if len(scores) else 0
+    endpoints["high_risk"] = (scores >= threshold) & (scores > 0)
+
+    # Stack each endpoint once per segment it belongs to
+    memberships = [endpoints.assign(segment_type=dimension, segment=endpoints[dimension])
+                   for dimension in dimensions]
+    cohort = endpoints[endpoints["high_risk"]]
+    memberships.append(cohort.assign(
+        segment_type=HIGH_RISK_SEGMENT,
+        segment=cohort[dimensions].astype(str).agg(" / ".join, axis=1) if len(cohort) else []
+    ))
+    stacked = pd.concat(memberships, ignore_index=True)
+
+    aggregations = {"endpoints": ("endpoint_id", "size")}
+    aggregations.update({name: (column, "sum") for name, column in SEGMENT_SUMS.items()
+                         if column in stacked.columns})
+    aggregations.update({name: (column, "mean") for name, column in SEGMENT_MEANS.items()
+                         if column in stacked.columns})
+    summaries = stacked.groupby(["segment_type", "segment"], sort=True).agg(**aggregations).reset_index()
+    if "threat_detections" in summaries.columns:
+        summaries["false_positive_rate"] = (
+            summaries["false_positives"] / summaries["threat_detections"].replace(0, np.nan) * 100
+        ).fillna(0.0)
+    return summaries.round(2)
+
+
+class SegmentResultsLog:
+    """Segment analysis results appended as NDJSON lines as they complete
+
+    Records are keyed by their request, so a rerun keeps the successful
+    results of an interrupted run whose segments are unchanged and sends only
+    the rest. start() rewrites the file (by rename, leaving any cached
+    snapshot intact) with the kept records before appending; each append is
+    flushed, so a crash loses at most the requests in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    def completed(self) -> Dict[str, Dict]:
+        """Successful records from a previous run, by key"""
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # A line cut short by a crash
+                if record.get("status") == "ok":
+                    records[record["key"]] = record
+        return records
+
+    def start(self, kept: List[Dict]):
+        def write(path):
+            with open(path, 'w') as f:
+                for record in kept:
+                    f.write(json.dumps(record, default=str) + "\n")
+        atomic_write(self.path, write)
+        self.file = open(self.path, 'a')
+
+    def append(self, record: Dict):
+        with self.lock:
+            self.file.write(json.dumps(record, default=str) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,176 @@
+"""
+Mergeable Sketches
+Approximate distinct counts and quantiles for aggregates that combine across days, shards and processes
+"""
+
+from typing import Iterable, List
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HLL_PRECISION = 14  # 16,384 registers, ~0.8% standard error
+
+
+def hash_values(values) -> np.ndarray:
+    """Deterministic 64-bit hashes of strings or other hashable values"""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Number of significant bits of each uint64 value (0 for 0), exact for every value"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1]).astype(np.uint8)
+
+
+def register_updates(hashes: np.ndarray, precision: int):
+    """Register index and rank (position of the first set bit) for each 64-bit hash"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes & np.uint64((1 << (64 - precision)) - 1)
+    rank = (64 - precision + 1) - _bit_length(remainder)
+    return index, rank.astype(np.uint8)
+
+
+def grouped_registers(group_codes: np.ndarray, hashes: np.ndarray, num_groups: int,
+                      precision: int = DEFAULT_HLL_PRECISION) -> np.ndarray:
+    """HyperLogLog registers for many groups at once, as a (num_groups, 2**precision) array"""
+    size = 1 << precision
+    registers = np.zeros(num_groups * size, dtype=np.uint8)
+    index, rank = register_updates(hashes, precision)
+    np.maximum.at(registers, np.asarray(group_codes, dtype=np.int64) * size + index, rank)
+    return registers.reshape(num_groups, size)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over NumPy registers
+
+    Adding values and merging sketches are register-wise maxima, so sketches
+    built on separate days, shards or processes merge exactly in O(registers).
+    The estimate uses linear counting while many registers are still empty.
+    """
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION, registers: np.ndarray = None):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, values: Iterable) -> "HyperLogLog":
+        """Add raw values (hashed with hash_values)"""
+        if not isinstance(values, (np.ndarray, pd.Series, pd.Index, list)):
+            values = list(values)
+        return self.add_hashes(hash_values(values))
+
+    def add_hashes(self, hashes: np.ndarray) -> "HyperLogLog":
+        """Add precomputed 64-bit hashes"""
+        index, rank = register_updates(hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch of the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> float:
+        """Estimated number of distinct values added"""
+        size = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(size, 0.7213 / (1 + 1.079 / size))
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and empty:
+            estimate = size * np.log(size / empty)
+        return float(estimate)
+
+    def to_bytes(self) -> bytes:
+        """Serialize as one precision byte followed by the registers"""
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """Deserialize; zero registers trimmed from the end (as by NumPy bytes arrays) are restored"""
+        precision = data[0]
+        registers = np.zeros(1 << precision, dtype=np.uint8)
+        stored = np.frombuffer(data[1:], dtype=np.uint8)
+        registers[:len(stored)] = stored
+        return cls(precision, registers)
+
+    @classmethod
+    def merge_bytes(cls, serialized: Iterable[bytes]) -> bytes:
+        """Merge serialized sketches into one serialized sketch"""
+        merged = None
+        for data in serialized:
+            sketch = cls.from_bytes(data)
+            merged = sketch if merged is None else merged.merge(sketch)
+        return merged.to_bytes()
+
+
+# Quantile sketches: DDSketch-style logarithmic buckets with relative accuracy
+# guarantees. Bucket counts are plain integers, so sketches merge by addition
+DEFAULT_QUANTILE_ACCURACY = 0.01
+QUANTILES = [0.5, 0.95, 0.99]
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+
+def quantile_gamma(accuracy: float) -> float:
+    return (1 + accuracy) / (1 - accuracy)
+
+
+def quantile_buckets(values: np.ndarray, accuracy: float = DEFAULT_QUANTILE_ACCURACY) -> np.ndarray:
+    """Bucket of each non-negative value: ceil(log_gamma(value)), with zeros in ZERO_BUCKET
+
+    Every value in a bucket is within the relative accuracy of the bucket's
+    representative value, and the number of buckets only depends on the
+    range of values, not on how many were added.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buckets = np.ceil(np.log(values) / np.log(quantile_gamma(accuracy)))
+    return np.where(values > 0, buckets, ZERO_BUCKET).astype(np.int32)
+
+
+def bucket_values(buckets: np.ndarray, accuracy: float = DEFAULT_QUANTILE_ACCURACY) -> np.ndarray:
+    """Representative value of each bucket"""
+    gamma = quantile_gamma(accuracy)
+    buckets = np.asarray(buckets)
+    return np.where(buckets == ZERO_BUCKET, 0.0,
+                    2 * np.power(gamma, np.where(buckets == ZERO_BUCKET, 0, buckets).astype(np.float64)) / (gamma + 1))
+
+
+def grouped_bucket_counts(group_codes: np.ndarray, buckets: np.ndarray):
+    """Sparse per-group bucket counts as (group codes, buckets, counts) arrays"""
+    combined = (np.asarray(group_codes, dtype=np.int64) << 32) | (buckets.astype(np.int64) & 0xFFFFFFFF)
+    counts = pd.Series(combined).value_counts(sort=False)
+    keys = counts.index.to_numpy()
+    return keys >> 32, (keys & 0xFFFFFFFF).astype(np.uint32).astype(np.int32), counts.to_numpy()
+
+
+def grouped_quantiles(buckets: pd.DataFrame, group_columns: List[str], quantiles: List[float] = QUANTILES,
+                      accuracy: float = DEFAULT_QUANTILE_ACCURACY) -> pd.DataFrame:
+    """Quantiles per group from a frame of group columns plus bucket and count columns
+
+    Returns the group columns plus one p<NN> column per quantile.
+    """
+    columns = group_columns + [f"p{round(q * 100)}" for q in quantiles]
+    buckets = buckets[buckets["count"] > 0]
+    if buckets.empty:
+        return pd.DataFrame(columns=columns)
+
+    buckets = buckets.sort_values(group_columns + ["bucket"]).reset_index(drop=True)
+    group_ids = buckets.groupby(group_columns, observed=True, sort=False).ngroup().to_numpy()
+    counts = buckets["count"].to_numpy(dtype=np.int64)
+    cumulative = np.cumsum(counts)
+    totals = np.bincount(group_ids, weights=counts).astype(np.int64)
+    before = np.concatenate([[0], np.cumsum(totals)[:-1]])
+
+    result = buckets.loc[np.concatenate([[0], np.flatnonzero(np.diff(group_ids)) + 1]), group_columns]
+    result = result.reset_index(drop=True)
+    bucket_keys = buckets["bucket"].to_numpy()
+    for q, column in zip(quantiles, columns[len(group_columns):]):
+        # First bucket whose cumulative count exceeds the quantile's rank within its group
+        rows = np.searchsorted(cumulative, before + q * (totals - 1), side="right")
+        result[column] = bucket_values(bucket_keys[rows], accuracy)
+    return result
@@ -0,0 +1,197 @@
+"""
+Pipeline Stage Cache
+Generations of stage outputs keyed by a content hash of the stage's inputs, reused when nothing changed
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+DEFAULT_CACHE_BYTES = 1 << 30
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def file_stats(paths: List[str]) -> Dict:
+    """Combined size and latest modification time of an input's files"""
+    stats = [os.stat(path) for path in paths]
+    return {
+        "size": sum(stat.st_size for stat in stats),
+        "mtime_ns": max((stat.st_mtime_ns for stat in stats), default=0)
+    }
+
+
+def content_hash(paths: List[str]) -> str:
+    """SHA-256 over the contents of an input's files, in order"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(*parts) -> str:
+    """SHA-256 over JSON-serializable key parts (file fingerprints, settings, code versions)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def list_files(root: str, exclude: Iterable[str] = ()) -> List[str]:
+    """Files under root as sorted relative paths, skipping temporary files and excluded top-level names"""
+    exclude = set(exclude)
+    files = []
+    if not os.path.isdir(root):
+        return files
+    for dirpath, dirnames, filenames in os.walk(root):
+        if dirpath == root:
+            dirnames[:] = [name for name in dirnames if name not in exclude]
+        for name in filenames:
+            rel_path = os.path.relpath(os.path.join(dirpath, name), root)
+            if rel_path not in exclude and ".tmp" not in name:
+                files.append(rel_path)
+    return sorted(files)
+
+
+def link_or_copy(source: str, target: str):
+    """Hard-link a file (copying where links are unsupported), replacing any existing target"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class StageCache:
+    """Cached generations of pipeline stage outputs with size-bounded LRU eviction
+
+    A stage's outputs are snapshotted under <root>/<stage>/<key> as hard links,
+    so a generation that is still live in the output directory costs no extra
+    space. Every writer in the pipeline replaces files by rename instead of
+    overwriting them, which keeps snapshots intact. When the space held only by
+    the cache exceeds max_bytes, the least recently used generations that are
+    not current are evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self.index = self.load_index()
+
+    def load_index(self) -> Dict:
+        if not os.path.exists(self.index_path):
+            return {"version": INDEX_VERSION, "generations": {}, "current": {}, "fingerprints": {}}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def commit(self):
+        """Write the index atomically, forgetting fingerprints of files that no longer exist"""
+        self.index["fingerprints"] = {
+            path: entry for path, entry in self.index["fingerprints"].items() if os.path.exists(path)
+        }
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def fingerprint(self, root: str, files: Iterable[str]) -> Dict[str, str]:
+        """Content hashes of files (relative to root), rehashed only when their size or mtime changed"""
+        memo = self.index["fingerprints"]
+        fingerprints = {}
+        for rel_path in files:
+            path = os.path.abspath(os.path.join(root, rel_path))
+            if not os.path.exists(path):
+                continue
+            stats = file_stats([path])
+            entry = memo.get(path)
+            if entry is None or entry["size"] != stats["size"] or entry["mtime_ns"] != stats["mtime_ns"]:
+                entry = memo[path] = dict(stats, sha256=content_hash([path]))
+            fingerprints[rel_path] = entry["sha256"]
+        return fingerprints
+
+    def code_version(self, paths: Iterable[str]) -> str:
+        """Hash of the source files a stage runs"""
+        return content_hash(sorted(paths))
+
+    def generation_dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, key[:32])
+
+    def current(self, stage: str) -> str:
+        """Key of the generation last stored or restored for a stage"""
+        return self.index["current"].get(stage)
+
+    def restore(self, stage: str, key: str, output_root: str, stale_files: Iterable[str]) -> bool:
+        """Make the cached generation for key the live outputs; False when it is not cached
+
+        stale_files (relative to output_root) are the stage's current outputs;
+        those not in the generation are removed. Nothing is copied when the
+        live outputs already are this generation.
+        """
+        generation = self.index["generations"].get(f"{stage}/{key}")
+        generation_dir = self.generation_dir(stage, key)
+        if generation is None or not os.path.isdir(generation_dir):
+            return False
+
+        files = generation["files"]
+        live = self.current(stage) == key and all(
+            os.path.exists(os.path.join(output_root, name))
+            and os.path.samefile(os.path.join(generation_dir, name), os.path.join(output_root, name))
+            for name in files
+        )
+        if not live:
+            for name in set(stale_files) - set(files):
+                os.remove(os.path.join(output_root, name))
+            for name in files:
+                link_or_copy(os.path.join(generation_dir, name), os.path.join(output_root, name))
+
+        generation["last_used"] = time.time()
+        self.index["current"][stage] = key
+        self.evict()
+        self.commit()
+        return True
+
+    def store(self, stage: str, key: str, output_root: str, files: List[str]):
+        """Snapshot a stage's outputs as the generation for key, then evict old generations"""
+        generation_dir = self.generation_dir(stage, key)
+        shutil.rmtree(generation_dir, ignore_errors=True)
+        for name in files:
+            link_or_copy(os.path.join(output_root, name), os.path.join(generation_dir, name))
+
+        now = time.time()
+        self.index["generations"][f"{stage}/{key}"] = {
+            "stage": stage, "key": key, "files": files, "created": now, "last_used": now
+        }
+        self.index["current"][stage] = key
+        self.evict()
+        self.commit()
+
+    def disk_usage(self) -> int:
+        """Bytes held only by the cache (files still linked from live outputs are not counted)"""
+        inodes = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                stat = os.stat(os.path.join(dirpath, name))
+                size, links, seen = inodes.get((stat.st_dev, stat.st_ino), (stat.st_size, stat.st_nlink, 0))
+                inodes[(stat.st_dev, stat.st_ino)] = (size, links, seen + 1)
+        return sum(size for size, links, seen in inodes.values() if seen >= links)
+
+    def evict(self):
+        """Drop least recently used generations, never a current one, until within max_bytes"""
+        current = {f"{stage}/{key}" for stage, key in self.index["current"].items()}
+        candidates = sorted(
+            (name for name in self.index["generations"] if name not in current),
+            key=lambda name: self.index["generations"][name]["last_used"]
+        )
+        while candidates and self.disk_usage() > self.max_bytes:
+            generation = self.index["generations"].pop(candidates.pop(0))
+            shutil.rmtree(self.generation_dir(generation["stage"], generation["key"]), ignore_errors=True)
+            print(f"Evicted cached {generation['stage']} generation {generation['key'][:12]}")
@@ -0,0 +1,122 @@
+"""
+Telemetry Schema Definitions
+Shared event types, weights and categorical vocabularies for generated telemetry
+"""
+
+EVENT_TYPES = ["scan", "threat_detection", "performance", "user_feedback"]
+EVENT_TYPE_WEIGHTS = [40, 25, 30, 5]
+
+THREAT_TYPES = [
+    "malware", "virus", "trojan", "spyware", "adware",
+    "ransomware", "rootkit", "worm", "suspicious_file", "phishing"
+]
+SCAN_TYPES = ["scheduled", "on_demand", "real_time", "quick", "full"]
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+DEPARTMENTS = ["IT", "Finance", "HR", "Sales", "Marketing", "Operations", "Legal"]
+OS_TYPES = ["Windows 10", "Windows 11", "macOS", "Linux Ubuntu", "Windows Server"]
+
+SCAN_STATUSES = ["completed", "failed", "cancelled"]
+SCAN_STATUS_WEIGHTS = [85, 10, 5]
+
+THREAT_ACTIONS = ["quarantined", "deleted", "blocked", "allowed"]
+THREAT_ACTION_WEIGHTS = [40, 30, 20, 10]
+FALSE_POSITIVE_WEIGHTS = [15, 85]  # [True, False]
+
+FILE_PATH_USERS = ["admin", "user", "guest"]
+FILE_PATH_FOLDERS = ["Downloads", "Documents", "Desktop"]
+
+FEEDBACK_TYPES = [
+    "slow_performance", "false_positive", "scan_interruption",
+    "update_failure", "interface_issue", "feature_request"
+]
+FEEDBACK_TEXTS = {
+    "slow_performance": "System is running very slow during scans",
+    "false_positive": "Important file was blocked incorrectly",
+    "scan_interruption": "Scan keeps interrupting my work",
+    "update_failure": "Updates keep failing to install",
+    "interface_issue": "Interface is confusing and hard to use",
+    "feature_request": "Need better scheduling options"
+}
+SENTIMENTS = ["negative", "neutral", "positive"]
+SENTIMENT_WEIGHTS = [60, 25, 15]
+PRIORITIES = ["low", "medium", "high"]
+RESOLVED_WEIGHTS = [70, 30]  # [True, False]
+
+# Vocabulary behind each categorical code column produced by batched generation
+FIELD_VOCABULARIES = {
+    "event_type": EVENT_TYPES,
+    "scan_type": SCAN_TYPES,
+    "scan_status": SCAN_STATUSES,
+    "threat_type": THREAT_TYPES,
+    "threat_name_type": THREAT_TYPES,
+    "file_path_user": FILE_PATH_USERS,
+    "file_path_folder": FILE_PATH_FOLDERS,
+    "severity": SEVERITY_LEVELS,
+    "action_taken": THREAT_ACTIONS,
+    "feedback_type": FEEDBACK_TYPES,
+    "sentiment": SENTIMENTS,
+    "priority": PRIORITIES
+}
+
+# Fixed per-event-type field layouts, in the order the generators emit them
+COMMON_FIELDS = ["event_id", "timestamp", "endpoint_id", "event_type"]
+EVENT_FIELDS = {
+    "scan": COMMON_FIELDS + [
+        "scan_type", "scan_duration", "files_scanned", "threats_found",
+        "threats_cleaned", "scan_status", "cpu_usage_avg", "memory_usage_mb"
+    ],
+    "threat_detection": COMMON_FIELDS + [
+        "threat_type", "threat_name", "file_path", "severity", "action_taken", "false_positive"
+    ],
+    "performance": COMMON_FIELDS + [
+        "cpu_usage", "memory_usage", "disk_usage", "network_usage_kb",
+        "antivirus_cpu_impact", "boot_time_seconds"
+    ],
+    "user_feedback": COMMON_FIELDS + [
+        "feedback_type", "feedback_text", "sentiment", "priority", "resolved"
+    ]
+}
+
+# Wide raw CSV header: the sorted union of every event type's fields
+TELEMETRY_CSV_FIELDS = sorted({field for fields in EVENT_FIELDS.values() for field in fields})
+
+# Compact in-memory dtypes for raw CSV columns (pandas dtype names; nullable where
+# a column is empty for other event types). Categorical columns without a fixed
+# vocabulary get their categories from the data.
+CATEGORICAL_FIELDS = [
+    "event_type", "scan_type", "scan_status", "threat_type", "severity", "action_taken",
+    "feedback_type", "sentiment", "priority"
+]
+DYNAMIC_CATEGORICAL_FIELDS = ["endpoint_id", "threat_name", "file_path", "feedback_text"]
+NUMERIC_FIELD_DTYPES = {
+    "scan_duration": "Int16",
+    "files_scanned": "Int32",
+    "threats_found": "Int8",
+    "threats_cleaned": "Int8",
+    "memory_usage_mb": "Int16",
+    "network_usage_kb": "Int16",
+    "boot_time_seconds": "Int16",
+    "cpu_usage_avg": "float32",
+    "cpu_usage": "float32",
+    "memory_usage": "float32",
+    "disk_usage": "float32",
+    "antivirus_cpu_impact": "float32"
+}
+BOOLEAN_FIELDS = ["false_positive", "resolved"]
+TIMESTAMP_FORMAT = "ISO8601"
+
+
+def __getattr__(name):
+    """Build RAW_CSV_DTYPES on first use, so importing the schema (as generation does) never loads pandas"""
+    if name == "RAW_CSV_DTYPES":
+        import pandas as pd
+
+        # Declared dtypes for raw telemetry CSV columns
+        globals()[name] = {
+            **{field: pd.CategoricalDtype(FIELD_VOCABULARIES[field]) for field in CATEGORICAL_FIELDS},
+            **{field: 'category' for field in DYNAMIC_CATEGORICAL_FIELDS},
+            **NUMERIC_FIELD_DTYPES,
+            **{field: 'boolean' for field in BOOLEAN_FIELDS}
+        }
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,157 @@
+"""
+Streaming Telemetry Writers
+Constant-memory NDJSON, JSON and CSV sinks for raw telemetry event streams
+"""
+
+import csv
+import gzip
+import io
+import json
+from typing import Dict, Iterable, List
+
+from telemetry_schema import EVENT_FIELDS, TELEMETRY_CSV_FIELDS
+
+DEFAULT_BUFFER_ROWS = 10000
+FILE_BUFFER_BYTES = 1 << 20
+
+
+def open_text(filename: str, compress: bool = False):
+    """Open a text file for writing, gzip-compressed when requested"""
+    if compress:
+        return io.TextIOWrapper(gzip.open(filename, 'wb', compresslevel=6),
+                                encoding='utf-8', newline='')
+    return open(filename, 'w', newline='', encoding='utf-8', buffering=FILE_BUFFER_BYTES)
+
+
+class NDJSONWriter:
+    """Write one compact JSON object per line, flushing in buffered batches"""
+
+    def __init__(self, filename: str, compress: bool = False, buffer_rows: int = DEFAULT_BUFFER_ROWS):
+        self.filename = filename
+        self.buffer_rows = buffer_rows
+        self.rows_written = 0
+        self._file = open_text(filename, compress)
+        self._buffer: List[str] = []
+
+    def write(self, event: Dict):
+        self._buffer.append(json.dumps(event, separators=(',', ':')))
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class JSONArrayWriter(NDJSONWriter):
+    """Write a JSON array incrementally, one record per line"""
+
+    def __init__(self, filename: str, compress: bool = False, buffer_rows: int = DEFAULT_BUFFER_ROWS):
+        super().__init__(filename, compress, buffer_rows)
+        self._file.write('[')
+
+    def flush(self):
+        if self._buffer:
+            separator = ',\n' if self.rows_written else '\n'
+            self._file.write(separator + ',\n'.join(self._buffer))
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._file.write('\n]\n' if self.rows_written else ']\n')
+        self._file.close()
+
+
+class CSVEventWriter:
+    """Write events as CSV rows against a header fixed up front"""
+
+    def __init__(self, filename: str, compress: bool = False, buffer_rows: int = DEFAULT_BUFFER_ROWS,
+                 fieldnames: List[str] = None):
+        self.filename = filename
+        self.buffer_rows = buffer_rows
+        self.fieldnames = fieldnames or TELEMETRY_CSV_FIELDS
+        self.rows_written = 0
+        self._file = open_text(filename, compress)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fieldnames)
+        self._buffer: List[List] = []
+
+    def write(self, event: Dict):
+        self._buffer.append([event.get(field) for field in self.fieldnames])
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+WRITERS = {
+    'ndjson': NDJSONWriter,
+    'json': JSONArrayWriter,
+    'csv': CSVEventWriter
+}
+
+
+def stream_events(events: Iterable[Dict], base_path: str, formats: Iterable[str] = ('json', 'csv'),
+                  compress: bool = False, buffer_rows: int = DEFAULT_BUFFER_ROWS,
+                  split_by_type: bool = False) -> int:
+    """Consume an event iterator once, fanning each event out to one file per format
+
+    Files are named <base_path>.<format>, with a .gz suffix when compressed.
+    With split_by_type, each event type gets its own <base_path>_<event_type>.<format>
+    table whose CSV header is that type's fixed field layout.
+    Returns the number of events written.
+    """
+    formats = list(formats)
+    for fmt in formats:
+        if fmt not in WRITERS:
+            raise ValueError(f"Unsupported output format: {fmt}")
+
+    def open_writers(path: str, fieldnames: List[str] = None) -> List:
+        suffix = ".gz" if compress else ""
+        return [
+            CSVEventWriter(f"{path}.{fmt}{suffix}", compress, buffer_rows, fieldnames) if fmt == 'csv'
+            else WRITERS[fmt](f"{path}.{fmt}{suffix}", compress=compress, buffer_rows=buffer_rows)
+            for fmt in formats
+        ]
+
+    writers_by_type = {}
+    if not split_by_type:
+        shared = open_writers(base_path)
+        writers_by_type = {event_type: shared for event_type in EVENT_FIELDS}
+
+    count = 0
+    try:
+        for event in events:
+            event_type = event["event_type"]
+            writers = writers_by_type.get(event_type)
+            if writers is None:
+                writers = writers_by_type[event_type] = open_writers(
+                    f"{base_path}_{event_type}", EVENT_FIELDS[event_type]
+                )
+            for writer in writers:
+                writer.write(event)
+            count += 1
+    finally:
+        closed = set()
+        for writers in writers_by_type.values():
+            for writer in writers:
+                if id(writer) not in closed:
+                    writer.close()
+                    closed.add(id(writer))
+
+    return count
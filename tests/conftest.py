@@ -0,0 +1,50 @@
+import datetime
+import os
+import shutil
+import sys
+from typing import Dict
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from config_loader import ai_settings, export_settings, threshold_settings
+from data_generator import TelemetryDataGenerator
+from data_processor import TelemetryDataProcessor
+
+CORPUS_SETTINGS = {"endpoints": 200, "daily_events": 2000, "simulation_days": 2, "output_formats": ["csv"]}
+CORPUS_END_DATE = datetime.date(2024, 1, 2)
+CORPUS_SEED = 7
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    """A seeded two-day raw corpus of split CSV tables (generated once; copy before modifying)"""
+    raw_path = str(tmp_path_factory.mktemp("corpus") / "raw")
+    TelemetryDataGenerator(settings=CORPUS_SETTINGS).generate_sample_datasets(
+        raw_path, days=CORPUS_SETTINGS["simulation_days"], seed=CORPUS_SEED, end_date=CORPUS_END_DATE,
+        output_formats=CORPUS_SETTINGS["output_formats"])
+    return raw_path
+
+
+@pytest.fixture
+def raw_path(corpus, tmp_path):
+    """A private copy of the corpus"""
+    path = str(tmp_path / "raw")
+    shutil.copytree(corpus, path)
+    return path
+
+
+def make_processor(raw_path: str, processed_path: str, **options) -> TelemetryDataProcessor:
+    """Processor with default export settings and thresholds, independent of config/config.yaml"""
+    return TelemetryDataProcessor(raw_path, processed_path, export=export_settings({}),
+                                  thresholds=threshold_settings({}), **options)
+
+
+def mock_ai_settings(**overrides) -> Dict:
+    """AI settings answering from an instant, error-free mock backend with no response cache"""
+    settings = ai_settings({})
+    settings.update(backend="mock", mock_latency_seconds=0, mock_latency_jitter=0, mock_tokens_per_second=0,
+                    response_cache=False, backoff_seconds=0.01, max_backoff_seconds=0.05)
+    settings.update(overrides)
+    return settings
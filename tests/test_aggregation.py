@@ -0,0 +1,11 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import float_values
+
+
+def test_float32_values_restore_written_decimals():
+    written = np.round(np.random.default_rng(0).uniform(1, 999, 10000), 2)
+    values = float_values(pd.Series(written.astype(np.float32)))
+    np.testing.assert_array_equal(values, written)
+    assert float_values(pd.Series([30.255], dtype="float32"))[0] == 30.255
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from conftest import make_processor
+from dedup import EventKeyIndex, event_keys
+
+
+def uuids(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    return [str(uuid.UUID(int=int(value), version=4))
+            for value in rng.integers(0, 2 ** 63, size=count, dtype=np.int64)]
+
+
+def test_event_keys_are_uuid_values_with_hashed_fallback():
+    event_id = "1b4e28ba-2fa1-41d2-883f-0016d3cca427"
+    keys = event_keys([event_id, "not-a-uuid", "not-a-uuid", "also-not"])
+    value = uuid.UUID(event_id).int
+    assert keys[0].tolist() == [value >> 64, value & (2 ** 64 - 1)]
+    assert (keys[1] == keys[2]).all() and not (keys[1] == keys[3]).all()
+
+
+def test_filter_new_across_inputs_and_reopened_index(tmp_path):
+    root = str(tmp_path / "event_keys")
+    first, second = uuids(1000, 1), uuids(500, 2)
+    index = EventKeyIndex(root)
+    assert index.filter_new(event_keys(first + first[:10])).sum() == 1000
+    assert index.commit("day1") == 10
+
+    # A later input repeating half of the first, plus its own events (one twice)
+    reopened = EventKeyIndex(root)
+    batch = first[::2] + second + second[:1]
+    new = reopened.filter_new(event_keys(batch))
+    assert new.tolist() == [False] * 500 + [True] * 500 + [False]
+    assert reopened.commit("day2") == 501
+    assert reopened.size() == 1500
+
+    # A fully duplicated input keeps nothing; dropping an input releases its keys
+    assert not EventKeyIndex(root).filter_new(event_keys(first + second)).any()
+    reopened.remove("day2")
+    assert EventKeyIndex(root).filter_new(event_keys(second)).all()
+
+
+def test_filter_new_sees_keys_pending_from_earlier_chunks(tmp_path):
+    index = EventKeyIndex(str(tmp_path / "event_keys"))
+    ids = uuids(100, 3)
+    assert index.filter_new(event_keys(ids[:60])).all()
+    assert index.filter_new(event_keys(ids[40:])).tolist() == [False] * 20 + [True] * 40
+
+
+def test_fully_duplicated_input_is_dropped(raw_path, tmp_path, capsys):
+    processed_path = str(tmp_path / "processed")
+    insights = make_processor(raw_path, processed_path).process_all_data()
+    scan_file = next(name for name in sorted(os.listdir(raw_path)) if name.endswith("_scan.csv"))
+    shutil.copy(os.path.join(raw_path, scan_file), os.path.join(raw_path, "telemetry_20990101_scan.csv"))
+
+    replayed = make_processor(raw_path, processed_path).process_all_data()
+
+    scan_rows = len(pd.read_csv(os.path.join(raw_path, scan_file)))
+    assert f"Dropped {scan_rows:,} duplicate events from telemetry_20990101_scan" in capsys.readouterr().out
+    assert replayed['overview'] == insights['overview']
@@ -0,0 +1,36 @@
+import os
+import shutil
+
+import pandas as pd
+
+from ai_analyzer import AITelemetryAnalyzer
+from conftest import make_processor, mock_ai_settings
+
+
+def by_labels(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rows in label order (category order may differ between sources), labels as strings"""
+    labels = [column for column in frame.columns if not pd.api.types.is_numeric_dtype(frame[column])]
+    frame = frame.astype({column: str for column in labels})
+    return frame.sort_values(labels or list(frame.columns)).reset_index(drop=True)
+
+
+def assert_same_aggregates(loaded, handed_off):
+    assert loaded['overview'] == handed_off['overview']
+    assert loaded['pain_points'] == handed_off['pain_points']
+    for name, frame in handed_off['aggregated_data'].items():
+        pd.testing.assert_frame_equal(by_labels(loaded['aggregated_data'][name]), by_labels(frame),
+                                      check_dtype=False)
+
+
+def test_handed_off_aggregates_match_those_loaded_from_disk(raw_path, tmp_path):
+    processed_path = str(tmp_path / "processed")
+    processor = make_processor(raw_path, processed_path)
+    processor.process_all_data()
+    analyzer = AITelemetryAnalyzer(processed_data_path=processed_path, settings=mock_ai_settings())
+    try:
+        # From the persisted partial aggregates, then from the processed rows alone
+        assert_same_aggregates(analyzer.load_aggregates(), processor.aggregates)
+        shutil.rmtree(os.path.join(processed_path, "partials"))
+        assert_same_aggregates(analyzer.load_aggregates(), processor.aggregates)
+    finally:
+        analyzer.close()
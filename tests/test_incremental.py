@@ -0,0 +1,46 @@
+import hashlib
+import os
+
+from conftest import make_processor
+from stage_cache import list_files
+
+
+def output_hashes(processed_path: str) -> dict:
+    """Content hash of every processed output, excluding the processing state"""
+    return {
+        name: hashlib.sha256(open(os.path.join(processed_path, name), 'rb').read()).hexdigest()
+        for name in list_files(processed_path, exclude=["partials", "event_keys"])
+    }
+
+
+def test_rerun_reprocesses_nothing_and_rewrites_identical_outputs(raw_path, tmp_path, capsys):
+    processed_path = str(tmp_path / "processed")
+    make_processor(raw_path, processed_path).process_all_data()
+    first = output_hashes(processed_path)
+    capsys.readouterr()
+
+    make_processor(raw_path, processed_path).process_all_data()
+
+    assert "Raw inputs: 0 new or changed, 8 unchanged, 0 removed" in capsys.readouterr().out
+    assert output_hashes(processed_path) == first
+
+
+def test_pool_processing_matches_serial(raw_path, tmp_path):
+    serial_path, pool_path = str(tmp_path / "serial"), str(tmp_path / "pool")
+    serial = make_processor(raw_path, serial_path).process_all_data(workers=1)
+    pooled = make_processor(raw_path, pool_path).process_all_data(workers=2)
+    assert pooled == serial
+    assert output_hashes(pool_path) == output_hashes(serial_path)
+
+
+def test_removed_input_matches_full_reprocess(raw_path, tmp_path, capsys):
+    processed_path = str(tmp_path / "processed")
+    make_processor(raw_path, processed_path).process_all_data()
+    os.remove(os.path.join(raw_path, sorted(name for name in os.listdir(raw_path) if name.endswith("_scan.csv"))[0]))
+    capsys.readouterr()
+
+    incremental = make_processor(raw_path, processed_path).process_all_data()
+
+    assert "0 new or changed, 7 unchanged, 1 removed" in capsys.readouterr().out
+    full = make_processor(raw_path, str(tmp_path / "full")).process_all_data(incremental=False)
+    assert incremental == full
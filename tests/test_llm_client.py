@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_analyzer import AITelemetryAnalyzer
+from conftest import mock_ai_settings
+from mock_llm_server import mock_response
+
+
+@pytest.fixture
+def make_analyzer(tmp_path):
+    analyzers = []
+
+    def make(**settings):
+        analyzer = AITelemetryAnalyzer(processed_data_path=str(tmp_path / "processed"),
+                                       settings=mock_ai_settings(**settings))
+        analyzers.append(analyzer)
+        return analyzer
+    yield make
+    for analyzer in analyzers:
+        analyzer.close()
+
+
+def test_completion_from_mock_backend(make_analyzer):
+    analyzer = make_analyzer()
+    assert analyzer.call_openai_api("Analyze threats") == mock_response("Analyze threats")
+    assert analyzer.last_call()["attempts"] == 1 and analyzer.last_call()["source"] == "api"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_server_errors_are_retried_then_reported(make_analyzer, stream):
+    analyzer = make_analyzer(mock_error_rate=1.0, max_retries=2, stream=stream)
+    answer = analyzer.call_openai_api("Analyze threats")
+    assert answer.startswith("AI analysis error:")
+    assert analyzer.last_call()["attempts"] == 3
+    assert analyzer.backend.server.stats()["errors"] == 3
+
+
+def test_flaky_server_answers_after_retries(make_analyzer):
+    analyzer = make_analyzer(mock_error_rate=0.5, max_retries=12)
+    answers = [analyzer.call_openai_api(f"prompt {i}") for i in range(8)]
+    assert answers == [mock_response(f"prompt {i}") for i in range(8)]
+    stats = analyzer.backend.server.stats()
+    assert sum(call["attempts"] for call in analyzer.calls) == stats["requests"] == 8 + stats["errors"]
+
+
+def test_backoff_grows_exponentially_and_honours_retry_after(make_analyzer):
+    analyzer = make_analyzer(backoff_seconds=0.5, max_backoff_seconds=4)
+    delays = [analyzer.retry_delay(attempt) for attempt in range(6) for _ in range(50)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert max(delays[:50]) <= 0.5 and max(delays[-50:]) > 0.5
+
+    class Response:
+        headers = {"Retry-After": "1.5"}
+    assert analyzer.retry_delay(0, Response()) == 1.5
+    Response.headers = {"Retry-After": "60"}
+    assert analyzer.retry_delay(0, Response()) == 4
+
+
+def test_concurrent_calls_share_the_pooled_backend(make_analyzer):
+    analyzer = make_analyzer(max_concurrency=4, mock_latency_seconds=0.02)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        answers = list(executor.map(analyzer.call_openai_api, [f"prompt {i}" for i in range(16)]))
+    assert answers == [mock_response(f"prompt {i}") for i in range(16)]
+    assert analyzer.backend.server.stats()["completed"] == 16
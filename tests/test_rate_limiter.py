@@ -0,0 +1,52 @@
+from ai_analyzer import AITelemetryAnalyzer
+from conftest import mock_ai_settings
+from mock_llm_server import MockLLMServer, mock_response
+from rate_limiter import RateLimiter, TokenBucket, request_tokens
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(capacity=10, rate=2, now=0)
+    assert bucket.reserve(10, now=0) == 0
+    assert bucket.reserve(4, now=1) == 1.0   # 2 refilled, 2 owed at 2/second
+    assert bucket.try_take(1, now=1) == 1.5  # Debt of 2 plus 1 more
+    assert bucket.try_take(1, now=2.5) == 0
+
+
+def test_limiter_paces_requests_to_the_quota():
+    limiter = RateLimiter(requests_per_minute=120)
+    capacity = int(limiter.requests.capacity)
+    assert all(limiter.reserve(10) == 0 for _ in range(capacity))
+    assert limiter.reserve(10) > 0
+
+
+def test_refund_returns_a_rejected_request():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    request = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 100}
+    tokens = request_tokens(request)
+    level = limiter.tokens.level
+    limiter.reserve(tokens)
+    limiter.refund(tokens)
+    assert limiter.tokens.level >= level - 1
+
+
+def test_mock_server_rejects_requests_over_quota():
+    server = MockLLMServer(latency=0, latency_jitter=0, requests_per_minute=60)
+    server.requests.level = 0
+    status, headers, body = server.complete({"messages": [{"role": "user", "content": "hi"}]})
+    assert status == 429 and 0 < float(headers["Retry-After"]) <= 1
+    assert server.stats()["rate_limited"] == 1
+    server.httpd.server_close()
+
+
+def test_rate_limited_calls_wait_and_succeed(tmp_path):
+    analyzer = AITelemetryAnalyzer(processed_data_path=str(tmp_path / "processed"),
+                                   settings=mock_ai_settings(mock_rate_limit_rpm=240, max_backoff_seconds=1))
+    try:
+        # Exhaust the mock's quota: the next request gets a 429 with Retry-After of about 0.25 seconds
+        analyzer.backend.server.requests.level = 0
+        assert analyzer.call_openai_api("Analyze threats") == mock_response("Analyze threats")
+        assert analyzer.last_call()["attempts"] >= 2
+        assert analyzer.backend.server.stats()["rate_limited"] >= 1
+        assert analyzer.rate_limiter.paused_until > 0  # Every thread was held back
+    finally:
+        analyzer.close()
@@ -0,0 +1,61 @@
+import os
+import time
+
+import response_cache
+from response_cache import ResponseCache
+
+
+def request(n: int):
+    return {"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": f"prompt {n}"}]}
+
+
+def entry_bytes(root: str) -> int:
+    cache = ResponseCache(root)
+    cache.put(request(-1), "x" * 1000)
+    return os.path.getsize(cache.entry_path(response_cache.request_key(request(-1))))
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get(request(1)) is None
+    cache.put(request(1), "answer")
+    assert cache.get(request(1)) == "answer"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_misses_and_deleted(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=60)
+    cache.put(request(1), "answer")
+    now = time.time()
+    monkeypatch.setattr(response_cache.time, "time", lambda: now + 61)
+    assert cache.get(request(1)) is None
+    assert not os.path.exists(cache.entry_path(response_cache.request_key(request(1))))
+    assert cache.total_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    size = entry_bytes(str(tmp_path / "probe"))
+    cache = ResponseCache(str(tmp_path / "cache"), max_bytes=2 * size + 100)
+    cache.put(request(1), "x" * 1000)
+    cache.put(request(2), "x" * 1000)
+    assert cache.get(request(1)) is not None  # request 2 is now least recently used
+    cache.put(request(3), "x" * 1000)
+
+    assert cache.get(request(2)) is None
+    assert cache.get(request(1)) is not None and cache.get(request(3)) is not None
+    assert cache.total_bytes <= 2 * size + 100
+
+
+def test_reopened_cache_evicts_by_modification_time(tmp_path):
+    size = entry_bytes(str(tmp_path / "probe"))
+    root = str(tmp_path / "cache")
+    first = ResponseCache(root, max_bytes=2 * size + 100)
+    first.put(request(1), "x" * 1000)
+    first.put(request(2), "x" * 1000)
+    old = time.time() - 100
+    os.utime(first.entry_path(response_cache.request_key(request(2))), (old, old))
+
+    reopened = ResponseCache(root, max_bytes=2 * size + 100)
+    reopened.put(request(3), "x" * 1000)
+    assert reopened.get(request(2)) is None
+    assert reopened.get(request(1)) is not None
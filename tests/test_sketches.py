@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import merge_partials
+from conftest import make_processor
+from sketches import (
+    DEFAULT_QUANTILE_ACCURACY, QUANTILES, HyperLogLog, grouped_bucket_counts, grouped_quantiles, quantile_buckets
+)
+
+
+def ids(start: int, stop: int):
+    return [f"endpoint_{i}" for i in range(start, stop)]
+
+
+@pytest.mark.parametrize("distinct", [1000, 100000])
+def test_hll_count_within_error_bound(distinct):
+    sketch = HyperLogLog(14).add(ids(0, distinct) * 2)
+    # Standard error at precision 14 is about 0.8%; allow three of them
+    assert sketch.count() == pytest.approx(distinct, rel=0.025)
+
+
+def test_hll_merge_is_associative_commutative_and_matches_the_union():
+    parts = [ids(0, 30000), ids(20000, 50000), ids(45000, 60000)]
+    a, b, c = [HyperLogLog(12).add(part) for part in parts]
+
+    def copy(sketch):
+        return HyperLogLog(sketch.precision, sketch.registers.copy())
+
+    left = copy(a).merge(b).merge(c)
+    right = copy(a).merge(copy(b).merge(c))
+    swapped = copy(c).merge(a).merge(b)
+    union = HyperLogLog(12).add(ids(0, 60000))
+    np.testing.assert_array_equal(left.registers, right.registers)
+    np.testing.assert_array_equal(left.registers, swapped.registers)
+    np.testing.assert_array_equal(left.registers, union.registers)
+    assert HyperLogLog.merge_bytes([a.to_bytes(), b.to_bytes(), c.to_bytes()]) == union.to_bytes()
+
+
+def test_hll_serialization_restores_trimmed_registers():
+    sketch = HyperLogLog(10).add(ids(0, 5))
+    data = sketch.to_bytes().rstrip(b"\0")  # As stored in a NumPy bytes array
+    np.testing.assert_array_equal(HyperLogLog.from_bytes(data).registers, sketch.registers)
+
+
+def test_hll_rejects_mismatched_precisions():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+
+
+def test_hll_processing_matches_exact_distinct_counts(raw_path, tmp_path):
+    exact = make_processor(raw_path, str(tmp_path / "exact"), distinct_mode="exact").process_all_data()
+    estimated = make_processor(raw_path, str(tmp_path / "hll"), distinct_mode="hll").process_all_data()
+    assert estimated['overview']['unique_endpoints'] == pytest.approx(
+        exact['overview']['unique_endpoints'], rel=0.025)
+
+
+def quantile_partial(values: np.ndarray, accuracy: float = DEFAULT_QUANTILE_ACCURACY) -> dict:
+    """A "quantiles" partial aggregate frame for one field's values"""
+    _, buckets, counts = grouped_bucket_counts(np.zeros(len(values), dtype=np.int64),
+                                               quantile_buckets(values, accuracy))
+    return {"quantiles": pd.DataFrame({
+        "field": pd.Categorical(["cpu_usage"] * len(counts)), "bucket": buckets, "count": counts
+    })}
+
+
+def partial_quantiles(partials: dict, accuracy: float = DEFAULT_QUANTILE_ACCURACY) -> pd.DataFrame:
+    return grouped_quantiles(partials["quantiles"], ["field"], accuracy=accuracy).drop(columns="field")
+
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    values = np.random.default_rng(1).lognormal(3, 1, 200000)
+    values[:1000] = 0
+    estimated = partial_quantiles(quantile_partial(values, accuracy), accuracy).iloc[0]
+    for q, column in zip(QUANTILES, estimated.index):
+        exact = np.quantile(values, q, method="lower")
+        assert estimated[column] == pytest.approx(exact, rel=accuracy * 1.0001)
+
+
+def test_quantile_merge_is_associative_and_matches_one_sketch():
+    values = np.random.default_rng(2).uniform(1, 100, 90000)
+    a, b, c = [quantile_partial(part) for part in np.split(values, 3)]
+    left = merge_partials([merge_partials([a, b]), c])
+    right = merge_partials([a, merge_partials([c, b])])
+    whole = quantile_partial(values)
+
+    def buckets(partials):
+        return partials["quantiles"].sort_values("bucket")[["bucket", "count"]].reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(buckets(left), buckets(right), check_dtype=False)
+    pd.testing.assert_frame_equal(buckets(left), buckets(whole), check_dtype=False)
+    pd.testing.assert_frame_equal(partial_quantiles(left), partial_quantiles(whole))